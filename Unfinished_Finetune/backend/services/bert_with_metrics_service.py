@@ -0,0 +1,51 @@
+import os
+
+import torch
+
+from model.feature_spec import FeatureSpec
+from model.metric_features import METRIC_KEYS, extract_metric_matrix
+
+
+class BertWithMetricsService:
+    # Serving for BertWithMetrics.
+    #  Metrics are computed once per tweet (for the model and for the response),
+    #  for the whole batch at once as a NumPy array, then normalized with the
+    #  feature spec saved at training time and fed to the model next to the
+    #  batched CLS outputs in a single forward pass.
+    def __init__(self, tokenizer, model, spec, nlp):
+        spec.check_keys(METRIC_KEYS)
+        self.tokenizer = tokenizer
+        self.model = model
+        self.spec = spec
+        self.nlp = nlp
+
+    @staticmethod
+    def load(model_path, tokenizer, model, nlp):
+        return BertWithMetricsService(tokenizer, model, FeatureSpec.load(os.path.join(model_path, "feature_spec.json")), nlp)
+
+    # Returns one (label, confidence %, metrics dict) per text
+    def predict_batch(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+
+        raw_metrics = extract_metric_matrix(texts, self.nlp)
+        metrics_tensor = torch.from_numpy(self.spec.transform(raw_metrics))
+        inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, padding="longest")
+
+        # Make a predictions without tracking gradients(past learning steps).
+        # Turn a vector of real numbers into a probability(softmax).
+        # Pick the label with the highest score.
+        with torch.no_grad():
+            logits = self.model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"], metrics=metrics_tensor)
+            probs = torch.nn.functional.softmax(logits, dim=1)
+            confidence, predicted_class = torch.max(probs, dim=1)
+
+        # The response shows the raw (not normalized) metrics
+        return [
+            ("Bot" if cls == 1 else "Human", round(conf * 100, 2), dict(zip(METRIC_KEYS, row.tolist())))
+            for cls, conf, row in zip(predicted_class.tolist(), confidence.tolist(), raw_metrics)
+        ]
+
+    def predict(self, text):
+        return self.predict_batch([text])[0]
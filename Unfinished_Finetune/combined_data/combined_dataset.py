@@ -1,14 +1,21 @@
+import os
+import sys
 import torch
 from torch.utils.data import Dataset
 
+# The token cache is shared with the main fine-tuning scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tweetbot", "fine_tune"))
+from token_cache import TokenCache
+
 # Create a custom dataset holds the tokenized tweets and metrics
 class CombinedDataset(Dataset):
-    # Tokenize the tweet text.
+    # Tokenize the tweet text once into a memory-mapped cache (see tweetbot/fine_tune/token_cache.py),
+    #  later runs on the same data skip tokenization and batches are padded in pad_collate.
     # Convert the metrics and labels into tensors. 
     #  PyTorch models only work with tensors
     #  Tensors are a ML data structure that extend vectors and matrices to higher dimensions.
-    def __init__(self, texts, metrics, labels, tokenizer):
-        self.encodings = tokenizer(texts.tolist(), truncation=True, padding=True, max_length=128, return_tensors="pt")
+    def __init__(self, texts, metrics, labels, tokenizer, cache_dir="token_cache"):
+        self.tokens = TokenCache(cache_dir).load_or_build(texts.tolist(), tokenizer, max_length=128)
         self.metrics = torch.tensor(metrics.values, dtype=torch.float32)
         self.labels = torch.tensor(labels.values)
 
@@ -18,11 +25,11 @@ class CombinedDataset(Dataset):
         return len(self.labels)
 
     # Return one tweet from the dataset with all the necessary information:
-    #  the tokenization ID, mask to ignore padding, metrics, the bot or human label
+    #  the tokenization IDs (unpadded), metrics, the bot or human label.
+    #  The mask to ignore padding is made per batch by pad_collate.
     def __getitem__(self, idx):
         return {
-            "input_ids": self.encodings["input_ids"][idx],
-            "attention_mask": self.encodings["attention_mask"][idx],
+            "input_ids": self.tokens[idx],
             "metrics": self.metrics[idx],
             "labels": self.labels[idx]
         }
\ No newline at end of file
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from tqdm import tqdm
+
+# The token cache is shared with the main fine-tuning scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tweetbot", "fine_tune"))
+from token_cache import pad_collate
+
+# When only the classifier head is being trained, BERT's output for a tweet never changes,
+# so we run the encoder over the dataset once and keep every CLS vector on disk:
+#
+#   <cache_dir>/<key>.f16        [tweets, 768] float16, memory-mapped
+#   <cache_dir>/<key>.json       shape and what the cache was built from
+#
+# The key combines the encoder name with the dataset's token cache key, so the same
+# tweets tokenized the same way always reuse the same embeddings (training and evaluation).
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir="embedding_cache"):
+        self.cache_dir = cache_dir
+
+    def load_or_build(self, dataset, model, device, encoder_name="bert-base-uncased", batch_size=64):
+        key = hashlib.sha256(f"{encoder_name}:{os.path.basename(dataset.tokens.path)}".encode("utf-8")).hexdigest()[:24]
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.exists(path + ".json"):
+            self._build(path, dataset, model, device, encoder_name, batch_size)
+        else:
+            print(f"Using cached embeddings from {path}.f16")
+
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        return np.memmap(path + ".f16", dtype=np.float16, mode="r", shape=tuple(meta["shape"]))
+
+    def _build(self, path, dataset, model, device, encoder_name, batch_size):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        hidden_size = model.bert.config.hidden_size
+        shape = (len(dataset), hidden_size)
+        tmp_path = f"{path}.f16.tmp"
+        embeddings = np.memmap(tmp_path, dtype=np.float16, mode="w+", shape=shape)
+
+        # Length-sorted batches pad very little, and since rows are written back by index
+        # the order we encode in doesn't matter
+        order = np.argsort(dataset.tokens.lengths, kind="stable")
+        batches = [order[i:i + batch_size].tolist() for i in range(0, len(order), batch_size)]
+        loader = DataLoader(dataset, batch_sampler=batches, collate_fn=pad_collate)
+
+        model.eval()
+        with torch.inference_mode():
+            for indices, batch in zip(batches, tqdm(loader, desc="Encoding")):
+                cls_output = model.encode(batch["input_ids"].to(device), batch["attention_mask"].to(device))
+                embeddings[indices] = cls_output.float().cpu().numpy().astype(np.float16)
+
+        embeddings.flush()
+        del embeddings
+        os.replace(tmp_path, path + ".f16")
+        with open(path + ".json", "w") as f:
+            json.dump({"shape": list(shape), "encoder": encoder_name, "tokens": dataset.tokens.path}, f)
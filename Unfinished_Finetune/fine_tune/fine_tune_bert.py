@@ -1,6 +1,9 @@
+import argparse
+import numpy as np
 import pandas as pd
 import torch
 import os
+import sys
 from torch.utils.data import DataLoader
 from transformers import BertTokenizer, AdamW
 from sklearn.model_selection import train_test_split
@@ -8,27 +11,46 @@ from sklearn.metrics import classification_report, precision_recall_fscore_suppo
 from tqdm import tqdm
 from model.bert_with_metrics import BertWithMetrics
 from combined_data.combined_dataset import CombinedDataset
+from combined_data.embedding_cache import EmbeddingCache
+from model.feature_spec import FeatureSpec
+from model.metric_features import METRIC_KEYS
+
+# The table reader and token cache are shared with the main pipeline
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tweetbot", "processing"))
+from columnar import read_table
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tweetbot", "fine_tune"))
+from token_cache import pad_collate
+
+# --freeze-encoder keeps BERT as it is and only trains the small classifier head.
+#  BERT runs once over the dataset, its CLS vectors are saved to disk (float16, memory-mapped)
+#  and the head trains straight from them, which takes seconds instead of hours.
+#  Evaluation reuses the saved vectors too.
+parser = argparse.ArgumentParser(description="Fine-tune BertWithMetrics on the preprocessed tweets")
+parser.add_argument("--freeze-encoder", action="store_true", help="train only the head on cached CLS embeddings")
+parser.add_argument("--embedding-cache", default="embedding_cache", help="where the CLS embeddings are stored")
+parser.add_argument("--head-epochs", type=int, default=20)
+parser.add_argument("--head-batch-size", type=int, default=256)
+parser.add_argument("--head-lr", type=float, default=1e-3)
+parser.add_argument("--human-data", default="preprocessed_human_limited_1000_per_user.csv", help=".csv, .parquet or .arrow")
+parser.add_argument("--bot-data", default="preprocessed_bots_limited_1000_per_user.csv", help=".csv, .parquet or .arrow")
+args = parser.parse_args()
 
 # Read in the preprocessed data (one for human, one for bots).
 # Add a new column to each csv: 0 = human, 1 = bot.
 # Combine both data sets and shuffle the rows up.
-df_human = pd.read_csv("preprocessed_human_limited_1000_per_user.csv")
-df_bot = pd.read_csv("preprocessed_bots_limited_1000_per_user.csv")
+# Only the text and the metric columns are read (with Parquet/Arrow the rest is never touched).
+df_human = read_table(args.human_data, columns=["Tweet_text"] + METRIC_KEYS)
+df_bot = read_table(args.bot_data, columns=["Tweet_text"] + METRIC_KEYS)
 df_human["label"] = 0
 df_bot["label"] = 1
 df = pd.concat([df_human, df_bot]).sample(frac=1, random_state=42).reset_index(drop=True)
 
 # Grab the tweet text as strings to be tokenized later. 
-# Define the list of metric columns made during the preprocess.
+# The list of metric columns made during the preprocess lives in model/metric_features.py
+#  so the backend uses exactly the same columns in the same order.
 # Extract the metric values and label value.
 text_col = df["Tweet_text"].astype(str)
-metric_cols = [
-    "char_count", "word_count", "question_count", "exclamation_count", "hashtag_count",
-    "mention_count", "link_count", "polarity", "subjectivity",
-    "noun_ratio", "verb_ratio", "adj_ratio", "adv_ratio", "pron_ratio",
-    "unique_word_ratio", "stopword_count"
-]
-metrics = df[metric_cols]
+metrics = df[METRIC_KEYS]
 labels = df["label"]
 
 # We let the model train on 80% of the data and test itself on the other 20%.
@@ -36,15 +58,21 @@ train_texts, val_texts, train_metrics, val_metrics, train_labels, val_labels = t
     text_col, metrics, labels, test_size=0.2, random_state=42
 )
 
+# Learn how to scale each metric from the training data only (mean/std).
+# The same spec is saved with the model so the backend scales its metrics identically.
+feature_spec = FeatureSpec.fit(train_metrics.values)
+train_metrics = pd.DataFrame(feature_spec.transform(train_metrics.values), columns=METRIC_KEYS)
+val_metrics = pd.DataFrame(feature_spec.transform(val_metrics.values), columns=METRIC_KEYS)
+
 # Tokenize the tweets so BERT understands.
 tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
 
 # Wrap the text, metrics, and labels into our CombinedDataset class.
-# 'DataLoader' will feed the data in small batches of 8.
+# 'DataLoader' will feed the data in small batches of 8, each padded only to its longest tweet.
 train_dataset = CombinedDataset(train_texts, train_metrics, train_labels, tokenizer)
 val_dataset = CombinedDataset(val_texts, val_metrics, val_labels, tokenizer)
-train_loader = DataLoader(train_dataset, batch_size=8, shuffle=True)
-val_loader = DataLoader(val_dataset, batch_size=8)
+train_loader = DataLoader(train_dataset, batch_size=8, shuffle=True, collate_fn=pad_collate)
+val_loader = DataLoader(val_dataset, batch_size=8, collate_fn=pad_collate)
 
 # Initialize our custom BERT model and how many metrics there are.
 # Pick the GPU if available (cause its faster) if not just use CPU.
@@ -58,48 +86,91 @@ model.to(device)
 optimizer = AdamW(model.parameters(), lr=2e-5)
 criterion = torch.nn.CrossEntropyLoss()
 
-# Training!!!
-# Epoch means loop so we are going through the training process 3 times.
-# We go through all the training data one batch at a time, tokenize the text,tell BERT 
-#  which parts of the input to ignore, and add our metrics and human/bot labels. 
-# Starting from 'optimizer' we reset the past learning steps (gradients), make a
-#  prediction, calculate the error (loss), figure out how to adjust the model(backpropagation),
-#  and then apply those adjustments. 
-model.train()
-for epoch in range(3):
-    print(f"\nEpoch {epoch+1}")
-    for batch in tqdm(train_loader):
-        input_ids = batch["input_ids"].to(device)
-        attention_mask = batch["attention_mask"].to(device)
-        metrics = batch["metrics"].to(device)
-        labels = batch["labels"].to(device)
-
-        optimizer.zero_grad()
-        logits = model(input_ids=input_ids, attention_mask=attention_mask, metrics=metrics)
-        loss = criterion(logits, labels)
-        loss.backward()
-        optimizer.step()
-
-# Evaluation!!!
-# Switch the model to evaluation mode.
-# Store the true and predicted labels.
-# We repeat the same steps from training but without adjusting the model.
-# Starting from 'predictions' choose the label with the highest score.
-# Store the true and predicted labels. 
-model.eval()
-y_true, y_pred = [], []
-
-with torch.no_grad():
-    for batch in val_loader:
-        input_ids = batch["input_ids"].to(device)
-        attention_mask = batch["attention_mask"].to(device)
-        metrics = batch["metrics"].to(device)
-        labels = batch["labels"].to(device)
-
-        logits = model(input_ids=input_ids, attention_mask=attention_mask, metrics=metrics)
-        predictions = torch.argmax(logits, dim=1)
-        y_true.extend(labels.cpu().numpy())
-        y_pred.extend(predictions.cpu().numpy())
+# Frozen-encoder mode!!!
+# Get the CLS vector of every tweet once (or load it from disk if we already have it).
+# Each epoch we shuffle the tweets, take a batch of saved vectors and metrics, and
+#  train only the classifier head on them.
+# For evaluation we run the head over the saved validation vectors.
+def head_batches(embeddings, dataset, indices, batch_size):
+    for start in range(0, len(indices), batch_size):
+        idx = np.sort(indices[start:start + batch_size])
+        yield (
+            torch.from_numpy(np.asarray(embeddings[idx], dtype=np.float32)).to(device),
+            dataset.metrics[idx].to(device),
+            dataset.labels[idx].to(device)
+        )
+
+if args.freeze_encoder:
+    embedding_cache = EmbeddingCache(args.embedding_cache)
+    train_embeddings = embedding_cache.load_or_build(train_dataset, model, device)
+    val_embeddings = embedding_cache.load_or_build(val_dataset, model, device)
+
+    head_optimizer = torch.optim.AdamW(model.classifier.parameters(), lr=args.head_lr)
+    model.train()
+    rng = np.random.default_rng(42)
+    for epoch in range(args.head_epochs):
+        epoch_loss = 0.0
+        for cls_output, metrics, labels in head_batches(
+                train_embeddings, train_dataset, rng.permutation(len(train_dataset)), args.head_batch_size):
+            head_optimizer.zero_grad()
+            loss = criterion(model.classify(cls_output, metrics), labels)
+            loss.backward()
+            head_optimizer.step()
+            epoch_loss += loss.item() * len(labels)
+        print(f"Head epoch {epoch+1}: loss {epoch_loss / len(train_dataset):.4f}")
+
+    model.eval()
+    y_true, y_pred = [], []
+    with torch.no_grad():
+        for cls_output, metrics, labels in head_batches(
+                val_embeddings, val_dataset, np.arange(len(val_dataset)), args.head_batch_size):
+            predictions = torch.argmax(model.classify(cls_output, metrics), dim=1)
+            y_true.extend(labels.cpu().numpy())
+            y_pred.extend(predictions.cpu().numpy())
+
+else:
+    # Training!!!
+    # Epoch means loop so we are going through the training process 3 times.
+    # We go through all the training data one batch at a time, tokenize the text,tell BERT 
+    #  which parts of the input to ignore, and add our metrics and human/bot labels. 
+    # Starting from 'optimizer' we reset the past learning steps (gradients), make a
+    #  prediction, calculate the error (loss), figure out how to adjust the model(backpropagation),
+    #  and then apply those adjustments. 
+    model.train()
+    for epoch in range(3):
+        print(f"\nEpoch {epoch+1}")
+        for batch in tqdm(train_loader):
+            input_ids = batch["input_ids"].to(device)
+            attention_mask = batch["attention_mask"].to(device)
+            metrics = batch["metrics"].to(device)
+            labels = batch["labels"].to(device)
+
+            optimizer.zero_grad()
+            logits = model(input_ids=input_ids, attention_mask=attention_mask, metrics=metrics)
+            loss = criterion(logits, labels)
+            loss.backward()
+            optimizer.step()
+
+    # Evaluation!!!
+    # Switch the model to evaluation mode.
+    # Store the true and predicted labels.
+    # We repeat the same steps from training but without adjusting the model.
+    # Starting from 'predictions' choose the label with the highest score.
+    # Store the true and predicted labels. 
+    model.eval()
+    y_true, y_pred = [], []
+
+    with torch.no_grad():
+        for batch in val_loader:
+            input_ids = batch["input_ids"].to(device)
+            attention_mask = batch["attention_mask"].to(device)
+            metrics = batch["metrics"].to(device)
+            labels = batch["labels"].to(device)
+
+            logits = model(input_ids=input_ids, attention_mask=attention_mask, metrics=metrics)
+            predictions = torch.argmax(logits, dim=1)
+            y_true.extend(labels.cpu().numpy())
+            y_pred.extend(predictions.cpu().numpy())
 
 # Show how well the model performed 
 print("\nClassification Report:")
@@ -107,9 +178,11 @@ print(classification_report(y_true, y_pred, target_names=["Human", "Bot"]))
 
 # Save the model!!!
 # Create a folder to save the model if it doesn't exist yet.
-# Save the newly trained model.
+# Save the newly trained weights where the backend loads them (pytorch_model.bin).
+# Save the metric feature spec the backend needs to scale metrics the same way.
 # Save the tokenization for the Flask frontend.
 model_dir = "bert-twitterbot-detector"
 os.makedirs(model_dir, exist_ok=True)
-model.save_pretrained(model_dir)
+torch.save(model.state_dict(), os.path.join(model_dir, "pytorch_model.bin"))
+feature_spec.save(os.path.join(model_dir, "feature_spec.json"))
 tokenizer.save_pretrained(model_dir)
\ No newline at end of file
@@ -32,9 +32,17 @@ class BertWithMetrics(nn.Module):
     # Apply drop out to avoid memorizing exact patterns from training data
     # Send everything back too the final decision and return that answer
     def forward(self, input_ids, attention_mask, metrics):
+        return self.classify(self.encode(input_ids, attention_mask), metrics)
+
+    # The expensive half: the BERT encoder, returning the CLS vector of every tweet.
+    #  In frozen-encoder training this runs once and the vectors are saved to disk.
+    def encode(self, input_ids, attention_mask):
         outputs = self.bert(input_ids=input_ids, attention_mask=attention_mask)
-        cls_output = outputs.last_hidden_state[:, 0, :]  # CLS token
+        return outputs.last_hidden_state[:, 0, :]  # CLS token
+
+    # The cheap half: the classifier head over the CLS vector plus the metrics
+    def classify(self, cls_output, metrics):
         combined = torch.cat((cls_output, metrics), dim=1)
         combined = self.dropout(combined)
         logits = self.classifier(combined)
-        return logits
\ No newline at end of file
+        return logits
@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+
+from model.metric_features import METRIC_KEYS
+
+
+# The metric columns and their normalization, saved next to the model at training time
+# (feature_spec.json) and loaded by the backend. Serving refuses to run if its metric
+# columns don't match the ones the model was trained with, and both sides scale the
+# metrics with the same training-set mean and standard deviation.
+class FeatureSpec:
+    def __init__(self, keys, mean, std):
+        self.keys = list(keys)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+
+    # Learn the mean/std from the training metrics (a [rows, 16] array)
+    @staticmethod
+    def fit(matrix, keys=METRIC_KEYS):
+        matrix = np.asarray(matrix, dtype=np.float64)
+        std = matrix.std(axis=0)
+        # Constant columns would divide by zero, leave them unscaled
+        std[std == 0] = 1.0
+        return FeatureSpec(keys, matrix.mean(axis=0), std)
+
+    def transform(self, matrix):
+        return ((np.asarray(matrix, dtype=np.float32) - self.mean) / self.std).astype(np.float32)
+
+    def check_keys(self, keys=METRIC_KEYS):
+        if list(keys) != self.keys:
+            raise ValueError(f"Metric columns {list(keys)} don't match the model's feature spec {self.keys}")
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"keys": self.keys, "mean": self.mean.tolist(), "std": self.std.tolist()}, f, indent=2)
+
+    @staticmethod
+    def load(path):
+        with open(path) as f:
+            spec = json.load(f)
+        return FeatureSpec(spec["keys"], spec["mean"], spec["std"])
@@ -0,0 +1,53 @@
+import re
+from collections import Counter
+
+import numpy as np
+from textblob import TextBlob
+
+# The 16 metrics like they are in our preprocessed data, in the order the model sees them.
+# These are the same definitions as tweetbot/processing/preprocess.py, so metrics made
+# while serving match the ones the model was trained on.
+METRIC_KEYS = [
+    "char_count", "word_count", "question_count", "exclamation_count", "hashtag_count",
+    "mention_count", "link_count", "polarity", "subjectivity",
+    "noun_ratio", "verb_ratio", "adj_ratio", "adv_ratio", "pron_ratio",
+    "unique_word_ratio", "stopword_count"
+]
+
+STOP_WORDS = set(["the", "and", "is", "in", "to", "a", "of", "it", "on", "for"])
+WORD_PATTERN = re.compile(r"\b\w+\b")
+POS_TAGS = ["NOUN", "VERB", "ADJ", "ADV", "PRON"]
+
+
+# Fill one row of the metric matrix from a tweet and its spaCy doc
+def fill_metrics_row(row, text, doc):
+    lower_text = text.lower()
+    row[0] = len(text)
+    row[1] = len(text.split())
+    row[2] = text.count("?")
+    row[3] = text.count("!")
+    row[4] = text.count("#")
+    row[5] = text.count("@")
+    row[6] = lower_text.count("http") + lower_text.count("www.")
+
+    sentiment = TextBlob(text).sentiment
+    row[7] = sentiment.polarity
+    row[8] = sentiment.subjectivity
+
+    pos_counts = Counter(token.pos_ for token in doc)
+    total_tokens = len(doc)
+    for i, pos in enumerate(POS_TAGS):
+        row[9 + i] = pos_counts.get(pos, 0) / total_tokens if total_tokens > 0 else 0
+
+    words = WORD_PATTERN.findall(lower_text)
+    row[14] = len(set(words)) / len(words) if words else 0
+    row[15] = sum(1 for word in words if word in STOP_WORDS)
+
+
+# Metrics for a whole batch of tweets as one [len(texts), 16] float32 array.
+# spaCy tags the batch with nlp.pipe instead of once per tweet.
+def extract_metric_matrix(texts, nlp, batch_size=64):
+    matrix = np.zeros((len(texts), len(METRIC_KEYS)), dtype=np.float32)
+    for row, text, doc in zip(matrix, texts, nlp.pipe(texts, batch_size=batch_size)):
+        fill_metrics_row(row, text, doc)
+    return matrix
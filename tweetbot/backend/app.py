@@ -1,72 +1,183 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import torch
-from transformers import BertTokenizer, BertForSequenceClassification
 import os
 
+from components import components, model_backend, predict_text, predict_texts, render_metrics, score_account
+from services.batch_predict_service import BatchPredictService
+from services.evaluation_report_service import EvaluationReportService
+from services.instrumentation_service import Instrumentation
 from services.random_tweet_service import RandomTweetService
-from services.text_metrics_service import TextMetricsService
 
 # Initialize Flask
 app = Flask(__name__)
 CORS(app)
 
-# Define the path to the pretrained BERT model and tokenizer
-model_path = os.path.join(os.path.dirname(__file__), "bert-twitterbot-detector")
-tokenizer = BertTokenizer.from_pretrained(model_path)
-model = BertForSequenceClassification.from_pretrained(model_path)
+# EVAL_RESULTS points at the reports fine_tune/evaluate.py appends to
+eval_results_path = os.environ.get("EVAL_RESULTS") or os.path.join(
+    os.path.dirname(__file__), "..", "fine_tune", "results", "eval_history.jsonl"
+)
+
+# Send "X-Profile: 1" with a request to get its per-stage timings (ms) back under "profile"
+def wants_profile():
+    return request.headers.get("X-Profile", "").lower() in ("1", "true")
 
 @app.route("/predict", methods=["POST"])
 def predict():
-    # Get JSON data from request 
-    data = request.get_json()
-    text = data.get("text", "")
+    with Instrumentation.track_request("predict", wants_profile()) as profile:
+        # Get JSON data from request 
+        data = request.get_json()
+        text = data.get("text", "")
 
-    # Tokenization for BERT to understand
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        probs = torch.nn.functional.softmax(outputs.logits, dim=1)
-        confidence, predicted_class = torch.max(probs, dim=1)
+        # Get the label (bot or human), confidence % and text metrics
+        label, confidence_percent, metrics, stage = predict_text(text)
 
-    # Interpret prediction (if label is bot or human, and confidence %)
-    label = "Bot" if predicted_class.item() == 1 else "Human"
-    confidence_percent = round(confidence.item() * 100, 2)
-    metrics = TextMetricsService.extract_feature_metrics(text)
+        result = {
+            "prediction": label,
+            "confidence": confidence_percent,
+            "stage": stage,
+            "metrics": metrics,
+            "text": text
+        }
 
     # Return prediction results
-    return jsonify({
-        "prediction": label,
-        "confidence": confidence_percent,
-        "metrics": metrics,
-        "text": text
-    })
+    if profile is not None:
+        result["profile"] = profile
+    return jsonify(result)
 
 @app.route("/random-predict", methods=["GET"])
 def random_predict():
-    # Get a random tweet and its true label (bot/human)
-    tweet, actual_origin = RandomTweetService.get_random_tweet()
+    with Instrumentation.track_request("random-predict", wants_profile()) as profile:
+        # Get a random tweet and its true label (bot/human)
+        tweet, actual_origin = RandomTweetService.get_random_tweet()
 
-    # Just like /predict, this is tokenization for BERT to understand
-    inputs = tokenizer(tweet, return_tensors="pt", truncation=True, padding=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        probs = torch.nn.functional.softmax(outputs.logits, dim=1)
-        confidence, predicted_class = torch.max(probs, dim=1)
+        # Just like /predict, this goes through the cache and the batching queue
+        prediction_label, confidence_percent, metrics, stage = predict_text(tweet)
 
-    # Just like /predict, this interprets the prediction (if label is bot or human, and confidence %)
-    prediction_label = "Bot" if predicted_class.item() == 1 else "Human"
-    confidence_percent = round(confidence.item() * 100, 2)
-    metrics = TextMetricsService.extract_feature_metrics(tweet)
+        result = {
+            "prediction": prediction_label,
+            "confidence": confidence_percent,
+            "stage": stage,
+            "metrics": metrics,
+            "text": tweet,
+            "actual_origin": actual_origin
+        }
 
     # Return prediction results
-    return jsonify({
-        "prediction": prediction_label,
-        "confidence": confidence_percent,
-        "metrics": metrics,
-        "text": tweet,
-        "actual_origin": actual_origin
-    })
+    if profile is not None:
+        result["profile"] = profile
+    return jsonify(result)
+
+@app.route("/predict-batch", methods=["POST"])
+def predict_batch():
+    # Bulk classification for ingestion jobs.
+    #  Body: a JSON array, or NDJSON (one item per line) for very large uploads.
+    #  Items: "text" or {"text": "...", "metrics": false} to skip the text metrics.
+    #  ?metrics=false turns metrics off for every item that doesn't say otherwise.
+    # Every item goes through the same cache, duplicate index, cascade and model as /predict,
+    # a chunk at a time, and its line says which "stage" answered.
+    default_metrics = request.args.get("metrics", "true").lower()
+    if default_metrics not in ("true", "false"):
+        return jsonify({"error": "metrics must be true or false"}), 400
+    default_metrics = default_metrics == "true"
+    chunk_size = request.args.get("chunk_size", "32")
+    if not chunk_size.isdigit() or int(chunk_size) < 1:
+        return jsonify({"error": "chunk_size must be a positive integer"}), 400
+    chunk_size = int(chunk_size)
+
+    if request.mimetype == "application/json":
+        data = request.get_json()
+        if not isinstance(data, list):
+            return jsonify({"error": "expected a JSON array of texts"}), 400
+        items = BatchPredictService.iter_json_array(data, default_metrics)
+    else:
+        items = BatchPredictService.iter_ndjson(request.stream, default_metrics)
+
+    # Results are streamed back one NDJSON line per tweet as each chunk finishes
+    results = BatchPredictService.stream_predictions(items, predict_texts, chunk_size=chunk_size)
+    return Response(stream_with_context(results), mimetype="application/x-ndjson")
+
+@app.route("/inference-stats", methods=["GET"])
+def inference_stats():
+    # Batch-size and queue-wait statistics from the micro-batching engine
+    return jsonify(components.inference.stats())
+
+@app.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    # Hit/miss/eviction counters of the prediction cache
+    return jsonify(components.prediction_cache.stats())
+
+@app.route("/cascade-stats", methods=["GET"])
+def cascade_stats():
+    # Uncertainty band and how many predictions the cheap model and BERT decided (404 when the cascade is off)
+    if not components.cascade:
+        return jsonify({"error": "cascade is off, set CASCADE_MODEL"}), 404
+    return jsonify(components.cascade.stats())
+
+@app.route("/duplicate-lookup", methods=["POST"])
+def duplicate_lookup():
+    # The near-duplicate template a text belongs to (cluster id, size, bot/human counts), no model call.
+    # A big bot-labelled cluster is a bot signal on its own.
+    if not components.duplicates:
+        return jsonify({"error": "near-duplicate index is off, set DUPLICATE_INDEX"}), 404
+    data = request.get_json()
+    text = data.get("text", "") if data else ""
+    if not text:
+        return jsonify({"error": "missing text"}), 400
+    _, match = components.duplicates.lookup(text)
+    return jsonify({"match": match, "index": components.duplicates.stats()})
+
+@app.route("/account-score", methods=["POST"])
+def account_score():
+    # Add an account's new tweets to its running score and return the account-level verdict.
+    #  Body: {"account": "<Twitter_User_Name>", "tweets": ["...", ...]} (or "text" for one tweet)
+    data = request.get_json() or {}
+    account = data.get("account")
+    tweets = data.get("tweets") or ([data["text"]] if data.get("text") else [])
+    if not account or not isinstance(tweets, list):
+        return jsonify({"error": "expected an account and a list of tweets"}), 400
+    with Instrumentation.track_request("account_score"):
+        summary = score_account(account, [tweet for tweet in tweets if tweet])
+    if summary is None:
+        return jsonify({"error": f"no tweets for account {account}"}), 404
+    return jsonify(summary)
+
+@app.route("/account-score/<path:account>", methods=["GET"])
+def account_summary(account):
+    # The current score of an account, without adding tweets
+    summary = components.accounts.get(account)
+    if summary is None:
+        return jsonify({"error": f"no tweets for account {account}"}), 404
+    return jsonify(summary)
+
+@app.route("/model-performance", methods=["GET"])
+def model_performance():
+    # Quality and speed of the evaluated checkpoints (see fine_tune/evaluate.py), for the Model Performance view
+    report = EvaluationReportService.load(eval_results_path)
+    if report is None:
+        return jsonify({"error": "no evaluation results yet, run fine_tune/evaluate.py"}), 404
+    return jsonify(report)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Prometheus scrape endpoint: per-stage latency histograms, request counts,
+    # in-flight requests, model memory and cache stats
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the process is up and answering
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    # Readiness: the warm-up loaded the tokenizer, model and random-tweet corpora and ran a dummy prediction
+    ready = components.ready
+    return jsonify({"ready": ready, "backend": model_backend, "pid": os.getpid()}), 200 if ready else 503
+
+@app.route("/startup", methods=["GET"])
+def startup():
+    # How long each component took to load and how long until this worker was ready
+    return jsonify(components.startup_report())
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from components import components, model_backend, predict_text, render_metrics, score_account
+from services.evaluation_report_service import EvaluationReportService
+from services.instrumentation_service import Instrumentation
+from services.random_tweet_service import RandomTweetService
+
+# Asyncio serving mode: the same API as app.py, but requests never hold a thread
+# while they wait. Model and metrics work runs in a bounded thread pool, and:
+#  - when a client disconnects, its request is cancelled. If the work is still
+#    waiting in the pool it is dropped without ever running.
+#  - when too much work is waiting, new requests get 429 (above --max-queue) or
+#    503 (above --shed-queue) with a Retry-After header, instead of piling up latency.
+#
+# Usage (from the backend folder):
+#   python async_app.py --port 5000 --workers 8 --max-queue 64
+
+# EVAL_RESULTS points at the reports fine_tune/evaluate.py appends to
+eval_results_path = os.environ.get("EVAL_RESULTS") or os.path.join(
+    os.path.dirname(__file__), "..", "fine_tune", "results", "eval_history.jsonl"
+)
+
+
+class WorkQueue:
+    def __init__(self, workers, max_queue, shed_queue):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.shed_queue = shed_queue
+        self.depth = 0
+        self.cancelled = 0
+        self.rejected = 0
+        # Moving average of how long one piece of work takes, for Retry-After
+        self.avg_seconds = 0.05
+
+    # Seconds until the current backlog should have drained
+    def retry_after(self):
+        return max(1, math.ceil(self.depth * self.avg_seconds / self.workers))
+
+    def overloaded_response(self):
+        if self.depth >= self.shed_queue:
+            status, reason = 503, "server overloaded"
+        elif self.depth >= self.max_queue:
+            status, reason = 429, "too many requests"
+        else:
+            return None
+        self.rejected += 1
+        return web.json_response(
+            {"error": reason, "queue_depth": self.depth},
+            status=status,
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.avg_seconds = 0.9 * self.avg_seconds + 0.1 * (time.perf_counter() - started)
+
+    # Run fn in the pool. If the request is cancelled (client went away) while fn is
+    # still queued, cancelling the asyncio future also cancels the pool's future.
+    # fn runs in a copy of the caller's context so stage timings reach the request's profile.
+    async def run(self, fn, *args):
+        self.depth += 1
+        try:
+            context = contextvars.copy_context()
+            return await asyncio.wrap_future(self.executor.submit(context.run, self._timed, fn, *args))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.depth -= 1
+
+    def stats(self):
+        return {
+            "queue_depth": self.depth,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "shed_queue": self.shed_queue,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "avg_work_ms": round(self.avg_seconds * 1000, 3)
+        }
+
+
+# The React frontend runs on another port, so every response needs CORS headers
+@web.middleware
+async def cors_middleware(request, handler):
+    if request.method == "OPTIONS":
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type, X-Profile"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    return response
+
+
+def wants_profile(request):
+    return request.headers.get("X-Profile", "").lower() in ("1", "true")
+
+
+# The request's JSON object, or None when the body is not valid JSON or not an object
+async def json_body(request):
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def bad_body_response():
+    return web.json_response({"error": "request body must be a JSON object"}, status=400)
+
+
+async def predict(request):
+    queue = request.app["queue"]
+    overloaded = queue.overloaded_response()
+    if overloaded is not None:
+        return overloaded
+
+    data = await json_body(request)
+    if data is None:
+        return bad_body_response()
+
+    with Instrumentation.track_request("predict", wants_profile(request)) as profile:
+        text = data.get("text", "")
+        label, confidence_percent, metrics, stage = await queue.run(predict_text, text)
+
+        result = {
+            "prediction": label,
+            "confidence": confidence_percent,
+            "stage": stage,
+            "metrics": metrics,
+            "text": text
+        }
+
+    if profile is not None:
+        result["profile"] = profile
+    return web.json_response(result)
+
+
+async def random_predict(request):
+    queue = request.app["queue"]
+    overloaded = queue.overloaded_response()
+    if overloaded is not None:
+        return overloaded
+
+    with Instrumentation.track_request("random-predict", wants_profile(request)) as profile:
+        # Picking the tweet reads the dataset, which must not block the event loop
+        tweet, actual_origin = await queue.run(RandomTweetService.get_random_tweet)
+        prediction_label, confidence_percent, metrics, stage = await queue.run(predict_text, tweet)
+
+        result = {
+            "prediction": prediction_label,
+            "confidence": confidence_percent,
+            "stage": stage,
+            "metrics": metrics,
+            "text": tweet,
+            "actual_origin": actual_origin
+        }
+
+    if profile is not None:
+        result["profile"] = profile
+    return web.json_response(result)
+
+
+async def duplicate_lookup(request):
+    if not components.duplicates:
+        return web.json_response({"error": "near-duplicate index is off, set DUPLICATE_INDEX"}, status=404)
+    queue = request.app["queue"]
+    overloaded = queue.overloaded_response()
+    if overloaded is not None:
+        return overloaded
+
+    data = await json_body(request)
+    if data is None:
+        return bad_body_response()
+    text = data.get("text", "")
+    if not text:
+        return web.json_response({"error": "missing text"}, status=400)
+    _, match = await queue.run(components.duplicates.lookup, text)
+    return web.json_response({"match": match, "index": components.duplicates.stats()})
+
+
+async def account_score(request):
+    queue = request.app["queue"]
+    overloaded = queue.overloaded_response()
+    if overloaded is not None:
+        return overloaded
+
+    data = await json_body(request)
+    if data is None:
+        return bad_body_response()
+    account = data.get("account")
+    tweets = data.get("tweets") or ([data["text"]] if data.get("text") else [])
+    if not account or not isinstance(tweets, list):
+        return web.json_response({"error": "expected an account and a list of tweets"}, status=400)
+    with Instrumentation.track_request("account_score"):
+        summary = await queue.run(score_account, account, [tweet for tweet in tweets if tweet])
+    if summary is None:
+        return web.json_response({"error": f"no tweets for account {account}"}, status=404)
+    return web.json_response(summary)
+
+
+async def account_summary(request):
+    summary = components.accounts.get(request.match_info["account"])
+    if summary is None:
+        return web.json_response({"error": "no tweets for this account"}, status=404)
+    return web.json_response(summary)
+
+
+async def model_performance(request):
+    report = EvaluationReportService.load(eval_results_path)
+    if report is None:
+        return web.json_response({"error": "no evaluation results yet, run fine_tune/evaluate.py"}, status=404)
+    return web.json_response(report)
+
+
+async def metrics(request):
+    return web.Response(text=render_metrics(), content_type="text/plain")
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok", "pid": os.getpid()})
+
+
+async def readyz(request):
+    ready = components.ready
+    return web.json_response({"ready": ready, "backend": model_backend, "pid": os.getpid()}, status=200 if ready else 503)
+
+
+async def startup(request):
+    return web.json_response(components.startup_report())
+
+
+async def stats(request):
+    return web.json_response({
+        "queue": request.app["queue"].stats(),
+        "inference": components.inference.stats(),
+        "cache": components.prediction_cache.stats(),
+        "cascade": components.cascade.stats() if components.cascade else None,
+        "duplicates": components.duplicates.stats() if components.duplicates else None
+    })
+
+
+def create_app(workers=4, max_queue=64, shed_queue=None):
+    app = web.Application(middlewares=[cors_middleware])
+    app["queue"] = WorkQueue(workers, max_queue, shed_queue or max_queue * 2)
+    app.router.add_post("/predict", predict)
+    app.router.add_get("/random-predict", random_predict)
+    app.router.add_post("/duplicate-lookup", duplicate_lookup)
+    app.router.add_post("/account-score", account_score)
+    app.router.add_get("/account-score/{account}", account_summary)
+    app.router.add_get("/model-performance", model_performance)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    app.router.add_get("/startup", startup)
+    app.router.add_get("/async-stats", stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the bot detector API on asyncio")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8, help="threads doing model and metrics work")
+    parser.add_argument("--max-queue", type=int, default=64, help="pending requests before answering 429")
+    parser.add_argument("--shed-queue", type=int, default=None, help="pending requests before answering 503 (default 2x max-queue)")
+    args = parser.parse_args()
+
+    # handler_cancellation makes aiohttp cancel a request's handler when its client disconnects
+    web.run_app(
+        create_app(args.workers, args.max_queue, args.shed_queue),
+        host=args.host,
+        port=args.port,
+        handler_cancellation=True
+    )
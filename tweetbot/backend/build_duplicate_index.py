@@ -0,0 +1,60 @@
+import argparse
+import csv
+import os
+import sys
+import time
+
+from services.duplicate_index_service import DuplicateIndex
+from services.tweet_text import decode_tweet_text
+
+# Build the near-duplicate index (see services/duplicate_index_service.py) from the labelled
+# corpora: every human tweet is added as "Human", every bot tweet as "Bot". Running it again
+# on an existing index adds to it. The server keeps adding its own predictions afterwards.
+#
+# Usage (from the backend folder):
+#   python build_duplicate_index.py
+#   python build_duplicate_index.py --human ../preprocessed_data/preprocessed_human_limited_200_per_user.csv \
+#       --bot ../preprocessed_data/preprocessed_bots_limited_200_per_user.csv -o duplicate_index.db
+#   DUPLICATE_INDEX=duplicate_index.db python app.py
+
+
+def iter_texts(paths, label):
+    csv.field_size_limit(sys.maxsize)
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                text = decode_tweet_text(row.get("Tweet_text") or "")
+                if text:
+                    yield text, label
+
+
+def build(human_paths, bot_paths, output, threshold, top):
+    # Every template of the corpora is kept, the server only loads its max_clusters largest
+    index = DuplicateIndex(output, threshold=threshold, max_clusters=None)
+    before = index.stats()["texts"]
+    started = time.perf_counter()
+    index.add_many(iter_texts(human_paths, "Human"))
+    index.add_many(iter_texts(bot_paths, "Bot"))
+    elapsed = time.perf_counter() - started
+
+    stats = index.stats()
+    added = stats["texts"] - before
+    print(f"✅ {added} tweets indexed in {elapsed:.1f}s ({added / max(elapsed, 1e-9):.0f} tweets/sec) -> {output}")
+    print(f"{stats['clusters']} templates for {stats['texts']} tweets")
+    print(f"\n{'cluster':>8} {'size':>6} {'bots':>6} {'humans':>6}  example")
+    for cluster in index.largest(top):
+        print(f"{cluster['cluster']:>8} {cluster['size']:>6} {cluster['bots']:>6} {cluster['humans']:>6}  {cluster['example'][:70]!r}")
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(base_dir, "..", "preprocessed_data")
+    parser = argparse.ArgumentParser(description="Build the near-duplicate template index from labelled tweets")
+    parser.add_argument("--human", nargs="+", default=[os.path.join(data_dir, "preprocessed_human_limited_200_per_user.csv")])
+    parser.add_argument("--bot", nargs="+", default=[os.path.join(data_dir, "preprocessed_bots_limited_200_per_user.csv")])
+    parser.add_argument("--threshold", type=float, default=0.8, help="estimated Jaccard similarity for the same template")
+    parser.add_argument("--top", type=int, default=10, help="largest templates to print")
+    parser.add_argument("-o", "--output", default=os.path.join(base_dir, "duplicate_index.db"))
+    args = parser.parse_args()
+
+    build(args.human, args.bot, args.output, args.threshold, args.top)
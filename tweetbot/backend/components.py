@@ -0,0 +1,383 @@
+import os
+import threading
+import time
+
+from services.instrumentation_service import Instrumentation
+from services.random_tweet_service import RandomTweetService
+from services.text_metrics_service import TextMetricsService, get_nlp
+
+# Everything the API servers share: tokenizer, model backend, micro-batching engine,
+# prediction cache and predict_text(). Both app.py (Flask) and async_app.py (aiohttp)
+# serve requests from these same objects.
+#
+# Nothing heavy happens at import. torch, transformers and spaCy are imported and the
+# model is loaded the first time something needs them, so `import app` (tests, CLIs,
+# gunicorn's master) takes milliseconds instead of seconds. WARMUP decides when that is:
+#  background (default) - a thread loads everything and runs a dummy prediction right away
+#  sync                 - the same, but before the import returns (the old behaviour)
+#  off                  - every piece loads on first use; /readyz stays 503 until a warm-up ran
+WARMUP_MODES = ("background", "sync", "off")
+
+# Define the path to the pretrained BERT model and tokenizer. MODEL_PATH points it at another
+# model in the same format, e.g. the student made by fine_tune/distill_bert.py.
+model_path = os.environ.get("MODEL_PATH") or os.path.join(os.path.dirname(__file__), "bert-twitterbot-detector")
+
+# MODEL_BACKEND picks how the classifier runs on CPU: pytorch (fp32, default), int8,
+# onnx or onnx-int8. The ONNX files are made with `python export_model.py export`.
+model_backend = os.environ.get("MODEL_BACKEND", "pytorch")
+
+# CASCADE_MODEL=<path to the JSON from train_cascade.py> puts the cheap feature model in front
+# of BERT: only tweets it is unsure about (CASCADE_LOW < p(bot) < CASCADE_HIGH) reach BERT.
+cascade_model_path = os.environ.get("CASCADE_MODEL")
+
+# DUPLICATE_INDEX=<SQLite file from build_duplicate_index.py> answers near-duplicates of known
+# templates without a model call, once the template has DUPLICATE_MIN_SIZE members and at
+# least DUPLICATE_MIN_PURITY of its labelled members agree. Served predictions keep adding to it.
+duplicate_index_path = os.environ.get("DUPLICATE_INDEX")
+duplicate_min_size = int(os.environ.get("DUPLICATE_MIN_SIZE", 3))
+duplicate_min_purity = float(os.environ.get("DUPLICATE_MIN_PURITY", 0.9))
+# Templates kept in memory per worker, the oldest single-text ones are evicted first
+duplicate_max_clusters = int(os.environ.get("DUPLICATE_MAX_CLUSTERS", 100000))
+
+# Per-account running scores (/account-score). ACCOUNT_DB=<SQLite path> keeps them in one file
+# shared by every gunicorn worker, which also keeps them across restarts. Without it each
+# worker process has its own in-memory scores and only sees the tweets that reached it.
+account_db_path = os.environ.get("ACCOUNT_DB")
+
+warmup_mode = os.environ.get("WARMUP", "background")
+if warmup_mode not in WARMUP_MODES:
+    raise ValueError(f"Unknown WARMUP '{warmup_mode}', expected one of {', '.join(WARMUP_MODES)}")
+
+_imported_at = time.perf_counter()
+
+
+class Components:
+    def __init__(self):
+        # Reentrant because building the inference engine loads the tokenizer and backend
+        self._lock = threading.RLock()
+        self._loaded = {}
+        self.load_seconds = {}
+        self.warmup_state = "not started"
+        self.ready_after_seconds = None
+
+    # Build a component once, under the lock, and remember how long it took
+    def _get(self, name, build):
+        value = self._loaded.get(name)
+        if value is not None:
+            return value
+        with self._lock:
+            if name not in self._loaded:
+                started = time.perf_counter()
+                self._loaded[name] = build()
+                self.load_seconds[name] = time.perf_counter() - started
+            return self._loaded[name]
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    # What /readyz reports for both servers: the warm-up ran and the random-tweet corpora have tweets
+    @property
+    def ready(self):
+        return self.warmup_state == "done" and all(len(corpus) > 0 for corpus in RandomTweetService.corpora.values())
+
+    @property
+    def tokenizer(self):
+        def build():
+            from transformers import BertTokenizer
+            return BertTokenizer.from_pretrained(model_path)
+        return self._get("tokenizer", build)
+
+    @property
+    def backend(self):
+        def build():
+            from services.model_backends import load_backend
+            return load_backend(model_path, model_backend)
+        return self._get("backend", build)
+
+    # Concurrent requests are grouped into micro-batches before they reach the model.
+    # Tune these for throughput vs. p99 latency and watch /inference-stats.
+    @property
+    def inference(self):
+        def build():
+            from services.inference_service import InferenceService
+            return InferenceService(
+                self.tokenizer,
+                self.backend,
+                max_batch_size=int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", 32)),
+                max_wait_ms=float(os.environ.get("INFERENCE_MAX_WAIT_MS", 5)),
+            )
+        if not self.is_loaded("inference"):
+            # Load the parts first, so the time for "inference" is only its own setup
+            self.tokenizer, self.backend
+        return self._get("inference", build)
+
+    # Repeated texts (retweets, templated bot posts) are answered from this cache.
+    # Set PREDICTION_CACHE_DB to a file path to keep the cache across restarts.
+    @property
+    def prediction_cache(self):
+        def build():
+            from services.prediction_cache_service import PredictionCache
+            return PredictionCache(
+                model_version=os.environ.get("MODEL_VERSION") or self._model_version(PredictionCache),
+                max_entries=int(os.environ.get("PREDICTION_CACHE_SIZE", 10000)),
+                ttl_seconds=float(os.environ["PREDICTION_CACHE_TTL"]) if os.environ.get("PREDICTION_CACHE_TTL") else None,
+                db_path=os.environ.get("PREDICTION_CACHE_DB"),
+            )
+        return self._get("prediction_cache", build)
+
+    # Cached answers are only valid for this model, backend and (if on) cascade setup
+    def _model_version(self, cache_cls):
+        version = f"{cache_cls.model_fingerprint(model_path)}:{model_backend}"
+        cascade = self.cascade
+        if cascade:
+            version += f":cascade-{cascade.fingerprint()}"
+        return version
+
+    # The CascadeService, or False when CASCADE_MODEL isn't set
+    @property
+    def cascade(self):
+        def build():
+            if not cascade_model_path:
+                return False
+            from services.cascade_service import CascadeService, CheapModel
+            model = CheapModel.load(cascade_model_path)
+            model.low = float(os.environ.get("CASCADE_LOW", model.low))
+            model.high = float(os.environ.get("CASCADE_HIGH", model.high))
+            return CascadeService(model)
+        return self._get("cascade", build)
+
+    # The DuplicateIndex, or False when DUPLICATE_INDEX isn't set
+    @property
+    def duplicates(self):
+        def build():
+            if not duplicate_index_path:
+                return False
+            from services.duplicate_index_service import DuplicateIndex
+            return DuplicateIndex(duplicate_index_path, max_clusters=duplicate_max_clusters)
+        return self._get("duplicates", build)
+
+    @property
+    def accounts(self):
+        def build():
+            from services.account_scoring_service import AccountStore
+            return AccountStore(
+                max_accounts=int(os.environ.get("ACCOUNT_STORE_SIZE", 100000)),
+                min_tweets=int(os.environ.get("ACCOUNT_MIN_TWEETS", 5)),
+                db_path=account_db_path
+            )
+        return self._get("accounts", build)
+
+    # Load every component without running anything through the model.
+    # gunicorn's master calls this before forking, so the workers share the weights.
+    def load_all(self):
+        self.inference
+        self.cascade
+        self.duplicates
+        self.accounts
+        self.prediction_cache
+        self._get("spacy", get_nlp)
+        # Decode the random-tweet corpora now instead of on the first /random-predict
+        self._get("corpora", self._load_corpora)
+
+    @staticmethod
+    def _load_corpora():
+        RandomTweetService.preload()
+        return RandomTweetService.corpora
+
+    # Load everything and push one text through the model and the metrics, so the first
+    # real request doesn't pay for lazy initialisation inside torch and spaCy either
+    def warm_up(self):
+        self.warmup_state = "running"
+        try:
+            self.load_all()
+            started = time.perf_counter()
+            self.inference.classify("warming up the bot detector")
+            TextMetricsService.extract_feature_metrics("warming up the bot detector")
+            self.load_seconds["dummy_prediction"] = time.perf_counter() - started
+        except Exception as e:
+            self.warmup_state = "failed"
+            print(f"⚠️ Warm-up failed: {e}")
+            raise
+        self.ready_after_seconds = time.perf_counter() - _imported_at
+        self.warmup_state = "done"
+
+    def start_warmup(self):
+        thread = threading.Thread(target=self.warm_up, name="warmup", daemon=True)
+        thread.start()
+        return thread
+
+    # What /startup reports: how long each piece took to load and when the server was ready
+    def startup_report(self):
+        return {
+            "warmup": warmup_mode,
+            "state": self.warmup_state,
+            "seconds_since_import": round(time.perf_counter() - _imported_at, 3),
+            "ready_after_seconds": round(self.ready_after_seconds, 3) if self.ready_after_seconds is not None else None,
+            "load_seconds": {name: round(seconds, 3) for name, seconds in self.load_seconds.items()},
+            "pid": os.getpid()
+        }
+
+
+components = Components()
+
+# Label, confidence, metrics and the stage that decided ("duplicate", "cheap" or "bert") for one text,
+# from the cache when we've seen it before
+def predict_text(text):
+    prediction_cache = components.prediction_cache
+    cached = prediction_cache.get(text)
+    if cached is not None:
+        # /predict-batch may have cached this text without its metrics
+        if cached.get("metrics") is None:
+            cached = dict(cached, metrics=TextMetricsService.extract_feature_metrics(text))
+            prediction_cache.put(text, cached)
+        return cached["prediction"], cached["confidence"], cached["metrics"], cached.get("stage", "bert")
+
+    decision, lookup = early_decision(text)
+    if decision is not None:
+        label, confidence_percent, stage = decision
+    else:
+        # Queue the text for the next micro-batch and get back the label (bot or human) and confidence %
+        label, confidence_percent = components.inference.classify(text)
+        stage = "bert"
+        if components.cascade:
+            components.cascade.record("bert")
+
+    # Model answers label the text's template; index answers only add to its size
+    if lookup is not None:
+        components.duplicates.add(text, None if stage == "duplicate" else label, *lookup)
+
+    metrics = TextMetricsService.extract_feature_metrics(text)
+    prediction_cache.put(text, {"prediction": label, "confidence": confidence_percent, "metrics": metrics, "stage": stage})
+    return label, confidence_percent, metrics, stage
+
+# (decision, lookup): the answer of the stages in front of BERT as (label, confidence %, stage),
+# or None when the text needs BERT, and the duplicate index's (signature, match) for the text
+# (None when the index is off), handed back to duplicates.add() so it isn't computed twice
+def early_decision(text):
+    # A near-duplicate of a big enough, consistently labelled template is answered from the index
+    lookup = None
+    duplicates = components.duplicates
+    if duplicates:
+        with Instrumentation.stage("duplicate_lookup"):
+            lookup = duplicates.lookup(text)
+        match = lookup[1]
+        if match and match["label"] and match["size"] >= duplicate_min_size and match["purity"] >= duplicate_min_purity:
+            return (match["label"], round(match["purity"] * 100, 2), "duplicate"), lookup
+
+    # With the cascade on, the cheap model answers first and only unsure texts go on to BERT
+    cascade = components.cascade
+    if cascade:
+        with Instrumentation.stage("cascade"):
+            decision = cascade.decide(text)
+        if decision is not None:
+            return decision + ("cheap",), lookup
+    return None, lookup
+
+# predict_text for several texts at once, same answers and same cache entries.
+# Cache misses go through the same duplicate index and cascade, then everything still
+# undecided goes to the model in one classify_batch call and all missing metrics are
+# computed in one nlp.pipe pass, instead of one micro-batch round-trip per text.
+# with_metrics (one bool per text, default all True) skips the metrics of some texts,
+# their metrics are None unless the cache already had them.
+def predict_texts(texts, with_metrics=None):
+    prediction_cache = components.prediction_cache
+    unique = list(dict.fromkeys(texts))
+    wanted = set(texts) if with_metrics is None else {text for text, wants in zip(texts, with_metrics) if wants}
+    entries = {text: prediction_cache.get(text) for text in unique}
+    missing = [text for text in unique if entries[text] is None]
+
+    decisions, lookups = {}, {}
+    for text in missing:
+        decisions[text], lookups[text] = early_decision(text)
+    to_model = [text for text in missing if decisions[text] is None]
+    if to_model:
+        for text, (label, confidence_percent) in zip(to_model, components.inference.classify_batch(to_model)):
+            decisions[text] = label, confidence_percent, "bert"
+            if components.cascade:
+                components.cascade.record("bert")
+
+    for text in missing:
+        label, confidence_percent, stage = decisions[text]
+        if lookups[text] is not None:
+            components.duplicates.add(text, None if stage == "duplicate" else label, *lookups[text])
+        entries[text] = {"prediction": label, "confidence": confidence_percent, "metrics": None, "stage": stage}
+        if text not in wanted:
+            prediction_cache.put(text, entries[text])
+
+    # Some texts may have been cached without their metrics
+    metric_texts = [text for text in unique if text in wanted and entries[text].get("metrics") is None]
+    if metric_texts:
+        for text, metrics in zip(metric_texts, TextMetricsService.extract_feature_metrics_batch(metric_texts)):
+            entries[text] = dict(entries[text], metrics=metrics)
+            prediction_cache.put(text, entries[text])
+
+    return [
+        (entries[text]["prediction"], entries[text]["confidence"], entries[text]["metrics"], entries[text].get("stage", "bert"))
+        for text in texts
+    ]
+
+# Classify an account's new tweets and fold them into its running score; returns the account summary.
+# The tweets are classified together (predict_texts) and written in one go (one SQLite
+# transaction with ACCOUNT_DB).
+def score_account(account, texts):
+    store = components.accounts
+    if not texts:
+        return store.get(account)
+    results = [(label, confidence_percent, metrics) for label, confidence_percent, metrics, _ in predict_texts(texts)]
+    with Instrumentation.stage("account_update"):
+        return store.update_many(account, results)
+
+# Resident memory of this process in bytes (0 where /proc is not available)
+def process_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+# Prometheus text for /metrics: the stage and request histograms plus model, batcher and cache numbers.
+# Only components that are already loaded are reported, a scrape never triggers a model load.
+def render_metrics():
+    extra = [("tweetbot_process_resident_bytes", "gauge", "Resident memory of this process", process_rss_bytes())]
+    if components.is_loaded("backend"):
+        extra.append(("tweetbot_model_weight_bytes", "gauge", "Memory held by the model weights",
+                      {f'backend="{model_backend}"': components.backend.memory_bytes()}))
+    if components.is_loaded("inference"):
+        batching = components.inference.stats()
+        extra += [
+            ("tweetbot_inference_queue_depth", "gauge", "Texts waiting for the next micro-batch", batching["queue_depth"]),
+            ("tweetbot_inference_batches_total", "counter", "Micro-batches run since startup", batching["batches"]),
+            ("tweetbot_inference_mean_batch_size", "gauge", "Mean texts per micro-batch", batching["mean_batch_size"]),
+        ]
+    if components.is_loaded("prediction_cache"):
+        cache = components.prediction_cache.stats()
+        extra += [
+            ("tweetbot_cache_entries", "gauge", "Entries in the prediction cache", cache["entries"]),
+            ("tweetbot_cache_events_total", "counter", "Prediction cache lookups and evictions", {
+                'event="hit"': cache["hits"], 'event="miss"': cache["misses"], 'event="eviction"': cache["evictions"]
+            }),
+        ]
+    if components.is_loaded("cascade") and components.cascade:
+        extra.append(("tweetbot_cascade_decisions_total", "counter", "Predictions decided by each cascade stage",
+                      {f'stage="{stage}"': count for stage, count in components.cascade.stats()["decided"].items()}))
+    if components.is_loaded("duplicates") and components.duplicates:
+        index = components.duplicates.stats()
+        extra += [
+            ("tweetbot_duplicate_clusters", "gauge", "Templates in the near-duplicate index", index["clusters"]),
+            ("tweetbot_duplicate_lookups_total", "counter", "Near-duplicate index lookups", {
+                'result="match"': index["matches"], 'result="miss"': index["lookups"] - index["matches"]
+            }),
+        ]
+    if components.is_loaded("accounts"):
+        accounts = components.accounts.stats()
+        extra += [
+            ("tweetbot_accounts", "gauge", "Accounts in the account score store", accounts["accounts"]),
+            ("tweetbot_account_evictions_total", "counter", "Accounts evicted from the full store", accounts["evictions"]),
+        ]
+    extra.append(("tweetbot_ready", "gauge", "1 once this worker is ready (same rule as /readyz)", int(components.ready)))
+    return Instrumentation.render_prometheus(extra)
+
+if warmup_mode == "sync":
+    components.warm_up()
+elif warmup_mode == "background":
+    components.start_warmup()
@@ -0,0 +1,174 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import statistics
+import time
+
+from services.model_backends import BACKENDS, ONNX_FILES, load_backend, load_fp32_model
+from services.tweet_text import decode_tweet_text
+
+# Define the path to the pretrained BERT model and the tweets we verify against
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_model_path = os.path.join(base_dir, "bert-twitterbot-detector")
+corpus_paths = [
+    os.path.join(base_dir, "data", "clean_human_tweets.csv"),
+    os.path.join(base_dir, "data", "clean_bot_tweets.csv")
+]
+
+
+# Export the fp32 model to ONNX (model.onnx) and an INT8 weight version of it (model.int8.onnx)
+def export(model_path, opset=14):
+    import torch
+    from transformers import BertTokenizer
+
+    tokenizer = BertTokenizer.from_pretrained(model_path)
+    model = load_fp32_model(model_path)
+
+    # Only the logits go into the graph, not the whole HuggingFace output object
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids).logits
+
+    sample = tokenizer(["export sample tweet", "a second, longer sample tweet for the export"], return_tensors="pt", padding=True)
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    onnx_path = os.path.join(model_path, ONNX_FILES["onnx"])
+    torch.onnx.export(
+        LogitsOnly(model),
+        tuple(sample[name] for name in input_names),
+        onnx_path,
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names}, "logits": {0: "batch"}},
+        opset_version=opset
+    )
+    print(f"✅ Exported {onnx_path}")
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = os.path.join(model_path, ONNX_FILES["onnx-int8"])
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"✅ Quantized {int8_path}")
+
+
+# Rewrite the weights as model.safetensors, which load_fp32_model memory-maps at startup
+def to_safetensors(model_path):
+    model = load_fp32_model(model_path)
+    model.save_pretrained(model_path, safe_serialization=True)
+    print(f"✅ Saved {os.path.join(model_path, 'model.safetensors')}")
+
+
+def load_corpus(limit=None):
+    texts = []
+    for path in corpus_paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            texts.extend(decode_tweet_text(row["text"]) for row in csv.DictReader(f) if row.get("text"))
+    return texts[:limit] if limit else texts
+
+
+# Resident memory of this process in MB (Linux), falling back to the peak on other systems
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Runs in a fresh process per backend so load time and memory aren't mixed up between backends.
+# Returns the predicted bot probability for every text plus timing and memory numbers.
+def measure_backend(model_path, backend_name, texts, batch_size, latency_samples):
+    import torch
+    from transformers import BertTokenizer
+
+    tokenizer = BertTokenizer.from_pretrained(model_path)
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    backend = load_backend(model_path, backend_name)
+    load_seconds = time.perf_counter() - started
+    rss_after_load = current_rss_mb()
+
+    def bot_probability(batch):
+        inputs = tokenizer(batch, return_tensors="pt", truncation=True, padding="longest")
+        return torch.softmax(backend.logits(inputs), dim=1)[:, 1].tolist()
+
+    # Single-request latency, the way /predict sees it without batching
+    bot_probability(texts[:1])
+    latencies = []
+    for text in texts[:latency_samples]:
+        start = time.perf_counter()
+        bot_probability([text])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    # Batched throughput over the whole corpus (length-sorted, like /predict-batch)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    probs = [0.0] * len(texts)
+    start = time.perf_counter()
+    for i in range(0, len(order), batch_size):
+        idx = order[i:i + batch_size]
+        for j, p in zip(idx, bot_probability([texts[k] for k in idx])):
+            probs[j] = p
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend_name,
+        "probs": probs,
+        "load_seconds": load_seconds,
+        "rss_load_mb": rss_after_load - rss_before,
+        "latency_ms_p50": latencies[len(latencies) // 2],
+        "latency_ms_p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "latency_ms_mean": statistics.fmean(latencies),
+        "throughput_per_sec": len(texts) / batch_seconds
+    }
+
+
+def verify(model_path, backends, limit=None, batch_size=32, latency_samples=200):
+    texts = load_corpus(limit)
+    print(f"Verifying on {len(texts)} tweets from backend/data")
+
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    for name in ["pytorch"] + [b for b in backends if b != "pytorch"]:
+        if name in ONNX_FILES and not os.path.exists(os.path.join(model_path, ONNX_FILES[name])):
+            print(f"⚠️ Skipping {name}: {ONNX_FILES[name]} not found (run export first)")
+            continue
+        with ctx.Pool(1) as pool:
+            results[name] = pool.apply(measure_backend, (model_path, name, texts, batch_size, latency_samples))
+
+    # Agreement is measured against the fp32 PyTorch model
+    reference = results["pytorch"]["probs"]
+    print(f"\n{'backend':<10} {'agree %':>8} {'max |dp|':>9} {'load s':>7} {'RSS MB':>7} {'p50 ms':>7} {'p99 ms':>7} {'tweets/s':>9}")
+    for name, r in results.items():
+        agree = sum((p >= 0.5) == (q >= 0.5) for p, q in zip(r["probs"], reference)) / len(reference) * 100
+        max_diff = max(abs(p - q) for p, q in zip(r["probs"], reference))
+        print(
+            f"{name:<10} {agree:>8.2f} {max_diff:>9.4f} {r['load_seconds']:>7.2f} {r['rss_load_mb']:>7.0f} "
+            f"{r['latency_ms_p50']:>7.2f} {r['latency_ms_p99']:>7.2f} {r['throughput_per_sec']:>9.1f}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the classifier to ONNX/safetensors and compare the CPU backends")
+    parser.add_argument("command", choices=["export", "verify", "safetensors"],
+                        help="export also runs verify unless --no-verify")
+    parser.add_argument("--model-path", default=default_model_path)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N tweets")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--no-verify", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "safetensors":
+        to_safetensors(args.model_path)
+    else:
+        if args.command == "export":
+            export(args.model_path)
+        if args.command == "verify" or not args.no_verify:
+            verify(args.model_path, args.backends, args.limit, args.batch_size)
@@ -0,0 +1,139 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from services.account_scoring_service import AccountStore
+from services.model_backends import BACKENDS
+from services.tweet_text import decode_tweet_text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from columnar import iter_table_chunks
+
+# Account-level verdicts for a tweet file, streamed chunk by chunk.
+#
+# Every tweet is classified once and folded into its account's running state
+# (services/account_scoring_service.py), so memory only grows with the number of accounts.
+# After each chunk the account state is snapshotted together with the chunks and rows done
+# so far, in one atomic write, so an interrupted run resumes exactly after the last chunk
+# the snapshot contains, and a later run with --append adds a new file's tweets to the
+# accounts of an earlier one without re-scoring anything.
+#
+# Usage (from the backend folder):
+#   python score_accounts.py ../not_processed_data/bots_limited_200_per_user.csv -o accounts_bots
+#   python score_accounts.py new_tweets.parquet -o accounts_bots --append --metrics
+
+
+def score_accounts(input_path, output_dir, model_path, backend_name="pytorch", chunk_size=10000, batch_size=64,
+                   cores=None, metrics=False, account_column="Twitter_User_Name", text_column="Tweet_text",
+                   min_tweets=5, max_accounts=1000000, append=False, restart=False):
+    import pandas as pd
+    import torch
+    from transformers import BertTokenizer
+
+    from services.inference_service import InferenceService
+    from services.model_backends import load_backend
+
+    input_path, output_dir = Path(input_path), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    snapshot_path = output_dir / "accounts.json"
+    settings = {"chunk_size": chunk_size, "backend": backend_name, "metrics": metrics,
+                "account_column": account_column, "text_column": text_column}
+
+    if restart and not append and snapshot_path.exists():
+        snapshot_path.unlink()
+    store = AccountStore(max_accounts=max_accounts, min_tweets=min_tweets, snapshot_path=str(snapshot_path))
+
+    # The snapshot's own progress says which rows its accounts already contain.
+    # --append starts a new input on top of the saved accounts; an interrupted append of
+    # the same input still resumes from that progress.
+    progress = None if restart else store.progress
+    if progress is not None and progress.get("input") != str(input_path):
+        if not append:
+            raise ValueError(f"{snapshot_path} belongs to a different input file ({progress.get('input')}), "
+                             f"use --append or --restart")
+        progress = None
+    if progress is not None:
+        if progress.get("settings") != settings:
+            raise ValueError(f"{snapshot_path} was written with other settings ({progress.get('settings')}), use --restart")
+        print(f"Resuming after chunk {progress['chunks_done']} ({progress['rows_done']} rows already done)")
+    else:
+        # Without --append a fresh run doesn't build on accounts of unknown origin
+        if not append and store.stats()["accounts"]:
+            snapshot_path.unlink()
+            store = AccountStore(max_accounts=max_accounts, min_tweets=min_tweets, snapshot_path=str(snapshot_path))
+        progress = {"input": str(input_path), "settings": settings, "chunks_done": 0, "rows_done": 0}
+    print(f"{store.stats()['accounts']} accounts restored")
+
+    if cores:
+        torch.set_num_threads(cores)
+    inference = InferenceService(BertTokenizer.from_pretrained(model_path), load_backend(model_path, backend_name))
+
+    started = time.perf_counter()
+    new_rows = 0
+    chunks = iter_table_chunks(input_path, chunk_size, [account_column, text_column], skip_rows=progress["rows_done"])
+    for chunk_index, chunk in enumerate(chunks, start=progress["chunks_done"]):
+        accounts = chunk[account_column].astype(str).tolist()
+        texts = [decode_tweet_text(value) if isinstance(value, str) else "" for value in chunk[text_column]]
+        labels, confidences = inference.classify_texts(texts, batch_size)
+        rows = [None] * len(texts)
+        if metrics:
+            from services.text_metrics_service import TextMetricsService
+
+            present = [i for i, text in enumerate(texts) if text]
+            for i, row in zip(present, TextMetricsService.extract_feature_metrics_batch([texts[i] for i in present])):
+                rows[i] = row
+        for account, label, confidence, row in zip(accounts, labels, confidences, rows):
+            if label is not None:
+                store.update(account, label, confidence, row)
+
+        # The accounts and the rows they contain are written in one rename, so a crash
+        # either keeps the whole chunk or none of it
+        progress["chunks_done"] = chunk_index + 1
+        progress["rows_done"] += len(chunk)
+        store.snapshot(progress=progress)
+
+        new_rows += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"Chunk {chunk_index + 1}: {progress['rows_done']} tweets, {store.stats()['accounts']} accounts | "
+              f"{new_rows / elapsed:.1f} tweets/sec")
+
+    summaries = store.summaries()
+    table = pd.DataFrame([{k: v for k, v in summary.items() if k != "metric_means"} for summary in summaries])
+    if metrics and summaries:
+        table = table.join(pd.DataFrame([summary["metric_means"] for summary in summaries]).add_prefix("mean_"))
+    table.to_csv(output_dir / "accounts.csv", index=False)
+
+    elapsed = time.perf_counter() - started
+    verdicts = table["verdict"].value_counts().to_dict() if len(table) else {}
+    print(f"✅ {len(table)} accounts saved to {output_dir / 'accounts.csv'} {verdicts} "
+          f"({new_rows} new tweets in {elapsed:.1f}s, {new_rows / max(elapsed, 1e-9):.1f} tweets/sec)")
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Score accounts from a stream of their tweets")
+    parser.add_argument("input", help="CSV, .parquet or .arrow file with account and Tweet_text columns")
+    parser.add_argument("-o", "--output", help="folder for accounts.csv and the state (default: accounts_<input name>)")
+    parser.add_argument("--model-path", default=os.path.join(base_dir, "bert-twitterbot-detector"))
+    parser.add_argument("--backend", default="pytorch", choices=BACKENDS)
+    parser.add_argument("--chunk-size", type=int, default=10000, help="tweets read per chunk")
+    parser.add_argument("--batch-size", type=int, default=64, help="tweets per forward pass")
+    parser.add_argument("--cores", type=int, default=None, help="torch threads (default: all cores)")
+    parser.add_argument("--metrics", action="store_true", help="also aggregate the text metrics (much slower)")
+    parser.add_argument("--account-column", default="Twitter_User_Name")
+    parser.add_argument("--text-column", default="Tweet_text")
+    parser.add_argument("--min-tweets", type=int, default=5, help="tweets needed for a Bot/Human verdict")
+    parser.add_argument("--max-accounts", type=int, default=1000000, help="accounts kept before the oldest is evicted")
+    parser.add_argument("--append", action="store_true", help="add this file to the accounts already in --output")
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress and start over")
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    output_dir = Path(args.output) if args.output else input_path.with_name(f"accounts_{input_path.stem}")
+    score_accounts(
+        input_path, output_dir, args.model_path, args.backend, args.chunk_size, args.batch_size, args.cores,
+        args.metrics, args.account_column, args.text_column, args.min_tweets, args.max_accounts,
+        args.append, args.restart
+    )
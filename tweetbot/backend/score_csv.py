@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from services.model_backends import BACKENDS
+from services.tweet_text import decode_tweet_text
+
+# Same chunked reader as the processing scripts (CSV, Parquet and Arrow)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from columnar import iter_table_chunks
+
+# Offline batch scoring for archived tweet files, without going through the HTTP server.
+#
+#  - The input (CSV, Parquet or Arrow) is streamed in chunks, so file size doesn't matter.
+#  - Tweet_text is decoded with decode_tweet_text (ast.literal_eval, never eval).
+#  - Each chunk is sorted by length and classified in batches, so a batch is padded
+#    only to tweets of about the same length.
+#  - Every chunk is written as its own Parquet file <output>/part-00000.parquet, ...
+#    and _progress.json records the finished chunks, so an interrupted run picks up
+#    after the last chunk that was fully written, without parsing the finished rows again.
+#
+# Usage (from the backend folder):
+#   python score_csv.py ../not_processed_data/bots_limited_200_per_user.csv -o scored_bots --cores 8
+#   python score_csv.py tweets.parquet -o scored --metrics --backend int8
+
+# Every spaCy universal POS tag, so all parts share one schema even when a chunk has no SYM or X
+POS_TAGS = ["ADJ", "ADP", "ADV", "AUX", "CCONJ", "DET", "INTJ", "NOUN", "NUM", "PART",
+            "PRON", "PROPN", "PUNCT", "SCONJ", "SPACE", "SYM", "VERB", "X"]
+METRIC_COLUMNS = (
+    ["char_count", "word_count", "avg_word_length", "exclamation_count", "hashtag_count",
+     "mention_count", "link_count", "sentiment_polarity"]
+    + [f"pos_{pos.lower()}_count" for pos in POS_TAGS]
+)
+
+
+def load_progress(progress_path, input_path, settings):
+    if not progress_path.exists():
+        return None
+    with open(progress_path) as f:
+        progress = json.load(f)
+    if progress.get("input") != str(input_path):
+        raise ValueError(f"{progress_path} belongs to a different input file ({progress.get('input')})")
+    if progress.get("settings") != settings:
+        raise ValueError(f"{progress_path} was written with other settings ({progress.get('settings')}), use --restart")
+    return progress
+
+
+def save_progress(progress_path, progress):
+    tmp_path = progress_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+
+def metric_columns(texts, processes):
+    from services.text_metrics_service import TextMetricsService
+
+    columns = {name: [None] * len(texts) for name in METRIC_COLUMNS}
+    present = [i for i, text in enumerate(texts) if text]
+    rows = TextMetricsService.extract_feature_metrics_batch([texts[i] for i in present], n_process=processes)
+    for i, row in zip(present, rows):
+        for name in METRIC_COLUMNS:
+            columns[name][i] = row.get(name, 0)
+    return columns
+
+
+def score_file(input_path, output_dir, model_path, backend_name="pytorch", chunk_size=10000, batch_size=64,
+               cores=None, metrics=False, metrics_processes=1, text_column="Tweet_text",
+               keep_columns=("Tweet_id", "Twitter_User_Name"), restart=False):
+    import pandas as pd
+    import torch
+    from transformers import BertTokenizer
+
+    from services.inference_service import InferenceService
+    from services.model_backends import load_backend
+
+    input_path, output_dir = Path(input_path), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    progress_path = output_dir / "_progress.json"
+    settings = {"chunk_size": chunk_size, "backend": backend_name, "metrics": metrics, "text_column": text_column}
+
+    progress = None if restart else load_progress(progress_path, input_path, settings)
+    if progress is None:
+        for part in output_dir.glob("part-*.parquet"):
+            part.unlink()
+        progress = {"input": str(input_path), "settings": settings, "chunks_done": 0, "rows_done": 0}
+    else:
+        print(f"Resuming after chunk {progress['chunks_done']} ({progress['rows_done']} rows already done)")
+
+    if cores:
+        torch.set_num_threads(cores)
+    print(f"Scoring with the {backend_name} backend on {torch.get_num_threads()} threads")
+    inference = InferenceService(BertTokenizer.from_pretrained(model_path), load_backend(model_path, backend_name))
+
+    # Only read the columns we actually use, when we know the header
+    header = list(next(iter_table_chunks(input_path, 1)).columns)
+    if text_column not in header:
+        raise ValueError(f"{input_path} has no '{text_column}' column")
+    keep = [column for column in keep_columns if column in header and column != text_column]
+
+    started = time.perf_counter()
+    new_rows = 0
+    chunks = iter_table_chunks(input_path, chunk_size, keep + [text_column], skip_rows=progress["rows_done"])
+    for chunk_index, chunk in enumerate(chunks, start=progress["chunks_done"]):
+        texts = [decode_tweet_text(value) if isinstance(value, str) else "" for value in chunk[text_column]]
+        labels, confidences = inference.classify_texts(texts, batch_size)
+
+        scored = chunk[keep].reset_index(drop=True)
+        scored["prediction"] = labels
+        scored["confidence"] = pd.array(confidences, dtype="Float64")
+        if metrics:
+            for name, values in metric_columns(texts, metrics_processes).items():
+                scored[name] = pd.array(values, dtype="Float64")
+
+        # Write to a temporary name and rename, so a crash never leaves a half-written part
+        part_path = output_dir / f"part-{chunk_index:05d}.parquet"
+        tmp_path = part_path.with_suffix(".tmp")
+        scored.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, part_path)
+
+        progress["chunks_done"] = chunk_index + 1
+        progress["rows_done"] += len(chunk)
+        save_progress(progress_path, progress)
+
+        new_rows += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"Chunk {chunk_index + 1}: {progress['rows_done']} tweets total | {new_rows / elapsed:.1f} tweets/sec")
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Scores saved to {output_dir} ({new_rows} new tweets in {elapsed:.1f}s, {new_rows / max(elapsed, 1e-9):.1f} tweets/sec)")
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Score a tweet CSV/Parquet/Arrow file with the bot detector")
+    parser.add_argument("input", help="CSV, .parquet or .arrow file with a Tweet_text column")
+    parser.add_argument("-o", "--output", help="folder for the Parquet parts (default: scored_<input name>)")
+    parser.add_argument("--model-path", default=os.path.join(base_dir, "bert-twitterbot-detector"))
+    parser.add_argument("--backend", default="pytorch", choices=BACKENDS)
+    parser.add_argument("--chunk-size", type=int, default=10000, help="tweets read and written per part")
+    parser.add_argument("--batch-size", type=int, default=64, help="tweets per forward pass")
+    parser.add_argument("--cores", type=int, default=None, help="torch threads (default: all cores)")
+    parser.add_argument("--metrics", action="store_true", help="also compute the text metrics (much slower)")
+    parser.add_argument("--metrics-processes", type=int, default=1, help="spaCy processes for --metrics")
+    parser.add_argument("--text-column", default="Tweet_text")
+    parser.add_argument("--keep-columns", nargs="*", default=["Tweet_id", "Twitter_User_Name"],
+                        help="input columns copied into the output")
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress and start over")
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    output_dir = Path(args.output) if args.output else input_path.with_name(f"scored_{input_path.stem}")
+    score_file(
+        input_path, output_dir, args.model_path, args.backend, args.chunk_size, args.batch_size, args.cores,
+        args.metrics, args.metrics_processes, args.text_column, args.keep_columns, args.restart
+    )
@@ -0,0 +1,89 @@
+import argparse
+import gc
+import os
+
+from gunicorn.app.base import BaseApplication
+
+# Production server for the Flask app (Linux/macOS, gunicorn does not run on Windows).
+#
+#  - The app (and with it the tokenizer and BERT) is loaded once in the master process
+#    and then the workers are forked from it (preload_app). The model weights are shared
+#    copy-on-write between all workers instead of every worker loading its own copy.
+#    gc.freeze() before forking keeps the garbage collector from touching (and so
+#    copying) the objects that were loaded before the fork.
+#  - Each worker gets its own torch thread budget so N workers x M threads never
+#    asks for more cores than the machine has.
+#  - Workers use threads (gthread), so concurrent requests inside one worker still
+#    meet in InferenceService's micro-batches.
+#  - The master only loads the components (WARMUP=off + load_all). The dummy prediction
+#    runs in each worker after the fork, torch's thread pools must not be started before it.
+#
+# Usage (from the backend folder):
+#   python serve.py --workers 4 --bind 0.0.0.0:5000
+# Kubernetes-style probes: GET /healthz (process is up) and GET /readyz (model is loaded).
+
+
+class BotDetectorServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+        from components import components
+
+        components.load_all()
+        return app
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import torch
+
+    threads = int(os.environ["TORCH_THREADS_PER_WORKER"])
+    torch.set_num_threads(threads)
+    try:
+        torch.set_interop_threads(1)
+    except RuntimeError:
+        # The inter-op pool was already started in the master, it stays as it is
+        pass
+    server.log.info(f"Worker {worker.pid}: {threads} torch threads")
+
+    # /readyz answers 200 once this worker has pushed one text through the model
+    from components import components
+    components.start_warmup()
+
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Run the bot detector API with gunicorn")
+    parser.add_argument("--bind", default="0.0.0.0:5000")
+    parser.add_argument("--workers", type=int, default=max(1, cores // 4), help="worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="request threads per worker")
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--timeout", type=int, default=60)
+    args = parser.parse_args()
+
+    # Read by post_fork in every worker
+    torch_threads = args.torch_threads or max(1, cores // args.workers)
+    os.environ["TORCH_THREADS_PER_WORKER"] = str(torch_threads)
+    os.environ["WARMUP"] = "off"
+
+    BotDetectorServer({
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "gthread",
+        "threads": args.threads,
+        "timeout": args.timeout,
+        "preload_app": True,
+        "pre_fork": pre_fork,
+        "post_fork": post_fork,
+    }).run()
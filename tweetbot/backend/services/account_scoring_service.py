@@ -0,0 +1,253 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Account-level scoring from a stream of tweets. Each account keeps a few numbers that are
+# updated in O(1) per tweet, so a new tweet never means re-scoring the account's old ones:
+#  - tweet count and how many were labelled Bot
+#  - running mean and variance of the bot probability (Welford's algorithm)
+#  - running sums of the TextMetricsService metrics, reported as per-tweet means
+#
+# Accounts live in a bounded LRU; the least recently updated one is evicted when it is full.
+# snapshot() writes everything to a JSON file and the store restores it at startup. A batch
+# job can pass its progress to snapshot(), so the accounts and how far the job got are
+# written in the same atomic rename and can never disagree after a crash.
+#
+# An in-memory store belongs to one process, so with several gunicorn workers each one
+# would only see the tweets it was sent. With `db_path` the accounts live in SQLite
+# instead, shared by every worker: each update reads the account's state, folds the new
+# tweets in and writes it back inside one BEGIN IMMEDIATE transaction, so concurrent
+# workers never lose each other's tweets.
+
+
+class AccountState:
+    __slots__ = ("tweets", "bots", "mean", "m2", "metric_sums", "first_seen", "last_seen")
+
+    def __init__(self, tweets=0, bots=0, mean=0.0, m2=0.0, metric_sums=None, first_seen=None, last_seen=None):
+        self.tweets = tweets
+        self.bots = bots
+        self.mean = mean
+        self.m2 = m2
+        self.metric_sums = metric_sums or {}
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+
+    def update(self, bot_probability, is_bot, metrics=None):
+        now = time.time()
+        self.first_seen = self.first_seen or now
+        self.last_seen = now
+        self.tweets += 1
+        self.bots += int(is_bot)
+        delta = bot_probability - self.mean
+        self.mean += delta / self.tweets
+        self.m2 += delta * (bot_probability - self.mean)
+        for name, value in (metrics or {}).items():
+            if isinstance(value, (int, float)):
+                self.metric_sums[name] = self.metric_sums.get(name, 0.0) + value
+
+    @property
+    def variance(self):
+        return self.m2 / (self.tweets - 1) if self.tweets > 1 else 0.0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class AccountStore:
+    #  max_accounts:  accounts kept in memory before the least recently updated is evicted
+    #  min_tweets:    tweets needed before an account gets a Bot/Human verdict
+    #  threshold:     mean bot probability at or above which the account is a bot
+    #  snapshot_path: JSON file restored at startup and written by snapshot()
+    #  db_path:       SQLite file holding the accounts instead of memory, shared by processes
+    def __init__(self, max_accounts=100000, min_tweets=5, threshold=0.5, snapshot_path=None, db_path=None):
+        self.max_accounts = max_accounts
+        self.min_tweets = min_tweets
+        self.threshold = threshold
+        self.snapshot_path = snapshot_path
+        # Progress saved with the restored snapshot, if it had any
+        self.progress = None
+        self._accounts = OrderedDict()
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.evictions = 0
+        self._db = None
+        self._db_path = db_path
+        self._db_pid = None
+        if db_path:
+            self._open_db()
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.restore(snapshot_path)
+
+    # label/confidence are what the classifier returned for one of the account's tweets
+    def update(self, account, label, confidence_percent, metrics=None):
+        return self.update_many(account, [(label, confidence_percent, metrics)])
+
+    # Fold several (label, confidence_percent, metrics) results of one account in at once,
+    # with a single SQLite transaction when the store is shared
+    def update_many(self, account, results):
+        with self._lock:
+            if self._db_path:
+                db = self._connection()
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    state = self._load_state(db, account) or AccountState()
+                    self._fold(state, results)
+                    self._save_state(db, account, state)
+                    # Pruning sorts the table, so it only runs every 1000 updates
+                    if self.updates // 1000 != (self.updates - len(results)) // 1000:
+                        self.evictions += db.execute(
+                            "DELETE FROM accounts WHERE account NOT IN "
+                            "(SELECT account FROM accounts ORDER BY last_seen DESC LIMIT ?)",
+                            (self.max_accounts,)
+                        ).rowcount
+                    db.commit()
+                except BaseException:
+                    db.rollback()
+                    raise
+                return self._summary(account, state)
+
+            state = self._accounts.get(account)
+            if state is None:
+                state = self._accounts[account] = AccountState()
+                while len(self._accounts) > self.max_accounts:
+                    self._accounts.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._accounts.move_to_end(account)
+            self._fold(state, results)
+            return self._summary(account, state)
+
+    # Summary dict of one account, or None if it isn't in the store
+    def get(self, account):
+        with self._lock:
+            if self._db_path:
+                state = self._load_state(self._connection(), account)
+            else:
+                state = self._accounts.get(account)
+            return None if state is None else self._summary(account, state)
+
+    def summaries(self):
+        with self._lock:
+            return [self._summary(account, state) for account, state in self._states()]
+
+    def snapshot(self, path=None, progress=None):
+        path = path or self.snapshot_path
+        with self._lock:
+            data = {
+                "saved_at": time.time(),
+                "progress": progress,
+                "accounts": {account: state.to_dict() for account, state in self._states()}
+            }
+        # Write next to the target and rename, so a crash never leaves a half-written snapshot
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return len(data["accounts"])
+
+    def restore(self, path):
+        with open(path) as f:
+            data = json.load(f)
+        with self._lock:
+            self.progress = data.get("progress")
+            if self._db_path:
+                db = self._connection()
+                for account, state in data["accounts"].items():
+                    self._save_state(db, account, AccountState(**state))
+                db.commit()
+                return len(data["accounts"])
+            self._accounts = OrderedDict(
+                (account, AccountState(**state)) for account, state in data["accounts"].items()
+            )
+            while len(self._accounts) > self.max_accounts:
+                self._accounts.popitem(last=False)
+        return len(self._accounts)
+
+    def stats(self):
+        with self._lock:
+            if self._db_path:
+                accounts = self._connection().execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+            else:
+                accounts = len(self._accounts)
+            return {
+                "accounts": accounts,
+                "max_accounts": self.max_accounts,
+                "updates": self.updates,
+                "evictions": self.evictions,
+                "snapshot": self.snapshot_path,
+                "shared": bool(self._db_path)
+            }
+
+    # Caller holds the lock
+    def _fold(self, state, results):
+        for label, confidence_percent, metrics in results:
+            is_bot = label == "Bot"
+            bot_probability = confidence_percent / 100 if is_bot else 1 - confidence_percent / 100
+            state.update(bot_probability, is_bot, metrics)
+        self.updates += len(results)
+
+    # Caller holds the lock. (account, state) pairs, least recently updated first.
+    def _states(self):
+        if not self._db_path:
+            return list(self._accounts.items())
+        rows = self._connection().execute(f"SELECT account, {', '.join(AccountState.__slots__)} FROM accounts ORDER BY last_seen")
+        return [(row[0], self._state_from_row(row[1:])) for row in rows]
+
+    @staticmethod
+    def _state_from_row(row):
+        state = AccountState(*row)
+        state.metric_sums = json.loads(row[4]) if row[4] else {}
+        return state
+
+    def _load_state(self, db, account):
+        row = db.execute(f"SELECT {', '.join(AccountState.__slots__)} FROM accounts WHERE account = ?", (account,)).fetchone()
+        return None if row is None else self._state_from_row(row)
+
+    def _save_state(self, db, account, state):
+        db.execute(
+            f"INSERT OR REPLACE INTO accounts (account, {', '.join(AccountState.__slots__)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (account, state.tweets, state.bots, state.mean, state.m2, json.dumps(state.metric_sums),
+             state.first_seen, state.last_seen)
+        )
+
+    # A SQLite connection must not be shared across fork(), so each worker
+    # process of the production server opens its own
+    def _connection(self):
+        if self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _open_db(self):
+        db = self._connection()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS accounts (account TEXT PRIMARY KEY, tweets INTEGER, bots INTEGER, "
+            "mean REAL, m2 REAL, metric_sums TEXT, first_seen REAL, last_seen REAL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS accounts_last_seen ON accounts (last_seen)")
+        db.commit()
+
+    # Caller holds the lock
+    def _summary(self, account, state):
+        if state.tweets < self.min_tweets:
+            verdict = "Undecided"
+        else:
+            verdict = "Bot" if state.mean >= self.threshold else "Human"
+        return {
+            "account": account,
+            "verdict": verdict,
+            "tweets": state.tweets,
+            "bot_tweets": state.bots,
+            "bot_probability_mean": round(state.mean, 4),
+            "bot_probability_std": round(math.sqrt(state.variance), 4),
+            # How far the mean could still move: standard error of the mean
+            "bot_probability_stderr": round(math.sqrt(state.variance / state.tweets), 4),
+            "metric_means": {name: round(total / state.tweets, 4) for name, total in state.metric_sums.items()},
+            "first_seen": state.first_seen,
+            "last_seen": state.last_seen
+        }
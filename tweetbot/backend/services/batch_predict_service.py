@@ -0,0 +1,84 @@
+import json
+from itertools import islice
+
+
+class BatchPredictService:
+    # Turn one raw item from the request body into (index, text, want_metrics) or (index, error).
+    #  An item is either a plain string or an object like {"text": "...", "metrics": false}.
+    @staticmethod
+    def _normalize_item(index, item, default_metrics):
+        if isinstance(item, str):
+            return index, item, default_metrics, None
+        if isinstance(item, dict) and isinstance(item.get("text"), str):
+            metrics = item.get("metrics", default_metrics)
+            # Only real JSON booleans, so a string like "false" can't turn metrics on
+            if not isinstance(metrics, bool):
+                return index, None, False, "'metrics' must be true or false"
+            return index, item["text"], metrics, None
+        return index, None, False, "each item must be a string or an object with a 'text' string"
+
+    # Items from a JSON array body (already parsed by Flask)
+    @staticmethod
+    def iter_json_array(data, default_metrics=True):
+        for index, item in enumerate(data):
+            yield BatchPredictService._normalize_item(index, item, default_metrics)
+
+    # Items from an NDJSON body, read line by line so the whole upload is never held in memory
+    @staticmethod
+    def iter_ndjson(lines, default_metrics=True):
+        index = 0
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="ignore")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield index, None, False, "invalid JSON line"
+            else:
+                yield BatchPredictService._normalize_item(index, item, default_metrics)
+            index += 1
+
+    # Read the items a window at a time, sort each window by text length so every chunk
+    # pads to roughly the same size, and yield one NDJSON line per item as soon as its
+    # chunk is done. Lines carry the original "index" since they come back out of order.
+    # predict is components.predict_texts: each chunk goes through the same cache,
+    # duplicate index, cascade and model as /predict, in one call.
+    @staticmethod
+    def stream_predictions(items, predict, chunk_size=32, window_size=1024):
+        items = iter(items)
+        while True:
+            window = list(islice(items, window_size))
+            if not window:
+                return
+
+            valid = []
+            for index, text, want_metrics, error in window:
+                if error is not None:
+                    yield json.dumps({"index": index, "error": error}) + "\n"
+                else:
+                    valid.append((index, text, want_metrics))
+            valid.sort(key=lambda item: len(item[1]))
+
+            for start in range(0, len(valid), chunk_size):
+                chunk = valid[start:start + chunk_size]
+                for line in BatchPredictService._predict_chunk(chunk, predict):
+                    yield line
+
+    @staticmethod
+    def _predict_chunk(chunk, predict):
+        results = predict([text for _, text, _ in chunk], [want_metrics for _, _, want_metrics in chunk])
+        for (index, text, want_metrics), (label, confidence_percent, metrics, stage) in zip(chunk, results):
+            result = {
+                "index": index,
+                "prediction": label,
+                "confidence": confidence_percent,
+                "stage": stage,
+                "text": text
+            }
+            # Metrics are the expensive part, so callers can skip them per item
+            if want_metrics:
+                result["metrics"] = metrics
+            yield json.dumps(result) + "\n"
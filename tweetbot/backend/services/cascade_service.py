@@ -0,0 +1,99 @@
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+
+# The cheap first stage of the cascade: a logistic regression over the regex/count
+# features of processing/preprocess.py (the ones that need no spaCy or TextBlob).
+# It costs a few microseconds per tweet. When its bot probability is outside the
+# uncertainty band [low, high] its answer is final; inside the band the tweet goes
+# on to BERT. The model and band are trained and tuned by train_cascade.py.
+
+# The feature definitions live in processing/text_features.py, so preprocessing and the cascade never drift apart
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "processing"))
+from text_features import COUNT_FEATURES as CHEAP_FEATURES, count_features
+
+
+# The cheap features of one tweet, as a list in CHEAP_FEATURES order
+def cheap_features(text):
+    return list(count_features(text).values())
+
+
+class CheapModel:
+    # Standardized logistic regression: p(bot) = sigmoid(bias + sum(w * (x - mean) / std))
+    def __init__(self, features, mean, std, weights, bias, low=0.2, high=0.8):
+        if features != CHEAP_FEATURES:
+            raise ValueError(f"Cascade model was trained on {features}, expected {CHEAP_FEATURES}")
+        self.features = features
+        self.mean = mean
+        self.std = std
+        self.weights = weights
+        self.bias = bias
+        self.low = low
+        self.high = high
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "features": self.features,
+                "mean": self.mean,
+                "std": self.std,
+                "weights": self.weights,
+                "bias": self.bias,
+                "low": self.low,
+                "high": self.high
+            }, f, indent=2)
+
+    def fingerprint(self):
+        return hashlib.sha256(json.dumps([self.mean, self.std, self.weights, self.bias, self.low, self.high]).encode("utf-8")).hexdigest()[:12]
+
+    def bot_probability(self, text):
+        z = self.bias
+        for x, mean, std, weight in zip(cheap_features(text), self.mean, self.std, self.weights):
+            z += weight * (x - mean) / std
+        # Written this way round so exp() never overflows
+        if z >= 0:
+            return 1 / (1 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1 + e)
+
+
+class CascadeService:
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self.decided = {"cheap": 0, "bert": 0}
+
+    # (label, confidence %) when the cheap model is sure enough, None when the text has to go to BERT
+    def decide(self, text):
+        p = self.model.bot_probability(text)
+        if self.model.low < p < self.model.high:
+            return None
+        self.record("cheap")
+        if p >= 0.5:
+            return "Bot", round(p * 100, 2)
+        return "Human", round((1 - p) * 100, 2)
+
+    def fingerprint(self):
+        return self.model.fingerprint()
+
+    def record(self, stage):
+        with self._lock:
+            self.decided[stage] += 1
+
+    def stats(self):
+        with self._lock:
+            decided = dict(self.decided)
+        total = sum(decided.values())
+        return {
+            "band": [self.model.low, self.model.high],
+            "decided": decided,
+            "escalation_rate": round(decided["bert"] / total, 4) if total else 0.0
+        }
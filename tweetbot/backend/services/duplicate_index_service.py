@@ -0,0 +1,372 @@
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Near-duplicate index of tweet templates (MinHash + LSH).
+#
+# Bots post the same text over and over with only the @mentions and t.co links changed.
+# Each text is normalized (lowercased, @mentions -> @user, links -> url, digits -> 0),
+# cut into 5-character shingles and summarized by a MinHash signature of `num_perm`
+# values. Two texts' signatures agree in about as many positions as their shingle sets
+# overlap (Jaccard similarity). The signature is split into `bands` bands; texts sharing
+# any whole band are candidates, and a candidate whose signature agrees in at least
+# `threshold` of the positions is the same template.
+#
+# Every template is a cluster with its size and how many of its members were labelled
+# human or bot. Clusters live in memory and are saved to SQLite, so the index survives
+# restarts. Each gunicorn worker holds its own copy and only sees what the other workers
+# added after a restart. The SQLite file is shared, so workers only ever add to it:
+#  - a new cluster gets a temporary negative id until SQLite assigns its real one
+#  - counts are written as increments (size = size + n), never as absolute values
+#  - writes are queued and committed in batches (every `flush_every` adds or
+#    `flush_seconds`), not once per prediction, and never while holding the index lock
+#
+# Most served texts are unique and start a cluster of their own, so memory is capped at
+# `max_clusters`: the oldest single-text cluster is evicted first (the smallest, least
+# recently updated one when every cluster has several texts). Evicted single-text clusters
+# are also deleted from SQLite, unless another worker has added to them in the meantime,
+# and a restart only loads the `max_clusters` largest ones.
+
+MENTION_PATTERN = re.compile(r"@\w+")
+LINK_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+DIGIT_PATTERN = re.compile(r"\d+")
+SPACE_PATTERN = re.compile(r"\s+")
+SHINGLE_SIZE = 5
+
+
+class DuplicateIndex:
+    def __init__(self, db_path=None, num_perm=64, bands=16, threshold=0.8, seed=1, flush_every=64, flush_seconds=1.0,
+                 max_clusters=100000):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.seed = seed
+        # Multiply-shift hashing: (a * x + b) mod 2^64, keep the top 32 bits. a is odd.
+        rng = np.random.default_rng(seed)
+        self._a = (rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1))[:, None]
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)[:, None]
+
+        self._lock = threading.Lock()
+        self._signatures = {}
+        self._clusters = {}
+        self._buckets = {}
+        # Ids of the clusters with a single text, oldest first: the first ones evicted
+        self._singletons = OrderedDict()
+        self._next_local_id = -1
+        self.max_clusters = max_clusters
+        self.lookups = 0
+        self.matches = 0
+        self.evictions = 0
+        self._db = None
+        self._db_path = db_path
+        self._db_pid = None
+        # cluster id -> [size, bots, humans, updated_at] not written to SQLite yet
+        self._pending = {}
+        # Stored ids of evicted single-text clusters, deleted from SQLite with the next flush
+        self._evicted = []
+        self._db_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        if db_path:
+            self._open_db()
+            atexit.register(self.flush)
+
+    # Same text for every copy of a template
+    @staticmethod
+    def normalize(text):
+        text = MENTION_PATTERN.sub("@user", text.lower())
+        text = LINK_PATTERN.sub("url", text)
+        text = DIGIT_PATTERN.sub("0", text)
+        return SPACE_PATTERN.sub(" ", text).strip(" .…")
+
+    def signature(self, text):
+        normalized = self.normalize(text)
+        if len(normalized) <= SHINGLE_SIZE:
+            shingles = {normalized}
+        else:
+            shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        with np.errstate(over="ignore"):
+            return ((self._a * hashes + self._b) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+    # (signature, match): the text's signature and its matching cluster as a dict (with the
+    # estimated similarity), or None. Pass both on to add() so it doesn't compute them again.
+    def lookup(self, text):
+        signature = self.signature(text)
+        with self._lock:
+            self.lookups += 1
+            cluster_id, similarity = self._match(signature)
+            if cluster_id is None:
+                return signature, None
+            self.matches += 1
+            return signature, self._describe(cluster_id, similarity)
+
+    # Add one text to its cluster (or start a new one) and return the cluster.
+    # label is "Bot"/"Human" for labelled texts; None only counts the text towards the size.
+    # signature/match are what lookup() returned for the same text.
+    def add(self, text, label=None, signature=None, match=None):
+        if signature is None:
+            signature = self.signature(text)
+        with self._lock:
+            cluster_id, similarity = self._add(signature, text, label, match)
+            result = self._describe(cluster_id, similarity)
+            flush_due = bool(self._db_path) and (
+                len(self._pending) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_seconds
+            )
+        if flush_due:
+            self._flush_or_warn()
+        return result
+
+    # Add many (text, label) pairs and write them with a single commit, for building from the corpora
+    def add_many(self, items):
+        with self._lock:
+            for text, label in items:
+                self._add(self.signature(text), text, label)
+        self.flush()
+
+    # Write the queued clusters and count increments to SQLite in one transaction.
+    # The DB lock is held for the whole flush, so a new cluster is inserted exactly once;
+    # the index lock is only taken to swap the queue and to hand out the new ids.
+    def flush(self):
+        if not self._db_path:
+            return
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                evicted, self._evicted = self._evicted, []
+                self._last_flush = time.monotonic()
+                new_clusters = {
+                    cluster_id: (self._signatures[cluster_id].tobytes(), self._clusters[cluster_id]["example"])
+                    for cluster_id in pending if cluster_id < 0
+                }
+            if not pending and not evicted:
+                return
+
+            db = self._connection()
+            assigned = {}
+            try:
+                for cluster_id, (size, bots, humans, updated_at) in pending.items():
+                    if cluster_id < 0:
+                        signature, example = new_clusters[cluster_id]
+                        cursor = db.execute(
+                            "INSERT INTO clusters (signature, example, size, bots, humans, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                            (signature, example, size, bots, humans, updated_at)
+                        )
+                        assigned[cluster_id] = cursor.lastrowid
+                    else:
+                        db.execute(
+                            "UPDATE clusters SET size = size + ?, bots = bots + ?, humans = humans + ?, "
+                            "updated_at = MAX(updated_at, ?) WHERE id = ?",
+                            (size, bots, humans, updated_at, cluster_id)
+                        )
+                # Another worker may have added to an evicted cluster, then it stays
+                db.executemany("DELETE FROM clusters WHERE id = ? AND size <= 1", [(cluster_id,) for cluster_id in evicted])
+                db.commit()
+            except sqlite3.Error:
+                db.rollback()
+                # Nothing was written, queue the increments and deletes again for the next flush
+                with self._lock:
+                    for cluster_id, counts in pending.items():
+                        self._queue_counts(cluster_id, *counts)
+                    self._evicted.extend(evicted)
+                raise
+
+            with self._lock:
+                for local_id, cluster_id in assigned.items():
+                    self._rename_cluster(local_id, cluster_id)
+
+    def largest(self, count=10):
+        with self._lock:
+            ids = sorted(self._clusters, key=lambda cluster_id: self._clusters[cluster_id]["size"], reverse=True)
+            return [self._describe(cluster_id, None) for cluster_id in ids[:count]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clusters": len(self._clusters),
+                "max_clusters": self.max_clusters,
+                "evictions": self.evictions,
+                "texts": sum(c["size"] for c in self._clusters.values()),
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "match_rate": round(self.matches / self.lookups, 4) if self.lookups else 0.0,
+                "threshold": self.threshold,
+                "persistent": bool(self._db_path),
+                "pending_writes": len(self._pending)
+            }
+
+    # Caller holds the lock
+    def _match(self, signature):
+        best_id, best_similarity = None, 0.0
+        seen = set()
+        for key in self._band_keys(signature):
+            for cluster_id in self._buckets.get(key, ()):
+                if cluster_id in seen:
+                    continue
+                seen.add(cluster_id)
+                similarity = float((self._signatures[cluster_id] == signature).mean())
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best_id, best_similarity = cluster_id, similarity
+        return best_id, round(best_similarity, 4)
+
+    # A failed write on the request path must not fail the prediction, the increments
+    # stay queued and go out with the next flush
+    def _flush_or_warn(self):
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"⚠️ Duplicate index write failed, will retry: {e}")
+
+    # Caller holds the lock. A match from lookup() is reused while its cluster is still there
+    # under that id; a miss is matched again, another thread may have added the template since.
+    def _add(self, signature, text, label, match=None):
+        if match is not None and match["cluster"] in self._clusters:
+            cluster_id, similarity = match["cluster"], match["similarity"]
+        else:
+            cluster_id, similarity = self._match(signature)
+        if cluster_id is None:
+            while self.max_clusters and len(self._clusters) >= self.max_clusters:
+                self._evict()
+            cluster_id, similarity = self._new_cluster(signature, text), 1.0
+        cluster = self._clusters[cluster_id]
+        bots, humans = int(label == "Bot"), int(label == "Human")
+        cluster["size"] += 1
+        if cluster["size"] > 1:
+            self._singletons.pop(cluster_id, None)
+        cluster["bots"] += bots
+        cluster["humans"] += humans
+        cluster["updated_at"] = time.time()
+        if self._db_path:
+            self._queue_counts(cluster_id, 1, bots, humans, cluster["updated_at"])
+        return cluster_id, similarity
+
+    # Caller holds the lock
+    def _queue_counts(self, cluster_id, size, bots, humans, updated_at):
+        counts = self._pending.setdefault(cluster_id, [0, 0, 0, 0.0])
+        counts[0] += size
+        counts[1] += bots
+        counts[2] += humans
+        counts[3] = max(counts[3], updated_at)
+
+    # Caller holds the lock. Give a cluster the id SQLite assigned to it.
+    def _rename_cluster(self, local_id, cluster_id):
+        if local_id not in self._clusters:
+            # Evicted while the flush was writing it
+            self._evicted.append(cluster_id)
+            return
+        if local_id in self._singletons:
+            del self._singletons[local_id]
+            self._singletons[cluster_id] = None
+        self._signatures[cluster_id] = self._signatures.pop(local_id)
+        self._clusters[cluster_id] = self._clusters.pop(local_id)
+        for key in self._band_keys(self._signatures[cluster_id]):
+            bucket = self._buckets[key]
+            bucket[bucket.index(local_id)] = cluster_id
+        # Adds made while the flush was writing are now increments of the stored row
+        if local_id in self._pending:
+            self._queue_counts(cluster_id, *self._pending.pop(local_id))
+
+    # Caller holds the lock. Drop the oldest single-text cluster, or the smallest least
+    # recently updated one if there is none, with its bucket entries.
+    def _evict(self):
+        if self._singletons:
+            cluster_id = self._singletons.popitem(last=False)[0]
+        else:
+            cluster_id = min(self._clusters, key=lambda i: (self._clusters[i]["size"], self._clusters[i]["updated_at"]))
+        for key in self._band_keys(self._signatures.pop(cluster_id)):
+            bucket = self._buckets[key]
+            bucket.remove(cluster_id)
+            if not bucket:
+                del self._buckets[key]
+        size = self._clusters.pop(cluster_id)["size"]
+        if cluster_id < 0:
+            # Never written, its queued row goes with it
+            self._pending.pop(cluster_id, None)
+        elif size <= 1 and self._db_path:
+            self._evicted.append(cluster_id)
+        self.evictions += 1
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    # Caller holds the lock. Clusters loaded from SQLite keep their id, a new one gets a
+    # negative local id until the next flush stores it.
+    def _new_cluster(self, signature, text, cluster_id=None, **counts):
+        if cluster_id is None:
+            cluster_id = self._next_local_id
+            self._next_local_id -= 1
+        self._signatures[cluster_id] = signature
+        self._clusters[cluster_id] = {
+            "example": text,
+            "size": counts.get("size", 0),
+            "bots": counts.get("bots", 0),
+            "humans": counts.get("humans", 0),
+            "updated_at": counts.get("updated_at", time.time())
+        }
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(cluster_id)
+        if self._clusters[cluster_id]["size"] <= 1:
+            self._singletons[cluster_id] = None
+        return cluster_id
+
+    # Caller holds the lock
+    def _describe(self, cluster_id, similarity):
+        cluster = self._clusters[cluster_id]
+        labelled = cluster["bots"] + cluster["humans"]
+        return {
+            "cluster": cluster_id,
+            "size": cluster["size"],
+            "bots": cluster["bots"],
+            "humans": cluster["humans"],
+            "label": None if not labelled else ("Bot" if cluster["bots"] >= cluster["humans"] else "Human"),
+            "purity": round(max(cluster["bots"], cluster["humans"]) / labelled, 4) if labelled else None,
+            "similarity": similarity,
+            "example": cluster["example"]
+        }
+
+    # A SQLite connection must not be shared across fork(), so each worker
+    # process of the production server opens its own
+    def _connection(self):
+        if self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _open_db(self):
+        db = self._connection()
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS clusters (id INTEGER PRIMARY KEY, signature BLOB, example TEXT, "
+            "size INTEGER, bots INTEGER, humans INTEGER, updated_at REAL)"
+        )
+        # Signatures are only comparable when made with the same hash functions
+        settings = f"{self.num_perm}:{self.seed}:{SHINGLE_SIZE}"
+        row = db.execute("SELECT value FROM meta WHERE key = 'minhash'").fetchone()
+        if row is None:
+            db.execute("INSERT INTO meta (key, value) VALUES ('minhash', ?)", (settings,))
+        elif row[0] != settings:
+            raise ValueError(f"{self._db_path} was built with MinHash settings {row[0]}, not {settings}")
+        db.commit()
+
+        # The largest clusters, oldest first so the oldest single-text ones are evicted first
+        for cluster_id, signature, example, size, bots, humans, updated_at in db.execute(
+            "SELECT * FROM (SELECT id, signature, example, size, bots, humans, updated_at FROM clusters "
+            "ORDER BY size DESC, updated_at DESC LIMIT ?) ORDER BY updated_at",
+            (self.max_clusters or -1,)
+        ):
+            self._new_cluster(
+                np.frombuffer(signature, dtype=np.uint32), example, cluster_id,
+                size=size, bots=bots, humans=humans, updated_at=updated_at
+            )
@@ -0,0 +1,37 @@
+import json
+import os
+
+
+class EvaluationReportService:
+    # Reports appended by fine_tune/evaluate.py, one JSON object per line.
+    # Returns {"latest": <newest full report>, "history": [compact rows, oldest first]},
+    # or None when no evaluation has been run yet.
+    @staticmethod
+    def load(path, limit=50):
+        if not os.path.exists(path):
+            return None
+        reports = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    reports.append(json.loads(line))
+        if not reports:
+            return None
+
+        history = []
+        for report in reports[-limit:]:
+            latency = report["speed"].get("latency_ms") or {}
+            history.append({
+                "timestamp": report["timestamp"],
+                "checkpoint": report["checkpoint"],
+                "accuracy": report["accuracy"],
+                "precision": report["precision"],
+                "recall": report["recall"],
+                "f1": report["f1"],
+                "roc_auc": report["roc_auc"],
+                "ece": report["ece"],
+                "tweets_per_sec": report["speed"]["tweets_per_sec"],
+                "latency_p50_ms": latency.get("p50")
+            })
+        return {"latest": reports[-1], "history": history}
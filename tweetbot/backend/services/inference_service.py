@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+
+import torch
+
+from services.instrumentation_service import Instrumentation
+
+
+# One queued /predict call waiting for a batch slot
+class _PendingRequest:
+    __slots__ = ("text", "future", "enqueued_at", "profile")
+
+    def __init__(self, text, profile=None):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        # The caller's per-request stage breakdown (X-Profile), filled in by the worker thread
+        self.profile = profile
+
+
+# Running batch-size and queue-wait statistics.
+# We only keep the last `window` waits so percentiles track the current load
+# instead of everything since startup.
+class _BatchStats:
+    def __init__(self, window=10000):
+        self._lock = threading.Lock()
+        self._waits_ms = deque(maxlen=window)
+        self._batch_sizes = Counter()
+        self.batches = 0
+        self.requests = 0
+        self.forward_ms_total = 0.0
+
+    def record(self, batch_size, waits, forward_seconds):
+        with self._lock:
+            self.batches += 1
+            self.requests += batch_size
+            self.forward_ms_total += forward_seconds * 1000
+            self._batch_sizes[batch_size] += 1
+            self._waits_ms.extend(w * 1000 for w in waits)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            batches, requests, forward_ms_total = self.batches, self.requests, self.forward_ms_total
+
+        def percentile(p):
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))], 3)
+
+        return {
+            "batches": batches,
+            "requests": requests,
+            "mean_batch_size": round(requests / batches, 2) if batches else 0.0,
+            "batch_size_histogram": batch_sizes,
+            "queue_wait_ms": {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99)},
+            "mean_forward_ms": round(forward_ms_total / batches, 3) if batches else 0.0,
+        }
+
+
+class InferenceService:
+    # Dynamic micro-batching in front of the BERT classifier.
+    #  Concurrent callers put their text on a queue and block on a Future.
+    #  A single worker thread takes whatever is queued once either `max_batch_size`
+    #  texts are waiting or the oldest one has waited `max_wait_ms`, pads that batch
+    #  to its longest item, runs one forward pass and hands each caller its own result.
+    # `backend` is one of the classes in model_backends (eager PyTorch, INT8 or ONNX Runtime)
+    def __init__(self, tokenizer, backend, max_batch_size=32, max_wait_ms=5.0, max_length=None):
+        self.tokenizer = tokenizer
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_length = max_length
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._worker_pid = None
+        self._stats = _BatchStats()
+
+    # Classify one text through the batching queue.
+    # Returns (label, confidence_percent) just like the old inline code in app.py.
+    def classify(self, text, timeout=None):
+        request = _PendingRequest(text, Instrumentation.current_profile())
+        with self._cond:
+            self._ensure_worker()
+            self._queue.append(request)
+            self._cond.notify()
+        try:
+            return request.future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            # Still queued: the worker will see the cancellation and skip the text.
+            # Already running: cancel() fails and the result is simply dropped.
+            request.future.cancel()
+            raise
+
+    # Classify a list of texts the caller has already grouped, skipping the queue.
+    def classify_batch(self, texts):
+        if not texts:
+            return []
+        return self._forward(list(texts), [Instrumentation.current_profile()])
+
+    # Label and confidence for every text of an offline job (score_csv.py, score_accounts.py,
+    # train_cascade.py), classified in length-sorted batches so each one is padded only to
+    # tweets of about the same length. Empty texts get no prediction (None, None).
+    def classify_texts(self, texts, batch_size=64):
+        labels, confidences = [None] * len(texts), [None] * len(texts)
+        order = sorted((i for i, text in enumerate(texts) if text), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            for i, (label, confidence) in zip(idx, self.classify_batch([texts[i] for i in idx])):
+                labels[i], confidences[i] = label, confidence
+        return labels, confidences
+
+    def stats(self):
+        stats = self._stats.snapshot()
+        stats["queue_depth"] = len(self._queue)
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = self.max_wait * 1000
+        stats["backend"] = self.backend.name
+        return stats
+
+    # The worker thread is started on first use (and restarted in a forked child,
+    # where threads from the parent process do not exist anymore).
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        self._worker_pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._worker.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            # Wait for the batch to fill up, but never longer than the oldest request's deadline
+            deadline = self._queue[0].enqueued_at + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            while self._queue and len(batch) < self.max_batch_size:
+                request = self._queue.popleft()
+                # Skip callers that gave up while they were still queued
+                if request.future.set_running_or_notify_cancel():
+                    batch.append(request)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for request in batch:
+                Instrumentation.record_stage("queue_wait", started - request.enqueued_at, (request.profile,))
+            try:
+                results = self._forward([request.text for request in batch], [request.profile for request in batch])
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+            self._stats.record(len(batch), [started - request.enqueued_at for request in batch], finished - started)
+
+    # Tokenize with padding to the longest text in this batch, run the model once,
+    # and turn each row of probabilities into (label, confidence %).
+    # Each stage is timed once per batch; `profiles` are the stage dicts of the
+    # requests in the batch that asked for a breakdown (None for the others).
+    def _forward(self, texts, profiles):
+        started = time.perf_counter()
+        inputs = self.tokenizer(
+            texts, return_tensors="pt", truncation=True, padding="longest", max_length=self.max_length
+        )
+        tokenized = time.perf_counter()
+        logits = self.backend.logits(inputs)
+        forwarded = time.perf_counter()
+        probs = torch.nn.functional.softmax(logits, dim=1)
+        confidence, predicted_class = torch.max(probs, dim=1)
+        finished = time.perf_counter()
+
+        for stage, seconds in (("tokenize", tokenized - started), ("forward", forwarded - tokenized), ("softmax", finished - forwarded)):
+            Instrumentation.record_stage(stage, seconds, profiles)
+
+        return [
+            ("Bot" if cls == 1 else "Human", round(conf * 100, 2))
+            for cls, conf in zip(predicted_class.tolist(), confidence.tolist())
+        ]
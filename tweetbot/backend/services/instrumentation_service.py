@@ -0,0 +1,141 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from 0.1 ms up to 10 s
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The stage breakdown of the current request, only set when the caller asked for it
+_current_profile = contextvars.ContextVar("profile", default=None)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Instrumentation:
+    # Per-stage timers and request counters for the API, rendered in the
+    # Prometheus text format by /metrics. Recording a value is a perf_counter
+    # call, a bisect and a few additions under a lock, so it is cheap enough
+    # to leave on for every request.
+    _lock = threading.Lock()
+    _stages = defaultdict(_Histogram)
+    _requests = defaultdict(_Histogram)
+    _request_counts = defaultdict(int)
+    _in_flight = defaultdict(int)
+
+    # Observe one stage timing. It is also added to the breakdown of the current
+    # request, or to each of `profiles` when one timing covers several requests
+    # (a micro-batch that ran on the batcher thread).
+    @staticmethod
+    def record_stage(name, seconds, profiles=None):
+        with Instrumentation._lock:
+            Instrumentation._stages[name].observe(seconds)
+        if profiles is None:
+            profiles = (_current_profile.get(),)
+        for profile in profiles:
+            if profile is not None:
+                profile[name] = profile.get(name, 0.0) + seconds * 1000
+
+    # with Instrumentation.stage("tokenize"): ...
+    @staticmethod
+    @contextmanager
+    def stage(name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            Instrumentation.record_stage(name, time.perf_counter() - started)
+
+    # The stage dict of the current request (or None), so work handed to another
+    # thread (like the micro-batcher) can still report its stages to that request
+    @staticmethod
+    def current_profile():
+        return _current_profile.get()
+
+    # Wraps one API request: counts it, tracks it as in flight and times it.
+    # With profile=True it yields a dict that collects the time of every stage
+    # (in ms) that runs for this request, to send back in the response.
+    @staticmethod
+    @contextmanager
+    def track_request(endpoint, profile=False):
+        stages = {} if profile else None
+        token = _current_profile.set(stages)
+        with Instrumentation._lock:
+            Instrumentation._in_flight[endpoint] += 1
+        started = time.perf_counter()
+        status = "error"
+        try:
+            yield stages
+            status = "ok"
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_profile.reset(token)
+            with Instrumentation._lock:
+                Instrumentation._in_flight[endpoint] -= 1
+                Instrumentation._requests[endpoint].observe(elapsed)
+                Instrumentation._request_counts[(endpoint, status)] += 1
+            if stages is not None:
+                stages["total"] = elapsed * 1000
+                for name in stages:
+                    stages[name] = round(stages[name], 3)
+
+    # Prometheus text exposition. `extra` is a list of (name, type, help, {labels: value} or value)
+    # for numbers owned by other services (cache, batcher, model memory).
+    @staticmethod
+    def render_prometheus(extra=()):
+        with Instrumentation._lock:
+            stages = {name: (list(h.counts), h.total, h.count) for name, h in Instrumentation._stages.items()}
+            requests = {name: (list(h.counts), h.total, h.count) for name, h in Instrumentation._requests.items()}
+            request_counts = dict(Instrumentation._request_counts)
+            in_flight = dict(Instrumentation._in_flight)
+
+        lines = []
+        Instrumentation._render_histograms(lines, "tweetbot_stage_seconds", "Time spent in each hot-path stage", "stage", stages)
+        Instrumentation._render_histograms(lines, "tweetbot_request_seconds", "End-to-end request latency", "endpoint", requests)
+
+        lines.append("# HELP tweetbot_requests_total Requests handled by endpoint and outcome")
+        lines.append("# TYPE tweetbot_requests_total counter")
+        for (endpoint, status), count in sorted(request_counts.items()):
+            lines.append(f'tweetbot_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        lines.append("# HELP tweetbot_requests_in_flight Requests currently being handled")
+        lines.append("# TYPE tweetbot_requests_in_flight gauge")
+        for endpoint, count in sorted(in_flight.items()):
+            lines.append(f'tweetbot_requests_in_flight{{endpoint="{endpoint}"}} {count}')
+
+        for name, metric_type, help_text, values in extra:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if isinstance(values, dict):
+                for labels, value in values.items():
+                    lines.append(f"{name}{{{labels}}} {value}")
+            else:
+                lines.append(f"{name} {values}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, label, histograms):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{label}="{key}"}} {total}')
+            lines.append(f'{name}_count{{{label}="{key}"}} {count}')
@@ -0,0 +1,83 @@
+import os
+
+import torch
+
+# Backends the classifier can run on:
+#  pytorch   - the fp32 BertForSequenceClassification as trained
+#  int8      - the same model with its Linear layers dynamically quantized to INT8
+#  onnx      - model.onnx (made by export_model.py) run through ONNX Runtime
+#  onnx-int8 - model.int8.onnx, the ONNX graph with INT8 weights
+BACKENDS = ("pytorch", "int8", "onnx", "onnx-int8")
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+
+
+# Every backend takes the tokenizer's output and returns a [batch, 2] tensor of logits
+class TorchBackend:
+    def __init__(self, model, name="pytorch"):
+        self.model = model
+        self.name = name
+
+    def logits(self, inputs):
+        with torch.no_grad():
+            return self.model(**inputs).logits
+
+    # Bytes held by the weights. Quantized Linear layers keep theirs packed
+    # outside parameters(), so count every tensor in the state dict instead.
+    def memory_bytes(self):
+        total = 0
+        for value in self.model.state_dict().values():
+            tensors = value if isinstance(value, tuple) else (value,)
+            total += sum(t.numel() * t.element_size() for t in tensors if isinstance(t, torch.Tensor))
+        return total
+
+
+class OnnxBackend:
+    def __init__(self, onnx_path, threads=None, name="onnx"):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.onnx_path = onnx_path
+        self.name = name
+
+    def logits(self, inputs):
+        feed = {name: inputs[name].numpy() for name in self.input_names}
+        return torch.from_numpy(self.session.run(["logits"], feed)[0])
+
+    # ONNX Runtime keeps the initializers from the file, so its size is the weight memory
+    def memory_bytes(self):
+        return os.path.getsize(self.onnx_path)
+
+
+# When the folder has a model.safetensors (`python export_model.py safetensors`),
+# from_pretrained picks it over pytorch_model.bin and memory-maps the weights instead of
+# unpickling them. low_cpu_mem_usage skips building a randomly initialised model first.
+# Both make startup faster and avoid holding two copies of the weights while loading.
+def load_fp32_model(model_path):
+    from transformers import BertForSequenceClassification
+
+    model = BertForSequenceClassification.from_pretrained(model_path, low_cpu_mem_usage=True)
+    model.eval()
+    return model
+
+
+def load_backend(model_path, backend="pytorch"):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}', expected one of {', '.join(BACKENDS)}")
+
+    if backend in ONNX_FILES:
+        onnx_path = os.path.join(model_path, ONNX_FILES[backend])
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"{onnx_path} not found, run `python export_model.py export` first")
+        return OnnxBackend(onnx_path, threads=torch.get_num_threads(), name=backend)
+
+    model = load_fp32_model(model_path)
+    if backend == "int8":
+        # Only the Linear layers (almost all of BERT's compute) are quantized,
+        # activations are quantized on the fly for every batch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return TorchBackend(model, name=backend)
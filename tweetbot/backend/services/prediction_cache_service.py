@@ -0,0 +1,185 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+class PredictionCache:
+    # Bounded LRU of finished predictions (label, confidence and metrics).
+    #  Keys are a hash of the model version plus the normalized text, so a new model
+    #  never serves answers from an old one.
+    #  Entries older than `ttl_seconds` are treated as misses (no TTL when None).
+    #  With `db_path` set, entries are also saved to SQLite and the newest `max_entries`
+    #  are loaded back at startup, so a warm cache survives restarts. Writes are queued
+    #  and committed in batches (every `flush_every` puts or `flush_seconds`), outside the
+    #  cache lock, so a cache miss never waits on a disk commit. The SQLite file is shared
+    #  by all workers: evicting from one worker's LRU leaves the row for the others, and
+    #  the file is pruned separately by age (ttl) and size (newest `max_entries` rows).
+    def __init__(self, model_version, max_entries=10000, ttl_seconds=None, db_path=None,
+                 flush_every=64, flush_seconds=1.0):
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        self._db_path = db_path
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self._flushes = 0
+        if db_path:
+            self._open_db()
+            atexit.register(self.flush)
+
+    # Texts that only differ in unicode composition or surrounding whitespace share an entry
+    @staticmethod
+    def normalize(text):
+        return unicodedata.normalize("NFC", text).strip()
+
+    # A short fingerprint of the model files, used as the model version when none is given
+    @staticmethod
+    def model_fingerprint(model_path):
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(model_path)):
+            stat = os.stat(os.path.join(model_path, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def key(self, text):
+        data = f"{self.model_version}\0{self.normalize(text)}".encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    # Returns the cached dict or None
+    def get(self, text):
+        key = self.key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, text, value):
+        key = self.key(text)
+        created_at = time.time()
+        flush_due = False
+        with self._lock:
+            self._store(key, created_at, value)
+            if self._db_path:
+                self._pending.append((key, created_at, json.dumps(value)))
+                flush_due = (len(self._pending) >= self.flush_every
+                             or time.monotonic() - self._last_flush >= self.flush_seconds)
+        if flush_due:
+            self._flush_or_warn()
+
+    # Write the queued entries to SQLite in one transaction. Only the swap of the queue
+    # happens under the cache lock; the commit runs under a separate DB lock.
+    # On a SQLite error (e.g. "database is locked" while another worker writes) the
+    # transaction is rolled back, the rows go back in the queue and the error is raised.
+    def flush(self):
+        if not self._db_path:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        with self._db_lock:
+            db = self._connection()
+            try:
+                db.executemany("INSERT OR REPLACE INTO predictions (key, created_at, value) VALUES (?, ?, ?)", pending)
+                self._flushes += 1
+                # Pruning scans the table, so it only runs every 100 flushes
+                if self._flushes % 100 == 0:
+                    self._prune(db)
+                db.commit()
+            except sqlite3.Error:
+                db.rollback()
+                # Older rows first; never queue more than the cache itself holds
+                with self._lock:
+                    self._pending = (pending + self._pending)[-self.max_entries:]
+                raise
+
+    # A cache write must never fail the prediction it caches: the rows stay queued
+    # and go out with the next flush
+    def _flush_or_warn(self):
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"⚠️ Prediction cache write failed, will retry: {e}")
+
+    # A SQLite connection must not be shared across fork(), so each worker
+    # process of the production server opens its own
+    def _connection(self):
+        if self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "persistent": bool(self._db_path),
+                "pending_writes": len(self._pending)
+            }
+
+    def _expired(self, created_at):
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    # Caller holds the lock
+    def _store(self, key, created_at, value):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # Drop expired rows and keep only the newest max_entries rows of the shared file
+    def _prune(self, db):
+        if self.ttl_seconds is not None:
+            db.execute("DELETE FROM predictions WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        db.execute(
+            "DELETE FROM predictions WHERE key NOT IN (SELECT key FROM predictions ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def _open_db(self):
+        db = self._connection()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, created_at REAL, value TEXT)"
+        )
+        # Rows from older model versions can never match a key again, they just age out
+        rows = db.execute(
+            "SELECT key, created_at, value FROM predictions ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for key, created_at, value in reversed(rows):
+            if not self._expired(created_at):
+                self._entries[key] = (created_at, json.loads(value))
+        self._prune(db)
+        db.commit()
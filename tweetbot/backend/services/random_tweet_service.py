@@ -1,33 +1,112 @@
-import pandas as pd
+import csv
+import os
 import random
+import threading
+from array import array
 from pathlib import Path
 
+from services.instrumentation_service import Instrumentation
+from services.tweet_text import decode_tweet_text
+
+
+# All tweets of one CSV decoded once and packed into a single string plus an offset array,
+# so a sample is just a slice instead of a re-read of the file.
+# The corpus is reloaded only when the file's mtime changes.
+class _TweetCorpus:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._text = ""
+        self._offsets = array("q", [0])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with Instrumentation.stage("corpus_load"):
+                self._read(mtime)
+
+    def _read(self, mtime):
+        texts = []
+        offsets = array("q", [0])
+        for value in self._raw_texts():
+            text = decode_tweet_text(value)
+            if not text:
+                continue
+            texts.append(text)
+            offsets.append(offsets[-1] + len(text))
+        # Swap both at once so concurrent readers never see a half-built corpus
+        self._text, self._offsets = "".join(texts), offsets
+        self._mtime = mtime
+
+    # The "text" column, from a CSV or (only that column, memory-mapped) from Parquet/Arrow
+    def _raw_texts(self):
+        suffix = self.path.suffix.lower()
+        if suffix == ".csv":
+            with open(self.path, newline="", encoding="utf-8") as f:
+                return [row.get("text") for row in csv.DictReader(f)]
+
+        import pyarrow as pa
+        if suffix == ".parquet":
+            import pyarrow.parquet as pq
+            table = pq.read_table(self.path, columns=["text"], memory_map=True)
+        else:
+            with pa.memory_map(str(self.path), "r") as source:
+                table = pa.ipc.open_file(source).read_all().select(["text"])
+        return table.column("text").to_pylist()
+
+    def sample(self):
+        self.load()
+        offsets = self._offsets
+        count = len(offsets) - 1
+        if count == 0:
+            return None
+        i = random.randrange(count)
+        return self._text[offsets[i]:offsets[i + 1]]
+
+
+# A Parquet or Arrow version of a corpus (processing/preprocess_tweet_only.py --format parquet)
+# is used instead of the CSV when it is there
+def _corpus_path(data_dir, name):
+    for suffix in (".parquet", ".arrow", ".csv"):
+        path = data_dir / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return data_dir / f"{name}.csv"
+
+
 class RandomTweetService:
-    @staticmethod
-    def get_random_tweet(): # Define base and data directory path
-        base_dir = Path(__file__).resolve().parent.parent
-        data_dir = base_dir / "data"
+    # Define base and data directory path
+    base_dir = Path(__file__).resolve().parent.parent
+    data_dir = base_dir / "data"
 
-        # Set paths to human and bot tweet CSV files
-        human_path = data_dir / "clean_human_tweets.csv"  
-        bot_path = data_dir / "clean_bot_tweets.csv"
+    # Set paths to human and bot tweet files
+    corpora = {
+        "human": _TweetCorpus(_corpus_path(data_dir, "clean_human_tweets")),
+        "bot": _TweetCorpus(_corpus_path(data_dir, "clean_bot_tweets"))
+    }
 
+    # Decode both corpora up front so the first /random-predict call doesn't pay for it
+    @staticmethod
+    def preload():
+        for corpus in RandomTweetService.corpora.values():
+            corpus.load()
+
+    @staticmethod
+    def get_random_tweet():
         try:
             # Randomly pick bot or human
-            if random.random() < 0.5:
-                df = pd.read_csv(human_path)
-                origin = "human"
-            else:
-                df = pd.read_csv(bot_path)
-                origin = "bot"
-
-            # Fix for byte-encoded strings if necessary
-            df["text"] = df["text"].apply(
-                lambda t: eval(t).decode("utf-8", errors="ignore") if isinstance(t, str) and t.startswith("b'") else t
-            )
-            
+            origin = "human" if random.random() < 0.5 else "bot"
+
             # Return the tweet text and its origin(bot or human)
-            tweet = df.sample(1)["text"].values[0]
+            tweet = RandomTweetService.corpora[origin].sample()
             return tweet, origin
 
         except Exception as e:
@@ -1,35 +1,82 @@
 import re
-import pandas as pd
-from textblob import TextBlob
-import spacy
+import threading
+
+from services.instrumentation_service import Instrumentation
+
+# We only need POS tags, which come from tok2vec + tagger + attribute_ruler.
+# Leaving out the parser, NER and lemmatizer makes each doc several times cheaper
+# without changing any of the tags.
+# spaCy (and TextBlob) are imported and loaded on first use, not when this module is
+# imported, so tools that never compute metrics don't pay the seconds it takes.
+# The POS attribute and TextBlob are resolved at the same time, once, instead of per text.
+_nlp = None
+_nlp_lock = threading.Lock()
+_POS = None
+_TextBlob = None
+
+def get_nlp():
+    global _nlp, _POS, _TextBlob
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                from spacy.attrs import POS
+                from textblob import TextBlob
+                _POS, _TextBlob = POS, TextBlob
+                _nlp = spacy.load("en_core_web_sm", exclude=["parser", "ner", "lemmatizer"])
+    return _nlp
+
+LINK_PATTERN = re.compile(r"http[s]?://\S+")
 
-nlp = spacy.load("en_core_web_sm")
 
 class TextMetricsService:
     @staticmethod
     def extract_feature_metrics(text):
-        features = {}
+        with Instrumentation.stage("spacy"):
+            doc = get_nlp()(text)
+        return TextMetricsService._features_from_doc(text, doc)
 
-        # Basic text stats
-        features["char_count"] = len(text)
-        features["word_count"] = len(text.split())
-        features["avg_word_length"] = features["char_count"] / (features["word_count"] or 1)
+    # Same output as extract_feature_metrics for a whole list of texts.
+    # nlp.pipe tags the texts in batches (and across n_process worker processes
+    # if asked), which is much faster than calling nlp() once per text.
+    @staticmethod
+    def extract_feature_metrics_batch(texts, batch_size=64, n_process=1):
+        texts = list(texts)
+        with Instrumentation.stage("spacy"):
+            docs = list(get_nlp().pipe(texts, batch_size=batch_size, n_process=n_process))
+        return [TextMetricsService._features_from_doc(text, doc) for text, doc in zip(texts, docs)]
 
-        # Special characters
-        features["exclamation_count"] = text.count("!")
-        features["hashtag_count"] = text.count("#")
-        features["mention_count"] = text.count("@")
-        features["link_count"] = len(re.findall(r"http[s]?://\S+", text))
+    @staticmethod
+    # Only called with docs from get_nlp(), so _POS and _TextBlob are set
+    def _features_from_doc(text, doc):
+        features = TextMetricsService._count_features(text)
 
         # Sentiment polarity
-        blob = TextBlob(text)
-        features["sentiment_polarity"] = blob.sentiment.polarity
+        with Instrumentation.stage("textblob"):
+            features["sentiment_polarity"] = _TextBlob(text).sentiment.polarity
 
         # POS tag counts
-        doc = nlp(text)
-        pos_counts = doc.count_by(spacy.attrs.POS)
+        pos_counts = doc.count_by(_POS)
         for pos_id, count in pos_counts.items():
             pos = doc.vocab[pos_id].text
             features[f"pos_{pos.lower()}_count"] = count
 
-        return features
\ No newline at end of file
+        return features
+
+    # The cheap features, computed in one go without any NLP model
+    @staticmethod
+    def _count_features(text):
+        char_count = len(text)
+        word_count = len(text.split())
+        return {
+            # Basic text stats
+            "char_count": char_count,
+            "word_count": word_count,
+            "avg_word_length": char_count / (word_count or 1),
+
+            # Special characters
+            "exclamation_count": text.count("!"),
+            "hashtag_count": text.count("#"),
+            "mention_count": text.count("@"),
+            "link_count": len(LINK_PATTERN.findall(text))
+        }
@@ -0,0 +1,17 @@
+import ast
+
+
+# The scraped tweets were saved as Python byte-string literals, e.g. b'caf\xc3\xa9 \xe2\x80\xa6'.
+# Turn those back into normal text. ast.literal_eval only accepts literals, so unlike eval()
+# a malformed or malicious row can never run code; anything that isn't a byte literal is
+# returned unchanged.
+def decode_tweet_text(value):
+    if not isinstance(value, str) or len(value) < 3 or value[0] != "b" or value[1] not in ("'", '"'):
+        return value
+    try:
+        raw = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+    if isinstance(raw, bytes):
+        return raw.decode("utf-8", errors="ignore")
+    return value
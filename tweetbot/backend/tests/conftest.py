@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend runs from its own folder (from services.x import X), so the tests do too
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
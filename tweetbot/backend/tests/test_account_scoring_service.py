@@ -0,0 +1,103 @@
+import pytest
+
+from services.account_scoring_service import AccountStore
+
+
+def test_running_score_of_one_account():
+    store = AccountStore(min_tweets=3)
+    # Bot at 90% is p(bot) 0.9, Human at 80% is p(bot) 0.2
+    first = store.update("alice", "Bot", 90.0, {"char_count": 10})
+    assert first["verdict"] == "Undecided"
+    assert first["tweets"] == 1
+    assert first["bot_probability_mean"] == 0.9
+    assert first["bot_probability_std"] == 0.0
+
+    store.update("alice", "Human", 80.0, {"char_count": 20, "language": "en"})
+    summary = store.update("alice", "Bot", 100.0)
+
+    # p(bot) 0.9, 0.2, 1.0: mean 0.7, sample variance 0.38 / 2 = 0.19
+    assert summary["verdict"] == "Bot"
+    assert summary["tweets"] == 3
+    assert summary["bot_tweets"] == 2
+    assert summary["bot_probability_mean"] == 0.7
+    assert summary["bot_probability_std"] == 0.4359
+    assert summary["bot_probability_stderr"] == 0.2517
+    # Non-numeric metrics are skipped, the means are over every tweet of the account
+    assert summary["metric_means"] == {"char_count": 10.0}
+    assert store.get("alice") == summary
+    assert store.get("bob") is None
+
+
+def test_human_verdict_below_threshold():
+    store = AccountStore(min_tweets=2, threshold=0.5)
+    store.update("bob", "Human", 90.0)
+    summary = store.update("bob", "Human", 70.0)
+    assert summary["verdict"] == "Human"
+    assert summary["bot_probability_mean"] == 0.2
+
+
+def test_least_recently_updated_account_is_evicted():
+    store = AccountStore(max_accounts=2)
+    store.update("a", "Bot", 90.0)
+    store.update("b", "Bot", 90.0)
+    store.update("a", "Bot", 90.0)
+    store.update("c", "Bot", 90.0)
+    assert store.get("b") is None
+    assert [summary["account"] for summary in store.summaries()] == ["a", "c"]
+    assert store.stats()["evictions"] == 1
+    assert store.stats()["updates"] == 4
+
+
+def test_snapshot_and_restore(tmp_path):
+    path = str(tmp_path / "accounts.json")
+    store = AccountStore(min_tweets=1, snapshot_path=path)
+    store.update_many("alice", [("Bot", 90.0, {"char_count": 10}), ("Human", 60.0, None)])
+    assert store.snapshot() == 1
+
+    restored = AccountStore(min_tweets=1, snapshot_path=path)
+    assert restored.get("alice") == store.get("alice")
+    assert restored.get("alice")["tweets"] == 2
+
+
+def test_shared_store_sees_every_process_tweets(tmp_path):
+    path = str(tmp_path / "accounts.db")
+    worker_a = AccountStore(min_tweets=1, db_path=path)
+    worker_b = AccountStore(min_tweets=1, db_path=path)
+    worker_a.update("alice", "Bot", 90.0)
+    summary = worker_b.update_many("alice", [("Bot", 70.0, None), ("Human", 100.0, None)])
+
+    # p(bot) 0.9, 0.7, 0.0
+    assert summary["tweets"] == 3
+    assert summary["bot_tweets"] == 2
+    assert summary["bot_probability_mean"] == pytest.approx(0.5333, abs=1e-4)
+    assert worker_a.get("alice") == summary
+    assert worker_a.stats()["accounts"] == 1
+    assert worker_a.stats()["shared"] is True
+
+
+def test_shared_store_matches_in_memory_store(tmp_path):
+    results = [("Bot", 90.0, {"char_count": 10}), ("Human", 80.0, {"char_count": 30}), ("Bot", 55.0, None)]
+    memory = AccountStore(min_tweets=2)
+    shared = AccountStore(min_tweets=2, db_path=str(tmp_path / "accounts.db"))
+    for label, confidence, metrics in results:
+        memory.update("alice", label, confidence, metrics)
+    shared.update_many("alice", results)
+
+    expected = memory.get("alice")
+    actual = shared.get("alice")
+    for key in ("first_seen", "last_seen"):
+        expected.pop(key)
+        actual.pop(key)
+    assert actual == expected
+
+
+def test_snapshot_keeps_progress(tmp_path):
+    path = str(tmp_path / "accounts.json")
+    store = AccountStore(min_tweets=1, snapshot_path=path)
+    assert store.progress is None
+    store.update("alice", "Bot", 90.0)
+    store.snapshot(progress={"chunks_done": 1, "rows_done": 10})
+
+    restored = AccountStore(min_tweets=1, snapshot_path=path)
+    assert restored.progress == {"chunks_done": 1, "rows_done": 10}
+    assert restored.get("alice")["tweets"] == 1
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+os.environ["WARMUP"] = "off"
+
+import app as flask_app
+import components as components_module
+from components import Components
+from services.duplicate_index_service import DuplicateIndex
+from services.prediction_cache_service import PredictionCache
+from services.text_metrics_service import TextMetricsService
+
+
+class FakeInference:
+    def __init__(self):
+        self.batches = []
+
+    def classify_batch(self, texts):
+        self.batches.append(list(texts))
+        return [("Bot", 90.0) if "bot" in text else ("Human", 80.0) for text in texts]
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    loaded = Components()
+    loaded._loaded.update({
+        "inference": FakeInference(),
+        "prediction_cache": PredictionCache("v1"),
+        "cascade": False,
+        "duplicates": DuplicateIndex()
+    })
+    monkeypatch.setattr(components_module, "components", loaded)
+    monkeypatch.setattr(TextMetricsService, "extract_feature_metrics_batch",
+                        staticmethod(lambda texts: [{"char_count": len(text)} for text in texts]))
+    return loaded
+
+
+def predict_batch(body, query=""):
+    response = flask_app.app.test_client().post(f"/predict-batch{query}", json=body)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()] if response.status_code == 200 else None
+    return response.status_code, lines
+
+
+@pytest.mark.parametrize("flag", ["0", "no", "off", ""])
+def test_metrics_flag_is_parsed_strictly(loaded, flag):
+    assert predict_batch(["hello"], f"?metrics={flag}")[0] == 400
+
+
+def test_metrics_flag(loaded):
+    _, lines = predict_batch(["hello", {"text": "hi bot", "metrics": True}], "?metrics=FALSE")
+    by_index = {line["index"]: line for line in lines}
+    assert "metrics" not in by_index[0]
+    assert by_index[1]["metrics"] == {"char_count": 6}
+
+
+def test_batch_items_use_the_same_chain_as_predict(loaded):
+    template = "Win a free iPhone today, just follow {} and click the link, bot"
+    status, lines = predict_batch([template.format(name) for name in ("@alice", "@bob", "@carol")])
+    assert status == 200
+    assert [line["stage"] for line in lines] == ["bert"] * 3
+    assert loaded.duplicates.stats()["texts"] == 3
+
+    # Copies of a labelled template now come from the index, repeated texts from the cache
+    _, lines = predict_batch([template.format("@dave"), template.format("@alice")])
+    assert sorted(line["stage"] for line in lines) == ["bert", "duplicate"]
+    assert len(loaded.inference.batches) == 1
@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ["WARMUP"] = "off"
+
+pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestClient, TestServer
+
+import app as flask_app
+import async_app
+import components as components_module
+from components import Components
+from services.duplicate_index_service import DuplicateIndex
+from services.random_tweet_service import RandomTweetService
+
+
+def request(app, method, path, **kwargs):
+    async def send():
+        async with TestClient(TestServer(app)) as client:
+            response = await client.request(method, path, **kwargs)
+            return response.status, await response.json()
+    return asyncio.run(send())
+
+
+@pytest.mark.parametrize("corpora, ready", [({"human": ["a"], "bot": ["b"]}, True), ({"human": ["a"], "bot": []}, False)])
+def test_both_servers_share_the_readiness_rule(monkeypatch, corpora, ready):
+    loaded = Components()
+    loaded.warmup_state = "done"
+    monkeypatch.setattr(async_app, "components", loaded)
+    monkeypatch.setattr(flask_app, "components", loaded)
+    monkeypatch.setattr(RandomTweetService, "corpora", corpora)
+
+    status, body = request(async_app.create_app(), "GET", "/readyz")
+    assert (status, body["ready"]) == (200 if ready else 503, ready)
+    response = flask_app.app.test_client().get("/readyz")
+    assert (response.status_code, response.get_json()["ready"]) == (200 if ready else 503, ready)
+
+
+def test_duplicate_lookup_sheds_load(monkeypatch):
+    loaded = Components()
+    loaded._loaded["duplicates"] = DuplicateIndex()
+    monkeypatch.setattr(async_app, "components", loaded)
+    monkeypatch.setattr(components_module, "components", loaded)
+
+    app = async_app.create_app(max_queue=1)
+
+    async def lookups():
+        async with TestClient(TestServer(app)) as client:
+            first = await client.post("/duplicate-lookup", json={"text": "hello there"})
+            app["queue"].depth = 1
+            second = await client.post("/duplicate-lookup", json={"text": "hello there"})
+            return (first.status, await first.json()), (second.status, await second.json())
+
+    (status, body), (shed_status, shed_body) = asyncio.run(lookups())
+    assert (status, body["match"]) == (200, None)
+    assert (shed_status, shed_body["error"]) == (429, "too many requests")
@@ -0,0 +1,87 @@
+import os
+
+os.environ["WARMUP"] = "off"
+
+import components as components_module
+from components import Components, predict_text, predict_texts, score_account
+from services.account_scoring_service import AccountStore
+from services.duplicate_index_service import DuplicateIndex
+from services.prediction_cache_service import PredictionCache
+from services.text_metrics_service import TextMetricsService
+
+
+class FakeInference:
+    def __init__(self):
+        self.batches = []
+
+    def classify(self, text):
+        return self.classify_batch([text])[0]
+
+    def classify_batch(self, texts):
+        self.batches.append(list(texts))
+        return [("Bot", 90.0) if "bot" in text else ("Human", 80.0) for text in texts]
+
+
+def fake_metrics(text):
+    return {"char_count": len(text)}
+
+
+def make_components(monkeypatch):
+    loaded = Components()
+    loaded._loaded.update({
+        "inference": FakeInference(),
+        "prediction_cache": PredictionCache("v1"),
+        "cascade": False,
+        "duplicates": False,
+        "accounts": AccountStore(min_tweets=1)
+    })
+    monkeypatch.setattr(components_module, "components", loaded)
+    monkeypatch.setattr(TextMetricsService, "extract_feature_metrics", staticmethod(fake_metrics))
+    monkeypatch.setattr(TextMetricsService, "extract_feature_metrics_batch",
+                        staticmethod(lambda texts: [fake_metrics(text) for text in texts]))
+    return loaded
+
+
+def test_predict_texts_matches_predict_text(monkeypatch):
+    texts = ["i am a bot", "hello there", "i am a bot"]
+    make_components(monkeypatch)
+    expected = [predict_text(text) for text in texts]
+
+    loaded = make_components(monkeypatch)
+    assert predict_texts(texts) == expected
+    # Repeated texts are classified once, all misses in one batch
+    assert loaded.inference.batches == [["i am a bot", "hello there"]]
+
+
+def test_predict_texts_serves_cache_hits(monkeypatch):
+    loaded = make_components(monkeypatch)
+    predict_text("hello there")
+    loaded.prediction_cache.put("cached without metrics", {"prediction": "Bot", "confidence": 70.0, "metrics": None})
+    loaded.inference.batches.clear()
+
+    results = predict_texts(["hello there", "cached without metrics", "new bot"])
+    assert loaded.inference.batches == [["new bot"]]
+    assert results[1] == ("Bot", 70.0, fake_metrics("cached without metrics"), "bert")
+    assert loaded.prediction_cache.get("cached without metrics")["metrics"] == fake_metrics("cached without metrics")
+
+
+def test_score_account_classifies_tweets_together(monkeypatch):
+    loaded = make_components(monkeypatch)
+    summary = score_account("alice", ["bot one", "bot two", "human"])
+    assert loaded.inference.batches == [["bot one", "bot two", "human"]]
+    assert summary["tweets"] == 3
+    assert summary["bot_tweets"] == 2
+    assert score_account("alice", []) == summary
+
+
+def test_copies_of_a_labelled_template_skip_the_model(monkeypatch):
+    loaded = make_components(monkeypatch)
+    loaded._loaded["duplicates"] = DuplicateIndex()
+    template = "Win a free iPhone today, just follow {} and click the link, bot"
+    for name in ("@alice", "@bob", "@carol"):
+        assert predict_text(template.format(name))[3] == "bert"
+
+    results = predict_texts([template.format("@dave"), template.format("@erin")])
+    assert [stage for _, _, _, stage in results] == ["duplicate", "duplicate"]
+    assert len(loaded.inference.batches) == 3
+    assert loaded.duplicates.stats()["texts"] == 5
@@ -0,0 +1,156 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from services.duplicate_index_service import DuplicateIndex
+
+TEMPLATE = "Win a free iPhone today, just follow {} and click {}"
+
+
+# Flushes only happen when a test asks for them
+def make_index(db_path=None, max_clusters=100000):
+    return DuplicateIndex(db_path, flush_every=1000, flush_seconds=3600, max_clusters=max_clusters)
+
+
+def test_normalize_removes_what_changes_between_copies():
+    assert DuplicateIndex.normalize("Check THIS out @bob https://t.co/abc  2024!") == "check this out @user url 0!"
+    assert DuplicateIndex.normalize("  Same text...  ") == "same text"
+
+
+def test_bands_must_divide_num_perm():
+    with pytest.raises(ValueError):
+        DuplicateIndex(num_perm=64, bands=10)
+
+
+def test_copies_of_a_template_share_a_cluster():
+    index = make_index()
+    assert index.lookup(TEMPLATE.format("@alice", "http://t.co/a1"))[1] is None
+
+    first = index.add(TEMPLATE.format("@alice", "http://t.co/a1"), "Bot")
+    assert first["size"] == 1
+    assert first["bots"] == 1
+    assert first["similarity"] == 1.0
+
+    second = index.add(TEMPLATE.format("@bob", "https://t.co/b2"), "Bot")
+    assert second["cluster"] == first["cluster"]
+    assert second["size"] == 2
+    assert second["label"] == "Bot"
+    assert second["purity"] == 1.0
+
+    third = index.add(TEMPLATE.format("@carol", "https://t.co/c3"), "Human")
+    assert (third["bots"], third["humans"], third["purity"]) == (2, 1, 0.6667)
+
+    # Unlabelled texts only count towards the size
+    fourth = index.add(TEMPLATE.format("@dave", "https://t.co/d4"))
+    assert (fourth["size"], fourth["bots"], fourth["humans"]) == (4, 2, 1)
+
+    _, match = index.lookup(TEMPLATE.format("@erin", "https://t.co/e5"))
+    assert match["cluster"] == first["cluster"]
+    assert match["similarity"] == 1.0
+    assert match["example"] == TEMPLATE.format("@alice", "http://t.co/a1")
+
+
+def test_unrelated_texts_get_their_own_clusters():
+    index = make_index()
+    index.add(TEMPLATE.format("@alice", "http://t.co/a1"), "Bot")
+    other = index.add("Had a lovely walk along the river with my dog this morning", "Human")
+    assert other["size"] == 1
+    assert index.lookup("Quarterly earnings beat expectations across every region")[1] is None
+    stats = index.stats()
+    assert (stats["clusters"], stats["texts"], stats["lookups"], stats["matches"]) == (2, 2, 1, 0)
+    assert [cluster["size"] for cluster in index.largest(1)] == [1]
+
+
+def test_new_clusters_get_their_id_from_sqlite(tmp_path):
+    path = str(tmp_path / "duplicates.db")
+    index = make_index(path)
+    pending = index.add(TEMPLATE.format("@alice", "http://t.co/a1"), "Bot")
+    assert pending["cluster"] == -1
+    assert index.stats()["pending_writes"] == 1
+
+    index.flush()
+    assert index.stats()["pending_writes"] == 0
+    assert index.lookup(TEMPLATE.format("@bob", "http://t.co/b2"))[1]["cluster"] == 1
+
+    reopened = make_index(path)
+    _, match = reopened.lookup(TEMPLATE.format("@bob", "http://t.co/b2"))
+    assert (match["cluster"], match["size"], match["bots"]) == (1, 1, 1)
+
+
+def test_processes_sharing_the_file_add_up_their_counts(tmp_path):
+    path = str(tmp_path / "duplicates.db")
+    builder = make_index(path)
+    builder.add_many([(TEMPLATE.format("@alice", "http://t.co/a1"), "Bot")])
+
+    # Two workers that loaded the same cluster, each adding to it and starting a new one
+    worker_a, worker_b = make_index(path), make_index(path)
+    worker_a.add(TEMPLATE.format("@bob", "http://t.co/b2"), "Bot")
+    worker_b.add(TEMPLATE.format("@carol", "http://t.co/c3"), "Human")
+    worker_a.add("Had a lovely walk along the river with my dog this morning", "Human")
+    worker_b.add("Quarterly earnings beat expectations across every region", "Bot")
+    worker_a.flush()
+    worker_b.flush()
+
+    reopened = make_index(path)
+    _, match = reopened.lookup(TEMPLATE.format("@dave", "http://t.co/d4"))
+    assert (match["cluster"], match["size"], match["bots"], match["humans"]) == (1, 3, 2, 1)
+    assert reopened.stats()["clusters"] == 3
+    assert sorted(cluster["cluster"] for cluster in reopened.largest(3)) == [1, 2, 3]
+
+
+def test_other_minhash_settings_are_rejected(tmp_path):
+    path = str(tmp_path / "duplicates.db")
+    make_index(path)
+    with pytest.raises(ValueError):
+        DuplicateIndex(path, num_perm=32, bands=8)
+
+
+def test_add_reuses_the_lookup(monkeypatch):
+    index = make_index()
+    index.add(TEMPLATE.format("@alice", "http://t.co/a1"), "Bot")
+    text = TEMPLATE.format("@bob", "http://t.co/b2")
+    signature, match = index.lookup(text)
+
+    def no_second_pass(*args):
+        raise AssertionError("computed again")
+
+    monkeypatch.setattr(index, "signature", no_second_pass)
+    monkeypatch.setattr(index, "_match", no_second_pass)
+    assert index.add(text, "Bot", signature, match)["size"] == 2
+
+
+def test_oldest_single_text_clusters_are_evicted_first():
+    index = make_index(max_clusters=2)
+    template = index.add(TEMPLATE.format("@alice", "http://t.co/a1"), "Bot")
+    index.add(TEMPLATE.format("@bob", "http://t.co/b2"), "Bot")
+    index.add("Had a lovely walk along the river with my dog this morning", "Human")
+    index.add("Quarterly earnings beat expectations across every region", "Bot")
+
+    stats = index.stats()
+    assert (stats["clusters"], stats["evictions"]) == (2, 1)
+    assert index.lookup("Had a lovely walk along the river with my dog this morning")[1] is None
+    assert index.lookup(TEMPLATE.format("@carol", "http://t.co/c3"))[1]["cluster"] == template["cluster"]
+    # No bucket still points at the evicted cluster
+    assert all(set(bucket) <= set(index._clusters) for bucket in index._buckets.values())
+
+
+def test_evicted_clusters_leave_sqlite(tmp_path):
+    path = str(tmp_path / "duplicates.db")
+    builder = make_index(path, max_clusters=None)
+    builder.add_many([
+        (TEMPLATE.format("@alice", "http://t.co/a1"), "Bot"),
+        (TEMPLATE.format("@bob", "http://t.co/b2"), "Bot"),
+        ("Had a lovely walk along the river with my dog this morning", "Human"),
+        ("Quarterly earnings beat expectations across every region", "Bot")
+    ])
+
+    # A restart only loads the largest clusters
+    index = make_index(path, max_clusters=2)
+    assert index.stats()["clusters"] == 2
+    assert index.lookup(TEMPLATE.format("@carol", "http://t.co/c3"))[1]["size"] == 2
+
+    # A new text evicts the oldest single-text cluster, and the never-stored one goes without a write
+    index.add("The match went to extra time and nobody left their seat", "Human")
+    index.add("Fresh bread from the bakery on the corner is the best", "Human")
+    index.flush()
+    assert make_index(path, max_clusters=None).stats()["clusters"] == 3
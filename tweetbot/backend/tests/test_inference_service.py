@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from services.inference_service import InferenceService
+
+
+# Passes the texts straight through to the backend
+class FakeTokenizer:
+    def __call__(self, texts, **kwargs):
+        return {"texts": list(texts)}
+
+
+# Logits (2, 0) for human texts and (0, 2) for texts containing "bot"; records every batch.
+# With a gate, each forward pass waits until the test opens it.
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.batches = []
+        self.started = threading.Event()
+
+    def logits(self, inputs):
+        self.batches.append(inputs["texts"])
+        self.started.set()
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        if any(text == "fail" for text in inputs["texts"]):
+            raise RuntimeError("forward failed")
+        return torch.tensor([[0.0, 2.0] if "bot" in text else [2.0, 0.0] for text in inputs["texts"]])
+
+
+def make_service(backend, **kwargs):
+    return InferenceService(FakeTokenizer(), backend, **kwargs)
+
+
+def test_classify_returns_label_and_confidence():
+    service = make_service(FakeBackend(), max_wait_ms=0)
+    # softmax(2, 0) = 0.8808
+    assert service.classify("a bot tweet") == ("Bot", 88.08)
+    assert service.classify("hello") == ("Human", 88.08)
+
+
+def test_concurrent_callers_share_one_forward_pass():
+    backend = FakeBackend()
+    # The batch only runs early once max_batch_size texts are queued
+    service = make_service(backend, max_batch_size=4, max_wait_ms=5000)
+    texts = ["bot 1", "human 2", "bot 3", "human 4"]
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(service.classify, texts))
+
+    assert results == [("Bot", 88.08), ("Human", 88.08), ("Bot", 88.08), ("Human", 88.08)]
+    assert len(backend.batches) == 1
+    assert sorted(backend.batches[0]) == sorted(texts)
+    stats = service.stats()
+    assert (stats["batches"], stats["requests"], stats["batch_size_histogram"]) == (1, 4, {4: 1})
+    assert stats["queue_depth"] == 0
+
+
+def test_a_timed_out_request_is_cancelled_before_it_reaches_the_model():
+    gate = threading.Event()
+    backend = FakeBackend(gate)
+    service = make_service(backend, max_batch_size=1, max_wait_ms=0)
+    with ThreadPoolExecutor(1) as pool:
+        first = pool.submit(service.classify, "first")
+        assert backend.started.wait(5)
+        # The worker is busy with "first", so "second" is still queued when it times out
+        with pytest.raises(FuturesTimeoutError):
+            service.classify("second", timeout=0.05)
+        gate.set()
+        assert first.result(5) == ("Human", 88.08)
+
+    assert service.classify("third") == ("Human", 88.08)
+    assert backend.batches == [["first"], ["third"]]
+
+
+def test_a_failed_forward_pass_reaches_every_caller_in_the_batch():
+    service = make_service(FakeBackend(), max_batch_size=2, max_wait_ms=5000)
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(service.classify, text) for text in ("fail", "fine")]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(5)
+        # The worker keeps serving afterwards
+        assert list(pool.map(service.classify, ["bot", "human"])) == [("Bot", 88.08), ("Human", 88.08)]
+
+
+def test_classify_texts_batches_by_length_and_skips_empty_texts():
+    backend = FakeBackend()
+    service = make_service(backend)
+    labels, confidences = service.classify_texts(["a longer bot text", "", "hi", "bot"], batch_size=2)
+    assert labels == ["Bot", None, "Human", "Bot"]
+    assert confidences == [88.08, None, 88.08, 88.08]
+    assert backend.batches == [["hi", "bot"], ["a longer bot text"]]
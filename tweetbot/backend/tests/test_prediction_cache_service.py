@@ -0,0 +1,136 @@
+import sqlite3
+
+import pytest
+
+from services import prediction_cache_service
+from services.prediction_cache_service import PredictionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+# A connection whose writes fail the way a busy shared file does
+class LockedConnection:
+    def __init__(self):
+        self.rollbacks = 0
+
+    def executemany(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(prediction_cache_service, "time", clock)
+    return clock
+
+
+def rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache("v1", max_entries=2)
+    cache.put("a", {"prediction": "Bot"})
+    cache.put("b", {"prediction": "Human"})
+    assert cache.get("a") == {"prediction": "Bot"}
+    cache.put("c", {"prediction": "Bot"})
+
+    assert cache.get("b") is None
+    assert cache.get("c") == {"prediction": "Bot"}
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_keys_depend_on_the_normalized_text_and_the_model_version():
+    cache = PredictionCache("v1")
+    # Precomposed and padded, then decomposed (e + combining accent) and trimmed
+    cache.put("  caf\u00e9 ", {"prediction": "Human"})
+    assert cache.get("cafe\u0301") == {"prediction": "Human"}
+    assert cache.key("caf\u00e9") != PredictionCache("v2").key("caf\u00e9")
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PredictionCache("v1", ttl_seconds=60)
+    cache.put("a", {"prediction": "Bot"})
+    clock.now += 59
+    assert cache.get("a") == {"prediction": "Bot"}
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_writes_are_committed_in_batches(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = PredictionCache("v1", db_path=path, flush_every=3, flush_seconds=60)
+    cache.put("a", {"prediction": "Bot"})
+    cache.put("b", {"prediction": "Bot"})
+    assert cache.stats()["pending_writes"] == 2
+    assert rows(path) == 0
+
+    cache.put("c", {"prediction": "Bot"})
+    assert cache.stats()["pending_writes"] == 0
+    assert rows(path) == 3
+
+    # Or once flush_seconds have gone by since the last flush
+    clock.now += 61
+    cache.put("d", {"prediction": "Bot"})
+    assert rows(path) == 4
+
+
+def test_eviction_keeps_the_shared_rows_and_a_restart_loads_the_newest(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = PredictionCache("v1", max_entries=2, db_path=path, flush_every=1)
+    for text in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(text, {"prediction": text})
+    assert cache.stats()["evictions"] == 1
+    assert rows(path) == 3
+
+    restarted = PredictionCache("v1", max_entries=2, db_path=path)
+    assert restarted.get("a") is None
+    assert restarted.get("c") == {"prediction": "c"}
+    # Startup prunes the file to the newest max_entries rows
+    assert rows(path) == 2
+
+
+def test_expired_rows_are_not_loaded(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    PredictionCache("v1", ttl_seconds=60, db_path=path, flush_every=1).put("a", {"prediction": "Bot"})
+    clock.now += 120
+    assert PredictionCache("v1", ttl_seconds=60, db_path=path).get("a") is None
+    assert rows(path) == 0
+
+
+def test_a_failed_write_never_fails_the_put(tmp_path, capsys):
+    path = str(tmp_path / "cache.db")
+    cache = PredictionCache("v1", db_path=path, flush_every=1)
+    real = cache._connection()
+    locked = cache._db = LockedConnection()
+
+    cache.put("a", {"prediction": "Bot"})
+    assert cache.get("a") == {"prediction": "Bot"}
+    assert locked.rollbacks == 1
+    assert cache.stats()["pending_writes"] == 1
+    assert "Prediction cache write failed" in capsys.readouterr().out
+    with pytest.raises(sqlite3.OperationalError):
+        cache.flush()
+
+    # Once the file is free again the queued rows go out with the next write
+    cache._db = real
+    cache.put("b", {"prediction": "Human"})
+    assert cache.stats()["pending_writes"] == 0
+    assert rows(path) == 2
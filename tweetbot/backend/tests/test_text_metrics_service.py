@@ -0,0 +1,58 @@
+import re
+
+import pytest
+
+spacy = pytest.importorskip("spacy")
+textblob = pytest.importorskip("textblob")
+
+from services.text_metrics_service import TextMetricsService
+
+TWEETS = [
+    "",
+    "😂😂😂",
+    "🔥🔥 🚀",
+    "Check this out https://t.co/abc123 and http://example.com/page?x=1",
+    "@alice @bob thanks for the follow! #blessed #grateful",
+    "RT @news: Breaking!!! Markets fall 3% after the announcement https://t.co/xyz",
+    "I really loved the movie, the ending was wonderful.",
+    "   lots   of   spaces   ",
+    "Win a FREE iPhone!!! Click www.example.com now @everyone",
+    "Ça va? Très bien, merci 🙂"
+]
+
+
+@pytest.fixture(scope="module")
+def full_nlp():
+    try:
+        return spacy.load("en_core_web_sm")
+    except OSError:
+        pytest.skip("en_core_web_sm is not installed")
+
+
+# The metrics as they were computed before the pipeline was trimmed: every spaCy component
+# and TextBlob, one text at a time
+def baseline_metrics(nlp, text):
+    features = {}
+    features["char_count"] = len(text)
+    features["word_count"] = len(text.split())
+    features["avg_word_length"] = features["char_count"] / (features["word_count"] or 1)
+    features["exclamation_count"] = text.count("!")
+    features["hashtag_count"] = text.count("#")
+    features["mention_count"] = text.count("@")
+    features["link_count"] = len(re.findall(r"http[s]?://\S+", text))
+    features["sentiment_polarity"] = textblob.TextBlob(text).sentiment.polarity
+    doc = nlp(text)
+    for pos_id, count in doc.count_by(spacy.attrs.POS).items():
+        features[f"pos_{doc.vocab[pos_id].text.lower()}_count"] = count
+    return features
+
+
+def test_per_text_metrics_match_the_full_pipeline(full_nlp):
+    expected = [baseline_metrics(full_nlp, text) for text in TWEETS]
+    assert [TextMetricsService.extract_feature_metrics(text) for text in TWEETS] == expected
+
+
+@pytest.mark.parametrize("n_process", [1, 2])
+def test_batch_metrics_match_the_full_pipeline(full_nlp, n_process):
+    expected = [baseline_metrics(full_nlp, text) for text in TWEETS]
+    assert TextMetricsService.extract_feature_metrics_batch(TWEETS, batch_size=4, n_process=n_process) == expected
@@ -0,0 +1,155 @@
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+from services.cascade_service import CHEAP_FEATURES, CheapModel, cheap_features
+from services.tweet_text import decode_tweet_text
+
+# Same user split as processing/super_preprocess.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from user_split import is_validation_user
+
+# Train the cheap first stage of the cascade and tune its uncertainty band.
+#
+#  - Reads the preprocessed_data CSVs. The cheap features are recomputed from the decoded
+#    tweet text instead of taken from the CSV columns: those were computed on the raw
+#    b'...' literals, while /predict sees decoded text, so training on them would skew.
+#  - Splits train/val by user (hash of Twitter_User_Name), so val never sees a training account.
+#  - Fits a logistic regression on the standardized features.
+#  - For every band [0.5 - w, 0.5 + w] prints how many val tweets escalate to BERT, the
+#    accuracy of the ones the cheap model keeps and, with --with-bert, the accuracy of the
+#    whole cascade. The narrowest band that reaches --target-accuracy is saved with the model.
+#
+# Usage (from the backend folder):
+#   python train_cascade.py
+#   python train_cascade.py --with-bert --target-accuracy 0.85
+#   CASCADE_MODEL=cascade_model.json python app.py
+
+HALF_WIDTHS = [0.0, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5]
+
+
+def load_rows(paths, label):
+    csv.field_size_limit(sys.maxsize)
+    rows = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                text = decode_tweet_text(row.get("Tweet_text") or "")
+                if text:
+                    rows.append((row.get("Twitter_User_Name", ""), text, label))
+    return rows
+
+
+def fit(texts, labels):
+    from sklearn.linear_model import LogisticRegression
+
+    X = np.array([cheap_features(text) for text in texts], dtype=np.float64)
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    clf = LogisticRegression(max_iter=1000)
+    clf.fit((X - mean) / std, labels)
+    return CheapModel(
+        features=list(CHEAP_FEATURES),
+        mean=mean.tolist(),
+        std=std.tolist(),
+        weights=clf.coef_[0].tolist(),
+        bias=float(clf.intercept_[0])
+    )
+
+
+def bert_predictions(texts, model_path, backend_name, batch_size):
+    from transformers import BertTokenizer
+
+    from services.inference_service import InferenceService
+    from services.model_backends import load_backend
+
+    inference = InferenceService(BertTokenizer.from_pretrained(model_path), load_backend(model_path, backend_name))
+    labels, _ = inference.classify_texts(texts, batch_size)
+    return np.array([label == "Bot" for label in labels], dtype=np.int64)
+
+
+# One row per band: (half width, escalation rate, cheap accuracy on kept tweets, cascade accuracy or None)
+def sweep(probabilities, labels, bert=None):
+    results = []
+    cheap_pred = (probabilities >= 0.5).astype(np.int64)
+    for w in HALF_WIDTHS:
+        escalated = (probabilities > 0.5 - w) & (probabilities < 0.5 + w)
+        kept = ~escalated
+        cheap_accuracy = float((cheap_pred[kept] == labels[kept]).mean()) if kept.any() else float("nan")
+        cascade_accuracy = None
+        if bert is not None:
+            cascade_accuracy = float((np.where(escalated, bert, cheap_pred) == labels).mean())
+        results.append((w, float(escalated.mean()), cheap_accuracy, cascade_accuracy))
+    return results
+
+
+def main(args):
+    human = load_rows(args.human, 0)
+    bots = load_rows(args.bot, 1)
+    rows = human + bots
+    print(f"{len(human)} human and {len(bots)} bot tweets")
+
+    val_users = {user: is_validation_user(user, args.val_ratio, args.seed) for user in {row[0] for row in rows}}
+    train = [row for row in rows if not val_users[row[0]]]
+    val = [row for row in rows if val_users[row[0]]]
+    print(f"train: {len(train)} tweets, val: {len(val)} tweets ({sum(val_users.values())} users)")
+
+    started = time.perf_counter()
+    model = fit([row[1] for row in train], np.array([row[2] for row in train]))
+    print(f"Fitted in {time.perf_counter() - started:.2f}s")
+
+    val_texts = [row[1] for row in val]
+    val_labels = np.array([row[2] for row in val], dtype=np.int64)
+    started = time.perf_counter()
+    probabilities = np.array([model.bot_probability(text) for text in val_texts])
+    elapsed = time.perf_counter() - started
+    print(f"Cheap model: {len(val_texts) / max(elapsed, 1e-9):.0f} tweets/sec")
+
+    bert = None
+    if args.with_bert:
+        started = time.perf_counter()
+        bert = bert_predictions(val_texts, args.model_path, args.backend, args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"BERT ({args.backend}): {len(val_texts) / max(elapsed, 1e-9):.0f} tweets/sec, "
+              f"accuracy {float((bert == val_labels).mean()):.4f}")
+
+    results = sweep(probabilities, val_labels, bert)
+    print(f"{'band':<13} {'escalated':>9} {'cheap acc':>9} {'cascade acc':>11}")
+    for w, escalation, cheap_accuracy, cascade_accuracy in results:
+        cascade = f"{cascade_accuracy:>11.4f}" if cascade_accuracy is not None else f"{'-':>11}"
+        print(f"[{0.5 - w:.2f}, {0.5 + w:.2f}] {escalation:>9.2%} {cheap_accuracy:>9.4f} {cascade}")
+
+    # Narrowest band that is accurate enough: the cascade's accuracy with BERT numbers,
+    # otherwise the accuracy of what the cheap model keeps. Falls back to the widest band.
+    chosen = results[-1][0]
+    for w, _, cheap_accuracy, cascade_accuracy in results:
+        accuracy = cascade_accuracy if cascade_accuracy is not None else cheap_accuracy
+        if accuracy >= args.target_accuracy:
+            chosen = w
+            break
+    model.low, model.high = round(0.5 - chosen, 4), round(0.5 + chosen, 4)
+    model.save(args.output)
+    print(f"✅ Saved cascade model with band [{model.low}, {model.high}] to {args.output}")
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(base_dir, "..", "preprocessed_data")
+    parser = argparse.ArgumentParser(description="Train the cascade's cheap model and tune its uncertainty band")
+    parser.add_argument("--human", nargs="+", default=[os.path.join(data_dir, "preprocessed_human_limited_200_per_user.csv")])
+    parser.add_argument("--bot", nargs="+", default=[os.path.join(data_dir, "preprocessed_bots_limited_200_per_user.csv")])
+    parser.add_argument("--val-ratio", type=float, default=0.2, help="share of users (not tweets) in val")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--target-accuracy", type=float, default=0.9,
+                        help="pick the narrowest band whose accuracy reaches this")
+    parser.add_argument("--with-bert", action="store_true", help="also run BERT on val to measure the whole cascade")
+    parser.add_argument("--model-path", default=os.path.join(base_dir, "bert-twitterbot-detector"))
+    parser.add_argument("--backend", default="pytorch", help="BERT backend for --with-bert (pytorch, int8, onnx, onnx-int8)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("-o", "--output", default=os.path.join(base_dir, "cascade_model.json"))
+    main(parser.parse_args())
@@ -0,0 +1,78 @@
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Make the backend services importable when running from anywhere
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.random_tweet_service import RandomTweetService
+
+
+# The original get_random_tweet(): read the CSV with pandas and eval() every row on each call
+def legacy_get_random_tweet():
+    import pandas as pd
+
+    data_dir = BACKEND_DIR / "data"
+    if random.random() < 0.5:
+        df = pd.read_csv(data_dir / "clean_human_tweets.csv")
+        origin = "human"
+    else:
+        df = pd.read_csv(data_dir / "clean_bot_tweets.csv")
+        origin = "bot"
+    df["text"] = df["text"].apply(
+        lambda t: eval(t).decode("utf-8", errors="ignore") if isinstance(t, str) and t.startswith("b'") else t
+    )
+    return df.sample(1)["text"].values[0], origin
+
+
+# Time `calls` calls of fn and return latency stats in microseconds
+def time_calls(fn, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return {
+        "mean_us": statistics.fmean(latencies),
+        "p50_us": latencies[len(latencies) // 2],
+        "p99_us": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    }
+
+
+def run(calls=200, legacy_calls=20):
+    start = time.perf_counter()
+    RandomTweetService.preload()
+    preload_ms = (time.perf_counter() - start) * 1000
+
+    results = {
+        "preload_ms": preload_ms,
+        "cached": time_calls(RandomTweetService.get_random_tweet, calls)
+    }
+    try:
+        results["legacy"] = time_calls(legacy_get_random_tweet, legacy_calls)
+    except ImportError:
+        results["legacy"] = None
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-call latency of RandomTweetService with the old pandas/eval path")
+    parser.add_argument("--calls", type=int, default=2000, help="calls for the cached service")
+    parser.add_argument("--legacy-calls", type=int, default=50, help="calls for the legacy path (slow)")
+    args = parser.parse_args()
+
+    results = run(args.calls, args.legacy_calls)
+    print(f"Corpus preload: {results['preload_ms']:.1f} ms")
+    for name in ("cached", "legacy"):
+        stats = results[name]
+        if stats is None:
+            print(f"{name:>7}: skipped (pandas not installed)")
+            continue
+        print(f"{name:>7}: mean {stats['mean_us']:.1f} us | p50 {stats['p50_us']:.1f} us | p99 {stats['p99_us']:.1f} us")
+    if results["legacy"]:
+        print(f"Speedup (mean): {results['legacy']['mean_us'] / results['cached']['mean_us']:.0f}x")
@@ -0,0 +1,322 @@
+import argparse
+import csv
+import functools
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Benchmark suite for the backend and the preprocessing pipeline, run on the CSVs that
+# ship with the repo so every run measures the same workload:
+#  load       - tokenizer + model load time, in a fresh process so nothing is already cached
+#  latency    - single-request latency percentiles through InferenceService
+#  throughput - tweets/sec of classify_batch at several batch sizes
+#  metrics    - TextMetricsService rows/sec, one text at a time and batched
+#  preprocess - processing/preprocess.py rows/sec on a raw tweet CSV
+#
+# Usage (from anywhere):
+#   python run_benchmarks.py run -o results.json
+#   python run_benchmarks.py run --suites latency,metrics --limit 200 -o quick.json
+#   python run_benchmarks.py compare baseline.json results.json --threshold 0.1
+
+TWEETBOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = TWEETBOT_DIR / "backend"
+PROCESSING_DIR = TWEETBOT_DIR / "processing"
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(PROCESSING_DIR))
+
+MODEL_PATH = BACKEND_DIR / "bert-twitterbot-detector"
+BACKEND_CORPUS = [BACKEND_DIR / "data" / "clean_human_tweets.csv", BACKEND_DIR / "data" / "clean_bot_tweets.csv"]
+METRICS_CORPUS = [
+    TWEETBOT_DIR / "preprocessed_data" / "preprocessed_human_limited_10_per_user.csv",
+    TWEETBOT_DIR / "preprocessed_data" / "preprocessed_bots_limited_10_per_user.csv"
+]
+PREPROCESS_INPUT = TWEETBOT_DIR / "not_processed_data" / "bots_limited_10_per_user.csv"
+
+SUITES = ("load", "latency", "throughput", "metrics", "preprocess")
+PACKAGES = ("torch", "transformers", "onnxruntime", "spacy", "textblob", "pandas", "numpy")
+
+# Metrics named like this are better when they go up, everything else (ms, seconds) when it goes down
+HIGHER_IS_BETTER_SUFFIX = "_per_sec"
+
+
+def read_texts(paths, column, limit=None):
+    from services.tweet_text import decode_tweet_text
+
+    texts = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            texts.extend(decode_tweet_text(row[column]) for row in csv.DictReader(f) if row.get(column))
+    texts = [text for text in texts if text]
+    return texts[:limit] if limit else texts
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def environment_info():
+    info = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "packages": {},
+    }
+    for package in PACKAGES:
+        try:
+            info["packages"][package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            info["packages"][package] = None
+    try:
+        info["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=TWEETBOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["git_commit"] = None
+    try:
+        import torch
+        info["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        info["torch_threads"] = None
+    return info
+
+
+# Runs in a spawned process: how long a cold worker takes before it can classify
+def measure_load(backend_name):
+    started = time.perf_counter()
+    from transformers import BertTokenizer
+    from services.model_backends import load_backend
+    imported = time.perf_counter()
+    BertTokenizer.from_pretrained(MODEL_PATH)
+    tokenized = time.perf_counter()
+    load_backend(str(MODEL_PATH), backend_name)
+    loaded = time.perf_counter()
+    return {
+        "load.import_seconds": imported - started,
+        "load.tokenizer_seconds": tokenized - imported,
+        "load.model_seconds": loaded - tokenized,
+        "load.total_seconds": loaded - started,
+    }
+
+
+def bench_load(args, texts):
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(args.repeat):
+        with ctx.Pool(1) as pool:
+            runs.append(pool.apply(measure_load, (args.backend,)))
+    # Median over the repeats, load time is noisy (disk cache, other processes)
+    return {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+
+# The latency and throughput suites share one loaded model
+@functools.lru_cache(maxsize=None)
+def load_model(backend_name):
+    from transformers import BertTokenizer
+    from services.model_backends import load_backend
+
+    return BertTokenizer.from_pretrained(MODEL_PATH), load_backend(str(MODEL_PATH), backend_name)
+
+
+def make_inference(args, max_batch_size):
+    from services.inference_service import InferenceService
+
+    tokenizer, backend = load_model(args.backend)
+    return InferenceService(tokenizer, backend, max_batch_size=max_batch_size, max_wait_ms=0)
+
+
+def bench_latency(args, texts):
+    inference = make_inference(args, max_batch_size=1)
+    samples = texts[:args.requests]
+    for text in samples[:5]:
+        inference.classify(text)
+
+    latencies = []
+    for text in samples:
+        started = time.perf_counter()
+        inference.classify(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "latency.p50_ms": percentile(latencies, 50),
+        "latency.p95_ms": percentile(latencies, 95),
+        "latency.p99_ms": percentile(latencies, 99),
+        "latency.mean_ms": statistics.fmean(latencies),
+    }
+
+
+def bench_throughput(args, texts):
+    inference = make_inference(args, max_batch_size=max(args.batch_sizes))
+    # Length-sorted like /predict-batch, so padding doesn't hide the effect of the batch size
+    ordered = sorted(texts, key=len)
+    results = {}
+    for batch_size in args.batch_sizes:
+        inference.classify_batch(ordered[:batch_size])
+        runs = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for i in range(0, len(ordered), batch_size):
+                inference.classify_batch(ordered[i:i + batch_size])
+            runs.append(len(ordered) / (time.perf_counter() - started))
+        results[f"throughput.batch_{batch_size}.tweets_per_sec"] = statistics.median(runs)
+    return results
+
+
+def bench_metrics(args, texts):
+    from services.text_metrics_service import TextMetricsService
+
+    texts = read_texts(METRICS_CORPUS, "Tweet_text", args.limit)
+    TextMetricsService.extract_feature_metrics_batch(texts[:16])
+
+    single, batched = [], []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        for text in texts:
+            TextMetricsService.extract_feature_metrics(text)
+        single.append(len(texts) / (time.perf_counter() - started))
+
+        started = time.perf_counter()
+        TextMetricsService.extract_feature_metrics_batch(texts)
+        batched.append(len(texts) / (time.perf_counter() - started))
+    return {
+        "metrics.single.rows_per_sec": statistics.median(single),
+        "metrics.batch.rows_per_sec": statistics.median(batched),
+    }
+
+
+def bench_preprocess(args, texts):
+    from preprocess import preprocess_file
+
+    with open(PREPROCESS_INPUT, newline="", encoding="utf-8") as f:
+        rows = sum(1 for _ in csv.DictReader(f))
+
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            started = time.perf_counter()
+            preprocess_file(PREPROCESS_INPUT, Path(tmp_dir) / "out.csv", workers=args.workers, restart=True)
+            runs.append(rows / (time.perf_counter() - started))
+    return {"preprocess.rows_per_sec": statistics.median(runs)}
+
+
+BENCHMARKS = {
+    "load": bench_load,
+    "latency": bench_latency,
+    "throughput": bench_throughput,
+    "metrics": bench_metrics,
+    "preprocess": bench_preprocess,
+}
+
+
+def run(args):
+    texts = read_texts(BACKEND_CORPUS, "text", args.limit)
+    report = {
+        "environment": environment_info(),
+        "config": {
+            "suites": args.suites,
+            "backend": args.backend,
+            "batch_sizes": args.batch_sizes,
+            "requests": args.requests,
+            "limit": args.limit,
+            "repeat": args.repeat,
+            "workers": args.workers,
+        },
+        "results": {},
+    }
+    for suite in args.suites:
+        print(f"Running {suite}...")
+        results = BENCHMARKS[suite](args, texts)
+        for name, value in results.items():
+            print(f"  {name}: {value:.3f}")
+        report["results"].update(results)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {args.output}")
+
+
+# Relative change where a positive number always means "got worse"
+def regression(name, baseline, current):
+    if not baseline:
+        return 0.0
+    change = (current - baseline) / baseline
+    return -change if name.endswith(HIGHER_IS_BETTER_SUFFIX) else change
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    # Numbers from different hardware or settings aren't comparable, say so up front
+    for key in ("machine", "cpu_count", "python"):
+        if baseline["environment"].get(key) != current["environment"].get(key):
+            print(f"⚠️ {key} differs: {baseline['environment'].get(key)} vs {current['environment'].get(key)}")
+    for key in ("backend", "limit", "requests"):
+        if baseline["config"].get(key) != current["config"].get(key):
+            print(f"⚠️ {key} differs: {baseline['config'].get(key)} vs {current['config'].get(key)}")
+
+    regressions = []
+    print(f"\n{'metric':<45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        if name not in baseline["results"] or name not in current["results"]:
+            print(f"{name:<45} {'only in ' + ('baseline' if name in baseline['results'] else 'current'):>34}")
+            continue
+        old, new = baseline["results"][name], current["results"][name]
+        worse = regression(name, old, new)
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif worse < -args.threshold:
+            flag = "  improved"
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{name:<45} {old:>12.3f} {new:>12.3f} {change:>+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\n✅ No regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark inference, text metrics and preprocessing")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and save the results as JSON")
+    run_parser.add_argument("-o", "--output", default="benchmark_results.json")
+    run_parser.add_argument("--suites", type=lambda s: s.split(","), default=list(SUITES),
+                            help=f"comma separated, any of {','.join(SUITES)} (default: all)")
+    run_parser.add_argument("--backend", default="pytorch", help="model backend (see services/model_backends.py)")
+    run_parser.add_argument("--batch-sizes", type=lambda s: [int(b) for b in s.split(",")], default=[1, 8, 32, 64])
+    run_parser.add_argument("--requests", type=int, default=200, help="requests for the latency suite")
+    run_parser.add_argument("--limit", type=int, default=None, help="only use the first N tweets of each workload")
+    run_parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the median is kept")
+    run_parser.add_argument("--workers", type=int, default=None, help="worker processes for the preprocess suite")
+
+    compare_parser = subparsers.add_parser("compare", help="flag regressions against a baseline results file")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="relative slowdown that counts as a regression (default 0.10 = 10%%)")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        unknown = [suite for suite in args.suites if suite not in SUITES]
+        if unknown:
+            parser.error(f"unknown suite(s): {', '.join(unknown)}")
+        run(args)
+    else:
+        compare(args)
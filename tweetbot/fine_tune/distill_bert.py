@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn.functional as F
+from torch.utils.data import Dataset
+from transformers import BertTokenizer, BertForSequenceClassification, AdamW
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import f1_score
+from token_cache import TokenCache, pad_collate
+from length_sampler import LengthBucketBatchSampler
+from trainer import Trainer, configure_threads, peak_rss_mb
+
+# The tweet tables can be CSV, Parquet or Arrow, read through processing/columnar.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from columnar import read_table
+
+# Knowledge distillation: the fine-tuned 12-layer bert-twitterbot-detector (teacher) trains a
+# smaller student on the same tweets.
+#  - The student is the teacher cut down to --student-layers encoder layers (evenly spaced
+#    teacher layers, plus the teacher's embeddings, pooler and classifier), so it starts from
+#    the teacher's weights instead of from scratch.
+#  - Teacher logits are computed once per tweet, then the student learns from
+#    alpha * KL(teacher soft labels at --temperature) + (1 - alpha) * cross-entropy(true labels).
+#  - The student is saved in the same HuggingFace format as the teacher, so the backend loads it
+#    the same way: MODEL_PATH=../fine_tune/bert-twitterbot-detector-student python app.py
+#  - At the end both models are compared on the validation split: agreement, F1, latency and
+#    memory, printed and saved as <output>/distill_report.json.
+#
+# Usage:
+#   python distill_bert.py --student-layers 4
+#   python distill_bert.py --student-layers 6 --epochs 2 --bf16 --human-data human.parquet --bot-data bots.parquet
+
+parser = argparse.ArgumentParser(description="Distill the fine-tuned BERT detector into a smaller student")
+parser.add_argument("--teacher", default=os.path.join("..", "backend", "bert-twitterbot-detector"))
+parser.add_argument("--student-layers", type=int, default=4, help="encoder layers kept from the teacher")
+parser.add_argument("--temperature", type=float, default=2.0, help="softens the teacher's labels")
+parser.add_argument("--alpha", type=float, default=0.7, help="weight of the soft-label loss vs. the true labels")
+parser.add_argument("--batch-size", type=int, default=32)
+parser.add_argument("--max-tokens", type=int, default=None, help="e.g. 4096 tokens per batch instead of --batch-size")
+parser.add_argument("--epochs", type=int, default=3)
+parser.add_argument("--lr", type=float, default=5e-5)
+parser.add_argument("--grad-accum", type=int, default=1, help="micro-batches per optimizer step")
+parser.add_argument("--warmup-ratio", type=float, default=0.1, help="share of steps with linear LR warmup")
+parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast (fast on CPUs with AVX512-BF16/AMX)")
+parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: torch's choice)")
+parser.add_argument("--interop-threads", type=int, default=None, help="torch inter-op threads")
+parser.add_argument("--checkpoint-dir", default="distill_checkpoints", help="where to save resumable checkpoints")
+parser.add_argument("--checkpoint-every", type=int, default=500, help="optimizer steps between checkpoints")
+parser.add_argument("--log-every", type=int, default=50, help="optimizer steps between throughput logs")
+parser.add_argument("--resume", action="store_true", help="continue from the checkpoint in --checkpoint-dir")
+parser.add_argument("--latency-samples", type=int, default=200, help="single tweets timed for the latency report")
+parser.add_argument("--human-data", default="preprocessed_human_limited_1000_per_user.csv", help=".csv, .parquet or .arrow")
+parser.add_argument("--bot-data", default="preprocessed_bots_limited_1000_per_user.csv", help=".csv, .parquet or .arrow")
+parser.add_argument("-o", "--output", default="bert-twitterbot-detector-student")
+args = parser.parse_args()
+configure_threads(args.threads, args.interop_threads)
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+# A student with `layers` encoder layers, initialized from evenly spaced teacher layers
+def truncated_student(teacher, layers):
+    total = teacher.config.num_hidden_layers
+    if not 1 <= layers <= total:
+        raise ValueError(f"--student-layers must be between 1 and {total}")
+    keep = [round(i * (total - 1) / max(layers - 1, 1)) for i in range(layers)]
+
+    config = teacher.config.__class__.from_dict(teacher.config.to_dict())
+    config.num_hidden_layers = layers
+    student = BertForSequenceClassification(config)
+
+    state = {}
+    for name, value in teacher.state_dict().items():
+        if name.startswith("bert.encoder.layer."):
+            index, rest = name[len("bert.encoder.layer."):].split(".", 1)
+            if int(index) not in keep:
+                continue
+            name = f"bert.encoder.layer.{keep.index(int(index))}.{rest}"
+        state[name] = value.clone()
+    student.load_state_dict(state)
+    print(f"Student: {layers} layers, initialized from teacher layers {keep}")
+    return student
+
+
+# === Step 1: Load and Label Data ===
+# Same data and split as fine_tune_bert.py, so the teacher's validation tweets stay unseen
+df_human = read_table(args.human_data, columns=["Tweet_text"])
+df_bot = read_table(args.bot_data, columns=["Tweet_text"])
+df_human["label"] = 0
+df_bot["label"] = 1
+df = pd.concat([df_human, df_bot]).sample(frac=1, random_state=42).reset_index(drop=True)
+train_texts, val_texts, train_labels, val_labels = train_test_split(
+    df['Tweet_text'].astype(str).str.encode('utf-8').str.decode('utf-8'), df['label'], test_size=0.2, random_state=42
+)
+train_texts, val_texts = train_texts.tolist(), val_texts.tolist()
+
+# === Step 2: Teacher, Tokenizer and Token Cache ===
+tokenizer = BertTokenizer.from_pretrained(args.teacher)
+teacher = BertForSequenceClassification.from_pretrained(args.teacher, low_cpu_mem_usage=True).to(device)
+teacher.eval()
+token_cache = TokenCache("token_cache")
+
+class TweetDataset(Dataset):
+    def __init__(self, texts, labels, teacher_logits=None):
+        self.tokens = token_cache.load_or_build(texts, tokenizer, max_length=128)
+        self.labels = torch.tensor(labels)
+        self.teacher_logits = teacher_logits
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        item = {"input_ids": self.tokens[idx], "labels": self.labels[idx]}
+        if self.teacher_logits is not None:
+            item["teacher_logits"] = self.teacher_logits[idx]
+        return item
+
+# Logits of every tweet of the dataset, in dataset order (batches are length-sorted to pad little)
+def predict_logits(model, dataset):
+    sampler = LengthBucketBatchSampler(dataset.tokens.lengths, args.batch_size, args.max_tokens, shuffle=False)
+    logits = torch.zeros(len(dataset), model.config.num_labels)
+    with torch.inference_mode():
+        for idx in sampler.batches():
+            batch = pad_collate([{"input_ids": dataset.tokens[i]} for i in idx])
+            batch = {k: v.to(device) for k, v in batch.items()}
+            logits[idx] = model(**batch).logits.float().cpu()
+    return logits
+
+# === Step 3: Soft Labels ===
+# One teacher pass over the training tweets; the logits are reused every epoch
+train_dataset = TweetDataset(train_texts, train_labels.tolist())
+val_dataset = TweetDataset(val_texts, val_labels.tolist())
+started = time.perf_counter()
+train_dataset.teacher_logits = predict_logits(teacher, train_dataset)
+print(f"Teacher soft labels for {len(train_dataset)} tweets in {time.perf_counter() - started:.1f}s")
+
+# === Step 4: Student & Optimizer ===
+student = truncated_student(teacher, args.student_layers).to(device)
+train_sampler = LengthBucketBatchSampler(train_dataset.tokens.lengths, args.batch_size, args.max_tokens, shuffle=True)
+optimizer = AdamW(student.parameters(), lr=args.lr)
+
+# KL on temperature-softened distributions (scaled by T^2 to keep gradient sizes comparable)
+# plus ordinary cross-entropy on the true labels
+def distill_loss(model, batch):
+    logits = model(input_ids=batch["input_ids"], attention_mask=batch["attention_mask"]).logits.float()
+    t = args.temperature
+    soft = F.kl_div(
+        F.log_softmax(logits / t, dim=-1), F.softmax(batch["teacher_logits"] / t, dim=-1), reduction="batchmean"
+    ) * t * t
+    hard = F.cross_entropy(logits, batch["labels"])
+    return args.alpha * soft + (1 - args.alpha) * hard
+
+# === Step 5: Training Loop ===
+trainer = Trainer(
+    student, optimizer, train_dataset, train_sampler, pad_collate, device,
+    epochs=args.epochs, grad_accum=args.grad_accum, warmup_ratio=args.warmup_ratio, bf16=args.bf16,
+    checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every, log_every=args.log_every,
+    loss_fn=distill_loss
+)
+if args.resume:
+    trainer.load_checkpoint()
+trainer.train()
+student.eval()
+
+# === Step 6: Save the Student ===
+# Same layout as bert-twitterbot-detector: config, weights and tokenizer
+student.save_pretrained(args.output)
+tokenizer.save_pretrained(args.output)
+print(f"✅ Student saved to {args.output}")
+
+# === Step 7: Compare Student and Teacher ===
+# Single-tweet latency the way /predict sees it: tokenize one text and run one forward pass
+def latency_ms(model, texts):
+    timings = []
+    with torch.inference_mode():
+        for text in texts:
+            started = time.perf_counter()
+            inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=128).to(device)
+            model(**inputs)
+            timings.append((time.perf_counter() - started) * 1000)
+    return {"p50": float(np.percentile(timings, 50)), "p95": float(np.percentile(timings, 95))}
+
+def weights_mb(model):
+    return sum(p.numel() * p.element_size() for p in model.parameters()) / 2**20
+
+y_true = val_labels.to_numpy()
+report = {"student_layers": args.student_layers, "teacher_layers": teacher.config.num_hidden_layers, "val_tweets": len(y_true)}
+predictions = {}
+sample = val_texts[:args.latency_samples]
+for name, model in (("teacher", teacher), ("student", student)):
+    started = time.perf_counter()
+    predictions[name] = predict_logits(model, val_dataset).argmax(dim=-1).numpy()
+    elapsed = time.perf_counter() - started
+    latency_ms(model, sample[:10])  # warm-up
+    report[name] = {
+        "f1": float(f1_score(y_true, predictions[name])),
+        "accuracy": float((predictions[name] == y_true).mean()),
+        "tweets_per_sec": len(y_true) / elapsed,
+        "latency_ms": latency_ms(model, sample),
+        "weights_mb": weights_mb(model)
+    }
+report["agreement"] = float((predictions["student"] == predictions["teacher"]).mean())
+report["speedup_p50"] = report["teacher"]["latency_ms"]["p50"] / report["student"]["latency_ms"]["p50"]
+report["peak_rss_mb"] = peak_rss_mb()
+
+print(f"\n{'':<8} {'F1':>7} {'acc':>7} {'tweets/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'MB':>7}")
+for name in ("teacher", "student"):
+    r = report[name]
+    print(f"{name:<8} {r['f1']:>7.4f} {r['accuracy']:>7.4f} {r['tweets_per_sec']:>9.1f} "
+          f"{r['latency_ms']['p50']:>7.2f} {r['latency_ms']['p95']:>7.2f} {r['weights_mb']:>7.1f}")
+print(f"Agreement with the teacher: {report['agreement']:.2%}, {report['speedup_p50']:.1f}x faster per tweet")
+
+with open(os.path.join(args.output, "distill_report.json"), "w") as f:
+    json.dump(report, f, indent=2)
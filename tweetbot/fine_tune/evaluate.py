@@ -0,0 +1,299 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import BertTokenizer, BertForSequenceClassification
+from sklearn.model_selection import train_test_split
+from token_cache import TokenCache, pad_collate
+from length_sampler import LengthBucketBatchSampler, padding_ratio
+from trainer import configure_threads, peak_rss_mb
+
+# The tweet tables can be CSV, Parquet or Arrow, read through processing/columnar.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from columnar import read_table
+
+# Evaluate one or more checkpoints on a labelled dataset, fast enough to run on every checkpoint.
+#
+#  - Tweets are tokenized once (token_cache.py) and run in length-sorted batches of up to
+#    --batch-size (or a --max-tokens budget) under torch.inference_mode.
+#  - The logits are cached in eval_cache/ under a hash of the checkpoint files and of the
+#    tokenized data, so re-evaluating a checkpoint on the same data only recomputes the metrics.
+#    The batch speed is cached with them together with the settings it was measured with
+#    (threads, batch size, token budget, device), and reported as cached.
+#  - Metrics are computed on whole NumPy arrays: accuracy, precision/recall/F1, confusion
+#    matrix, ROC-AUC, expected calibration error (ECE) with its reliability bins, and
+#    per-user / per-account accuracy.
+#  - Eval throughput (tweets/sec) and single-tweet latency are recorded next to the quality
+#    numbers. Every report is printed, saved as JSON and appended to results/eval_history.jsonl,
+#    which the backend serves at /model-performance for the frontend's Model Performance view.
+#
+# Usage:
+#   python evaluate.py ../backend/bert-twitterbot-detector
+#   python evaluate.py checkpoints_a/model checkpoints_b/model --split all --batch-size 256
+#   python evaluate.py checkpoints/checkpoint.pt --base-model ../backend/bert-twitterbot-detector
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+ECE_BINS = 10
+
+
+# A short fingerprint of a checkpoint folder or file (names, sizes and modification times)
+def checkpoint_fingerprint(path):
+    files = [path] if os.path.isfile(path) else [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    digest = hashlib.sha256()
+    for file in files:
+        stat = os.stat(file)
+        digest.update(f"{os.path.basename(file)}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# HuggingFace model folders load directly; a Trainer checkpoint.pt is loaded into --base-model
+def load_model(path, base_model):
+    if os.path.isfile(path):
+        model = BertForSequenceClassification.from_pretrained(base_model, low_cpu_mem_usage=True)
+        model.load_state_dict(torch.load(path, map_location="cpu")["model"])
+        return model
+    return BertForSequenceClassification.from_pretrained(path, low_cpu_mem_usage=True)
+
+
+def load_dataset(human_data, bot_data, split):
+    columns = ["Tweet_text", "Twitter_User_Name"]
+    df_human = read_table(human_data, columns=columns)
+    df_bot = read_table(bot_data, columns=columns)
+    df_human["label"] = 0
+    df_bot["label"] = 1
+    df = pd.concat([df_human, df_bot]).sample(frac=1, random_state=42).reset_index(drop=True)
+    df["Tweet_text"] = df["Tweet_text"].astype(str)
+    if split == "val":
+        # The same split as fine_tune_bert.py, so these are tweets the model never trained on
+        _, df = train_test_split(df, test_size=0.2, random_state=42)
+    return df.reset_index(drop=True)
+
+
+# Logits of every tweet in dataset order, plus tweets/sec and the padding share of the batches
+def compute_logits(model, tokens, batch_size, max_tokens, device):
+    sampler = LengthBucketBatchSampler(tokens.lengths, batch_size, max_tokens, shuffle=False)
+    batches = sampler.batches()
+    logits = np.zeros((len(tokens), model.config.num_labels), dtype=np.float32)
+    started = time.perf_counter()
+    with torch.inference_mode():
+        for idx in batches:
+            batch = pad_collate([{"input_ids": tokens[i]} for i in idx])
+            batch = {k: v.to(device) for k, v in batch.items()}
+            logits[idx] = model(**batch).logits.float().cpu().numpy()
+    elapsed = time.perf_counter() - started
+    return logits, {
+        "tweets_per_sec": len(tokens) / max(elapsed, 1e-9),
+        "seconds": elapsed,
+        "batches": len(batches),
+        "padding_share": padding_ratio([int(length) for length in tokens.lengths], batches)
+    }
+
+
+# Single-tweet latency the way /predict sees it: tokenize one text and run one forward pass
+def latency_ms(model, tokenizer, texts, device):
+    timings = []
+    with torch.inference_mode():
+        for i, text in enumerate(texts):
+            started = time.perf_counter()
+            inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=128).to(device)
+            model(**inputs)
+            if i >= 5:  # the first calls are warm-up
+                timings.append((time.perf_counter() - started) * 1000)
+    if not timings:
+        return None
+    return {"p50": float(np.percentile(timings, 50)), "p95": float(np.percentile(timings, 95)), "samples": len(timings)}
+
+
+def softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+# ROC-AUC as the Mann-Whitney U statistic: the chance a random bot scores above a random
+# human. Tied scores get their average rank.
+def roc_auc(y_true, scores):
+    positives = int(y_true.sum())
+    negatives = len(y_true) - positives
+    if positives == 0 or negatives == 0:
+        return None
+    _, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+    # Average 1-based rank of every distinct score
+    ends = np.cumsum(counts)
+    average_rank = ends - (counts - 1) / 2
+    ranks = average_rank[inverse]
+    return float((ranks[y_true == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+# Expected calibration error: how far the confidence is from the accuracy, averaged over
+# ECE_BINS equal-width confidence bins weighted by the tweets in them
+def calibration(confidence, correct, bins=ECE_BINS):
+    index = np.minimum((confidence * bins).astype(np.int64), bins - 1)
+    counts = np.bincount(index, minlength=bins)
+    confidence_sums = np.bincount(index, weights=confidence, minlength=bins)
+    correct_sums = np.bincount(index, weights=correct, minlength=bins)
+    nonzero = counts > 0
+    mean_confidence = np.divide(confidence_sums, counts, out=np.zeros(bins), where=nonzero)
+    accuracy = np.divide(correct_sums, counts, out=np.zeros(bins), where=nonzero)
+    ece = float((np.abs(mean_confidence - accuracy) * counts).sum() / max(len(confidence), 1))
+    reliability = [
+        {"bin": f"{b / bins:.1f}-{(b + 1) / bins:.1f}", "tweets": int(counts[b]),
+         "confidence": float(mean_confidence[b]), "accuracy": float(accuracy[b])}
+        for b in range(bins) if counts[b]
+    ]
+    return ece, reliability
+
+
+def per_user(users, y_true, y_pred, worst=10):
+    names, inverse = np.unique(users, return_inverse=True)
+    counts = np.bincount(inverse)
+    accuracy = np.bincount(inverse, weights=(y_true == y_pred).astype(np.float64)) / counts
+    # Account verdict: the majority of the account's tweet predictions (ties count as bot)
+    bot_share = np.bincount(inverse, weights=y_pred) / counts
+    account_label = np.bincount(inverse, weights=y_true) / counts >= 0.5
+    order = np.argsort(accuracy)[:worst]
+    return {
+        "users": len(names),
+        "mean_accuracy": float(accuracy.mean()),
+        "median_accuracy": float(np.median(accuracy)),
+        "account_accuracy": float(((bot_share >= 0.5) == account_label).mean()),
+        "worst": [
+            {"user": str(names[i]), "tweets": int(counts[i]), "accuracy": float(accuracy[i])} for i in order
+        ]
+    }
+
+
+def compute_metrics(logits, y_true, users):
+    probabilities = softmax(logits)
+    y_pred = probabilities.argmax(axis=1)
+    correct = (y_pred == y_true).astype(np.float64)
+    confusion = np.bincount(y_true * 2 + y_pred, minlength=4).reshape(2, 2)
+    tn, fp, fn, tp = (int(value) for value in confusion.ravel())
+
+    per_class = {}
+    for name, hit, false_alarm, miss in (("Human", tn, fn, fp), ("Bot", tp, fp, fn)):
+        precision = hit / (hit + false_alarm) if hit + false_alarm else 0.0
+        recall = hit / (hit + miss) if hit + miss else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_class[name] = {"precision": precision, "recall": recall, "f1": f1, "support": hit + miss}
+
+    ece, reliability = calibration(probabilities.max(axis=1), correct)
+    return {
+        "tweets": len(y_true),
+        "accuracy": float(correct.mean()),
+        "precision": per_class["Bot"]["precision"],
+        "recall": per_class["Bot"]["recall"],
+        "f1": per_class["Bot"]["f1"],
+        "macro_f1": (per_class["Bot"]["f1"] + per_class["Human"]["f1"]) / 2,
+        "per_class": per_class,
+        "roc_auc": roc_auc(y_true, probabilities[:, 1]),
+        "ece": ece,
+        "reliability": reliability,
+        "confusion_matrix": {"true_negative": tn, "false_positive": fp, "false_negative": fn, "true_positive": tp},
+        "per_user": per_user(users, y_true, y_pred)
+    }
+
+
+def evaluate(checkpoint, df, args, device, token_cache):
+    tokenizer_path = args.base_model if os.path.isfile(checkpoint) else checkpoint
+    tokenizer = BertTokenizer.from_pretrained(tokenizer_path)
+    tokens = token_cache.load_or_build(df["Tweet_text"].tolist(), tokenizer, max_length=128)
+
+    # Logits depend on the checkpoint and the tokenized data (the token cache folder is its hash)
+    key = f"{checkpoint_fingerprint(checkpoint)}_{os.path.basename(tokens.path)}"
+    logits_path = os.path.join(args.cache_dir, f"{key}.npy")
+    meta_path = os.path.join(args.cache_dir, f"{key}.json")
+
+    model = None
+    if os.path.exists(logits_path) and not args.no_cache:
+        logits = np.load(logits_path)
+        with open(meta_path) as f:
+            speed = dict(json.load(f), cached=True)
+        print(f"Using cached logits from {logits_path} (speed measured with batch size {speed.get('batch_size')}, "
+              f"max tokens {speed.get('max_tokens')}, {speed.get('threads')} threads)")
+    else:
+        model = load_model(checkpoint, args.base_model).to(device).eval()
+        logits, speed = compute_logits(model, tokens, args.batch_size, args.max_tokens, device)
+        # The settings go with the numbers they produced, a cache hit with other settings reports these
+        speed = dict(speed, threads=torch.get_num_threads(), batch_size=args.batch_size, max_tokens=args.max_tokens,
+                     device=str(device))
+        os.makedirs(args.cache_dir, exist_ok=True)
+        np.save(logits_path, logits)
+        with open(meta_path, "w") as f:
+            json.dump(speed, f)
+
+    report = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "checkpoint": checkpoint,
+        "fingerprint": checkpoint_fingerprint(checkpoint),
+        "data": {"human": args.human_data, "bot": args.bot_data, "split": args.split},
+        **compute_metrics(logits, df["label"].to_numpy(dtype=np.int64), df["Twitter_User_Name"].astype(str).to_numpy()),
+        "speed": dict(speed, cached=speed.get("cached", False))
+    }
+    if args.latency_samples:
+        model = model or load_model(checkpoint, args.base_model).to(device).eval()
+        sample = df["Tweet_text"].sample(min(args.latency_samples + 5, len(df)), random_state=0).tolist()
+        # Always measured in this run, so it gets this run's thread count
+        report["speed"]["latency_ms"] = latency_ms(model, tokenizer, sample, device)
+        report["speed"]["latency_threads"] = torch.get_num_threads()
+        report["speed"]["weights_mb"] = sum(p.numel() * p.element_size() for p in model.parameters()) / 2**20
+    report["speed"]["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def print_report(report):
+    speed = report["speed"]
+    latency = speed.get("latency_ms")
+    print(f"\n=== {report['checkpoint']} ({report['tweets']} tweets, {report['data']['split']} split) ===")
+    print(f"accuracy {report['accuracy']:.4f} | bot precision {report['precision']:.4f} recall {report['recall']:.4f} "
+          f"F1 {report['f1']:.4f} | macro F1 {report['macro_f1']:.4f}")
+    auc = f"{report['roc_auc']:.4f}" if report["roc_auc"] is not None else "-"
+    print(f"ROC-AUC {auc} | ECE {report['ece']:.4f}")
+    cm = report["confusion_matrix"]
+    print(f"confusion: TN {cm['true_negative']}  FP {cm['false_positive']}  FN {cm['false_negative']}  TP {cm['true_positive']}")
+    users = report["per_user"]
+    print(f"{users['users']} users: mean accuracy {users['mean_accuracy']:.4f}, account-level accuracy {users['account_accuracy']:.4f}")
+    line = f"speed: {speed['tweets_per_sec']:.1f} tweets/sec in batches ({speed['padding_share']:.1%} padding)"
+    if speed["cached"]:
+        line += f" [cached, batch size {speed.get('batch_size')}, {speed.get('threads')} threads]"
+    if latency:
+        line += f" | single tweet p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate checkpoints: accuracy, calibration, per-user accuracy and speed")
+    parser.add_argument("checkpoints", nargs="+", help="HuggingFace model folders or Trainer checkpoint.pt files")
+    parser.add_argument("--base-model", default=os.path.join("..", "backend", "bert-twitterbot-detector"),
+                        help="config and tokenizer for checkpoint.pt files")
+    parser.add_argument("--human-data", default="preprocessed_human_limited_1000_per_user.csv", help=".csv, .parquet or .arrow")
+    parser.add_argument("--bot-data", default="preprocessed_bots_limited_1000_per_user.csv", help=".csv, .parquet or .arrow")
+    parser.add_argument("--split", choices=["val", "all"], default="val",
+                        help="val: fine_tune_bert.py's held-out 20%%, all: every tweet")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--max-tokens", type=int, default=None, help="e.g. 8192 tokens per batch instead of --batch-size")
+    parser.add_argument("--latency-samples", type=int, default=200, help="single tweets timed (0 to skip)")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--cache-dir", default="eval_cache", help="where logits are cached")
+    parser.add_argument("--no-cache", action="store_true", help="always recompute the logits")
+    parser.add_argument("-o", "--output", default=os.path.join(RESULTS_DIR, "eval_history.jsonl"),
+                        help="JSON lines file every report is appended to")
+    args = parser.parse_args()
+    configure_threads(args.threads)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    df = load_dataset(args.human_data, args.bot_data, args.split)
+    token_cache = TokenCache("token_cache")
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    for checkpoint in args.checkpoints:
+        report = evaluate(checkpoint, df, args, device, token_cache)
+        print_report(report)
+        with open(args.output, "a") as f:
+            f.write(json.dumps(report) + "\n")
+    print(f"\n✅ Reports appended to {args.output}")
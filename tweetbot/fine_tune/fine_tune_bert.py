@@ -1,18 +1,52 @@
+import argparse
 import pandas as pd
 import torch
 import csv
 import os
+import sys
 from torch.utils.data import Dataset, DataLoader
 from transformers import BertTokenizer, BertForSequenceClassification, AdamW
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
-from tqdm import tqdm
 from datetime import datetime
 from sklearn.metrics import precision_recall_fscore_support
+from token_cache import TokenCache, pad_collate
+from length_sampler import LengthBucketBatchSampler, RandomBatchSampler, padding_report
+from trainer import Trainer, configure_threads
+
+# The tweet tables can be CSV, Parquet or Arrow, read through processing/columnar.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "processing"))
+from columnar import read_table
+
+# === Step 0: Training Settings ===
+# --batching bucket (default) groups tweets of similar length so batches carry little padding,
+# --batching random is the old shuffled fixed-size batching, for comparison.
+# --max-tokens switches bucketing to a token budget per batch instead of a fixed batch size.
+# The defaults train like the original script: 3 epochs, lr 2e-5, fp32, no warmup.
+parser = argparse.ArgumentParser(description="Fine-tune BERT on the preprocessed tweets")
+parser.add_argument("--batching", choices=["bucket", "random"], default="bucket")
+parser.add_argument("--batch-size", type=int, default=8)
+parser.add_argument("--max-tokens", type=int, default=None, help="e.g. 2048 tokens per batch (bucket mode only)")
+parser.add_argument("--epochs", type=int, default=3)
+parser.add_argument("--lr", type=float, default=2e-5)
+parser.add_argument("--grad-accum", type=int, default=1, help="micro-batches per optimizer step")
+parser.add_argument("--warmup-ratio", type=float, default=0.0, help="share of steps with linear LR warmup")
+parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast (fast on CPUs with AVX512-BF16/AMX)")
+parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: torch's choice)")
+parser.add_argument("--interop-threads", type=int, default=None, help="torch inter-op threads")
+parser.add_argument("--checkpoint-dir", default="checkpoints", help="where to save resumable checkpoints")
+parser.add_argument("--checkpoint-every", type=int, default=500, help="optimizer steps between checkpoints")
+parser.add_argument("--log-every", type=int, default=50, help="optimizer steps between throughput logs")
+parser.add_argument("--resume", action="store_true", help="continue from the checkpoint in --checkpoint-dir")
+parser.add_argument("--human-data", default="preprocessed_human_limited_1000_per_user.csv", help=".csv, .parquet or .arrow")
+parser.add_argument("--bot-data", default="preprocessed_bots_limited_1000_per_user.csv", help=".csv, .parquet or .arrow")
+args = parser.parse_args()
+configure_threads(args.threads, args.interop_threads)
 
 # === Step 1: Load and Label Data ===
-df_human = pd.read_csv("preprocessed_human_limited_1000_per_user.csv")
-df_bot = pd.read_csv("preprocessed_bots_limited_1000_per_user.csv")
+# Only the tweet text is needed here, with Parquet/Arrow the other columns are never read
+df_human = read_table(args.human_data, columns=["Tweet_text"])
+df_bot = read_table(args.bot_data, columns=["Tweet_text"])
 df_human["label"] = 0
 df_bot["label"] = 1
 df = pd.concat([df_human, df_bot]).sample(frac=1, random_state=42).reset_index(drop=True)
@@ -21,18 +55,21 @@ df = pd.concat([df_human, df_bot]).sample(frac=1, random_state=42).reset_index(d
 tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
 
 # === Step 3: Dataset Class ===
+# Tweets are tokenized once into a memory-mapped, unpadded cache (see token_cache.py).
+# Later runs on the same data and tokenizer skip tokenization, and pad_collate pads
+# each batch only to its own longest tweet.
+token_cache = TokenCache("token_cache")
+
 class TweetDataset(Dataset):
     def __init__(self, texts, labels):
-        self.encodings = tokenizer(texts, truncation=True, padding=True, max_length=128, return_tensors="pt")
+        self.tokens = token_cache.load_or_build(texts, tokenizer, max_length=128)
         self.labels = torch.tensor(labels)
 
     def __len__(self):
         return len(self.labels)
 
     def __getitem__(self, idx):
-        item = {key: val[idx] for key, val in self.encodings.items()}
-        item['labels'] = self.labels[idx]
-        return item
+        return {"input_ids": self.tokens[idx], "labels": self.labels[idx]}
 
 # === Step 4: Train/Test Split ===
 train_texts, val_texts, train_labels, val_labels = train_test_split(
@@ -46,22 +83,34 @@ model = BertForSequenceClassification.from_pretrained("bert-base-uncased", num_l
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 model.to(device)
 
-train_loader = DataLoader(train_dataset, batch_size=8, shuffle=True)
-val_loader = DataLoader(val_dataset, batch_size=8)
+if args.batching == "bucket":
+    # Randomized within length buckets for training, fully length-sorted for evaluation
+    train_sampler = LengthBucketBatchSampler(train_dataset.tokens.lengths, args.batch_size, args.max_tokens, shuffle=True)
+    val_sampler = LengthBucketBatchSampler(val_dataset.tokens.lengths, args.batch_size, args.max_tokens, shuffle=False)
+    val_loader = DataLoader(val_dataset, batch_sampler=val_sampler, collate_fn=pad_collate)
+
+    report = padding_report(train_dataset.tokens.lengths, train_sampler, args.batch_size)
+    print(
+        f"Padding share of training tokens: {report['global_max']:.1%} padded to global max, "
+        f"{report['random_batches']:.1%} with random batches, {report['bucketed']:.1%} with length buckets"
+    )
+else:
+    train_sampler = RandomBatchSampler(len(train_dataset), args.batch_size)
+    val_loader = DataLoader(val_dataset, batch_size=args.batch_size, collate_fn=pad_collate)
 
-optimizer = AdamW(model.parameters(), lr=2e-5)
+optimizer = AdamW(model.parameters(), lr=args.lr)
 
 # === Step 6: Training Loop ===
-model.train()
-for epoch in range(3):
-    print(f"\nEpoch {epoch+1}")
-    for batch in tqdm(train_loader):
-        batch = {k: v.to(device) for k, v in batch.items()}
-        outputs = model(**batch)
-        loss = outputs.loss
-        loss.backward()
-        optimizer.step()
-        optimizer.zero_grad()
+# See trainer.py: bf16 autocast, gradient accumulation, linear warmup, per-step
+# samples/sec + peak RSS logging, and checkpoints that can resume mid-epoch.
+trainer = Trainer(
+    model, optimizer, train_dataset, train_sampler, pad_collate, device,
+    epochs=args.epochs, grad_accum=args.grad_accum, warmup_ratio=args.warmup_ratio, bf16=args.bf16,
+    checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every, log_every=args.log_every
+)
+if args.resume:
+    trainer.load_checkpoint()
+trainer.train()
 
 # === Step 7: Evaluation ===
 model.eval()
@@ -0,0 +1,124 @@
+import math
+import random
+
+from torch.utils.data import Sampler
+
+# Most tweets are short, so batches made of random tweets are mostly padding:
+# every row is padded to the one long tweet that happened to land in the batch.
+# These samplers group tweets of similar length so each batch pads very little.
+
+
+class LengthBucketBatchSampler(Sampler):
+    # lengths:     token count of every example (e.g. TokenizedTexts.lengths)
+    # batch_size:  examples per batch, or
+    # max_tokens:  a token budget per batch instead, where a batch costs
+    #              (number of examples) x (its longest example) tokens after padding
+    # shuffle:     training mode - shuffle, cut into pools of `bucket_size` examples,
+    #              sort each pool by length, batch it, then shuffle the batch order.
+    #              Without shuffle (evaluation) everything is simply sorted by length.
+    def __init__(self, lengths, batch_size=8, max_tokens=None, shuffle=True, bucket_size=None, seed=42):
+        self.lengths = [int(length) for length in lengths]
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.shuffle = shuffle
+        self.bucket_size = bucket_size or (batch_size or 8) * 100
+        self.seed = seed
+        self.epoch = 0
+
+    # Call once per epoch so each epoch gets a different (but reproducible) order
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def batches(self):
+        indices = list(range(len(self.lengths)))
+        if not self.shuffle:
+            indices.sort(key=lambda i: self.lengths[i])
+            return self._split(indices)
+
+        rng = random.Random(self.seed + self.epoch)
+        rng.shuffle(indices)
+        batches = []
+        for start in range(0, len(indices), self.bucket_size):
+            bucket = sorted(indices[start:start + self.bucket_size], key=lambda i: self.lengths[i])
+            batches.extend(self._split(bucket))
+        rng.shuffle(batches)
+        return batches
+
+    def _split(self, sorted_indices):
+        if self.max_tokens is None:
+            return [sorted_indices[i:i + self.batch_size] for i in range(0, len(sorted_indices), self.batch_size)]
+
+        # Token budget: keep adding (length-sorted) examples while the padded batch fits
+        batches, batch, longest = [], [], 0
+        for i in sorted_indices:
+            new_longest = max(longest, self.lengths[i])
+            if batch and new_longest * (len(batch) + 1) > self.max_tokens:
+                batches.append(batch)
+                batch, new_longest = [], self.lengths[i]
+            batch.append(i)
+            longest = new_longest
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        if self.max_tokens is not None:
+            return len(self.batches())
+        if not self.shuffle:
+            return math.ceil(len(self.lengths) / self.batch_size)
+        # Shuffled pools are batched one by one, so each pool ends in its own partial batch
+        full_buckets, rest = divmod(len(self.lengths), self.bucket_size)
+        return full_buckets * math.ceil(self.bucket_size / self.batch_size) + math.ceil(rest / self.batch_size)
+
+
+# The old shuffled fixed-size batching, with the same interface as LengthBucketBatchSampler
+# so training can resume from the middle of an epoch in either mode
+class RandomBatchSampler(Sampler):
+    def __init__(self, count, batch_size=8, seed=42):
+        self.count = count
+        self.batch_size = batch_size
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def batches(self):
+        indices = list(range(self.count))
+        random.Random(self.seed + self.epoch).shuffle(indices)
+        return [indices[i:i + self.batch_size] for i in range(0, len(indices), self.batch_size)]
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        return math.ceil(self.count / self.batch_size)
+
+
+# Share of the tokens in a batch plan that are padding
+def padding_ratio(lengths, batches):
+    real = padded = 0
+    for batch in batches:
+        batch_lengths = [lengths[i] for i in batch]
+        real += sum(batch_lengths)
+        padded += max(batch_lengths) * len(batch_lengths)
+    return 1 - real / padded if padded else 0.0
+
+
+# Padding before and after bucketing, for the training log:
+#  global_max     - every example padded to the longest one (the old tokenizer(padding=True))
+#  random_batches - shuffled fixed-size batches, each padded to its own longest example
+#  bucketed       - the batches `sampler` actually produces
+def padding_report(lengths, sampler, batch_size=8, seed=42):
+    lengths = [int(length) for length in lengths]
+    indices = list(range(len(lengths)))
+    random.Random(seed).shuffle(indices)
+    random_batches = [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
+    return {
+        "global_max": padding_ratio(lengths, [list(range(len(lengths)))]),
+        "random_batches": padding_ratio(lengths, random_batches),
+        "bucketed": padding_ratio(lengths, sampler.batches())
+    }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The fine-tuning scripts import each other by file name from their own folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,82 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+for module in ("pandas", "torch", "transformers", "sklearn"):
+    pytest.importorskip(module)
+
+from evaluate import calibration, compute_metrics, per_user, roc_auc
+
+
+def test_roc_auc():
+    assert roc_auc(np.array([0, 0, 1, 1]), np.array([0.1, 0.4, 0.35, 0.8])) == 0.75
+    assert roc_auc(np.array([0, 1]), np.array([0.2, 0.9])) == 1.0
+    assert roc_auc(np.array([1, 0]), np.array([0.2, 0.9])) == 0.0
+
+
+def test_roc_auc_ties_get_half_credit():
+    assert roc_auc(np.array([0, 1, 0, 1]), np.full(4, 0.5)) == 0.5
+    # The bot tied with a human gets half a win against it
+    assert roc_auc(np.array([0, 1, 0, 1]), np.array([0.3, 0.3, 0.1, 0.9])) == 0.875
+
+
+def test_roc_auc_needs_both_classes():
+    assert roc_auc(np.array([1, 1]), np.array([0.2, 0.9])) is None
+    assert roc_auc(np.array([0, 0]), np.array([0.2, 0.9])) is None
+
+
+def test_calibration():
+    # Bin 0.6-0.7: confidence 0.65, all correct. Bin 0.9-1.0: confidence 0.95, half correct.
+    ece, reliability = calibration(np.array([0.95, 0.95, 0.65, 0.65]), np.array([1.0, 0.0, 1.0, 1.0]))
+    assert ece == pytest.approx((0.45 * 2 + 0.35 * 2) / 4)
+    assert [(r["bin"], r["tweets"], r["accuracy"]) for r in reliability] == [("0.6-0.7", 2, 1.0), ("0.9-1.0", 2, 0.5)]
+    assert [r["confidence"] for r in reliability] == pytest.approx([0.65, 0.95])
+
+
+def test_calibration_of_a_perfect_model_is_zero():
+    ece, reliability = calibration(np.array([1.0, 1.0]), np.array([1.0, 1.0]))
+    assert ece == 0.0
+    # A confidence of exactly 1.0 lands in the last bin
+    assert reliability == [{"bin": "0.9-1.0", "tweets": 2, "confidence": 1.0, "accuracy": 1.0}]
+
+
+def test_per_user():
+    users = np.array(["a", "a", "b", "b", "b", "c"])
+    y_true = np.array([0, 0, 1, 1, 1, 1])
+    y_pred = np.array([0, 1, 1, 1, 0, 0])
+    result = per_user(users, y_true, y_pred, worst=2)
+
+    assert result["users"] == 3
+    # a: 1/2, b: 2/3, c: 0/1
+    assert result["mean_accuracy"] == pytest.approx((1 / 2 + 2 / 3 + 0) / 3)
+    assert result["median_accuracy"] == 0.5
+    # Account verdicts: a is a tie (counts as bot, wrong), b is bot (right), c is human (wrong)
+    assert result["account_accuracy"] == pytest.approx(1 / 3)
+    assert result["worst"] == [
+        {"user": "c", "tweets": 1, "accuracy": 0.0},
+        {"user": "a", "tweets": 2, "accuracy": 0.5}
+    ]
+
+
+def test_compute_metrics():
+    # Probabilities (human, bot): 3/4 1/4, 1/4 3/4, 1/8 7/8, 3/4 1/4
+    logits = np.array([[math.log(3), 0.0], [0.0, math.log(3)], [0.0, math.log(7)], [math.log(3), 0.0]])
+    y_true = np.array([0, 0, 1, 1])
+    users = np.array(["u", "u", "v", "v"])
+    metrics = compute_metrics(logits, y_true, users)
+
+    # One of each: true negative, false positive, true positive, false negative
+    assert metrics["confusion_matrix"] == {"true_negative": 1, "false_positive": 1, "false_negative": 1, "true_positive": 1}
+    assert metrics["tweets"] == 4
+    assert metrics["accuracy"] == 0.5
+    assert (metrics["precision"], metrics["recall"], metrics["f1"], metrics["macro_f1"]) == (0.5, 0.5, 0.5, 0.5)
+    assert metrics["per_class"]["Human"] == {"precision": 0.5, "recall": 0.5, "f1": 0.5, "support": 2}
+    assert metrics["per_class"]["Bot"]["support"] == 2
+    # Bot scores 1/4, 3/4, 7/8, 1/4: the bot at 1/4 ties the human at 1/4
+    assert metrics["roc_auc"] == pytest.approx(0.625)
+    # Bin 0.7-0.8: three tweets at 0.75, one correct. Bin 0.8-0.9: one at 0.875, correct.
+    assert metrics["ece"] == pytest.approx((abs(0.75 - 1 / 3) * 3 + 0.125) / 4)
+    assert [(r["bin"], r["tweets"]) for r in metrics["reliability"]] == [("0.7-0.8", 3), ("0.8-0.9", 1)]
+    assert metrics["per_user"]["account_accuracy"] == 0.5
+    assert metrics["per_user"]["mean_accuracy"] == 0.5
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("torch")
+
+from length_sampler import LengthBucketBatchSampler, RandomBatchSampler, padding_ratio
+
+LENGTHS = [5, 1, 3, 2, 4]
+
+
+def test_without_shuffle_batches_are_sorted_by_length():
+    sampler = LengthBucketBatchSampler(LENGTHS, batch_size=2, shuffle=False)
+    assert sampler.batches() == [[1, 3], [2, 4], [0]]
+    assert len(sampler) == 3
+    assert list(sampler) == sampler.batches()
+
+
+def test_token_budget_counts_padded_tokens():
+    # Sorted lengths 1, 2, 3, 4, 5: [1, 2] costs 2 x 2 = 4 tokens, adding 3 would cost 9
+    sampler = LengthBucketBatchSampler(LENGTHS, batch_size=None, max_tokens=6, shuffle=False)
+    assert sampler.batches() == [[1, 3], [2], [4], [0]]
+    assert len(sampler) == 4
+
+
+def test_shuffled_pools_each_end_in_a_partial_batch():
+    # Pools of 5 in batches of 4 give 2 batches per pool: 4 in all, not ceil(10 / 4) = 3
+    sampler = LengthBucketBatchSampler(list(range(10)), batch_size=4, bucket_size=5, seed=0)
+    batches = sampler.batches()
+    assert len(sampler) == len(batches) == 4
+    assert sorted(len(batch) for batch in batches) == [1, 1, 4, 4]
+    assert sorted(i for batch in batches for i in batch) == list(range(10))
+
+
+@pytest.mark.parametrize("count,batch_size,bucket_size", [(10, 4, 5), (250, 32, 100), (200, 32, 100), (7, 3, 7), (3, 8, 800)])
+def test_len_matches_the_shuffled_batch_plan(count, batch_size, bucket_size):
+    sampler = LengthBucketBatchSampler([i % 17 for i in range(count)], batch_size=batch_size, bucket_size=bucket_size)
+    assert len(sampler) == len(sampler.batches())
+
+
+def test_shuffled_batches_are_sorted_and_reproducible():
+    lengths = [i * 7 % 13 for i in range(40)]
+    sampler = LengthBucketBatchSampler(lengths, batch_size=4, bucket_size=20, seed=3)
+    first = sampler.batches()
+    assert sampler.batches() == first
+    for batch in first:
+        assert [lengths[i] for i in batch] == sorted(lengths[i] for i in batch)
+    sampler.set_epoch(1)
+    assert sampler.batches() != first
+
+
+def test_random_batches_cover_every_example():
+    sampler = RandomBatchSampler(10, batch_size=4, seed=0)
+    batches = sampler.batches()
+    assert len(sampler) == len(batches) == 3
+    assert sorted(i for batch in batches for i in batch) == list(range(10))
+
+
+def test_padding_ratio():
+    # [1, 3] pads to 2 x 3 = 6 tokens for 4 real ones, [2] has no padding
+    assert padding_ratio([1, 3, 2], [[0, 1], [2]]) == pytest.approx(1 - 6 / 8)
+    assert padding_ratio([], []) == 0.0
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import torch
+
+# Tokenizing the whole corpus on every training run is slow, and padding every tweet
+# to the longest one wastes most of the memory. Instead we tokenize once, without
+# padding, and keep all token ids back to back in one flat file:
+#
+#   <cache_dir>/<key>/input_ids.bin  every tweet's token ids, one after the other
+#   <cache_dir>/<key>/offsets.npy    tweet i is input_ids[offsets[i]:offsets[i + 1]]
+#   <cache_dir>/<key>/meta.json      dtype, counts and what the cache was built from
+#
+# The key is a hash of the tokenizer (vocab + settings + max_length) and of the texts,
+# so changing either one builds a new cache. Unpadded attention masks are all ones,
+# so they are not stored: pad_collate builds them per batch from the lengths.
+
+
+def tokenizer_fingerprint(tokenizer, max_length):
+    digest = hashlib.sha256()
+    digest.update(f"{type(tokenizer).__name__}:{max_length}:{getattr(tokenizer, 'do_lower_case', None)}".encode("utf-8"))
+    for token, token_id in sorted(tokenizer.get_vocab().items(), key=lambda item: item[1]):
+        digest.update(f"{token_id}:{token}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def data_fingerprint(texts):
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8", errors="surrogatepass"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TokenizedTexts:
+    # Read-only view of one cache entry. Indexing returns a numpy view into the
+    # memory-mapped file, so nothing is copied until a batch is padded.
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        count = int(self.offsets[-1])
+        # np.memmap can't map an empty file
+        if count:
+            self.input_ids = np.memmap(os.path.join(path, "input_ids.bin"), dtype=self.meta["dtype"], mode="r", shape=(count,))
+        else:
+            self.input_ids = np.zeros(0, dtype=self.meta["dtype"])
+        self.lengths = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return self.input_ids[self.offsets[idx]:self.offsets[idx + 1]]
+
+
+class TokenCache:
+    def __init__(self, cache_dir="token_cache"):
+        self.cache_dir = cache_dir
+
+    def load_or_build(self, texts, tokenizer, max_length=128, chunk_size=10000):
+        texts = list(texts)
+        key = hashlib.sha256(
+            f"{tokenizer_fingerprint(tokenizer, max_length)}:{data_fingerprint(texts)}".encode("utf-8")
+        ).hexdigest()[:24]
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            self._build(path, texts, tokenizer, max_length, chunk_size)
+        else:
+            print(f"Using cached tokens from {path}")
+        return TokenizedTexts(path)
+
+    def _build(self, path, texts, tokenizer, max_length, chunk_size):
+        print(f"Tokenizing {len(texts)} texts into {path}")
+        # Token ids fit in 16 bits for BERT's 30k vocab, halving the file size
+        dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.int32
+
+        # Build in a temporary folder and rename at the end, so a crash never leaves a half-written cache
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        with open(os.path.join(tmp_path, "input_ids.bin"), "wb") as f:
+            for start in range(0, len(texts), chunk_size):
+                encoded = tokenizer(texts[start:start + chunk_size], truncation=True, max_length=max_length)["input_ids"]
+                for i, ids in enumerate(encoded, start=start):
+                    offsets[i + 1] = offsets[i] + len(ids)
+                np.fromiter((t for ids in encoded for t in ids), dtype=dtype).tofile(f)
+
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({
+                "dtype": np.dtype(dtype).name,
+                "texts": len(texts),
+                "tokens": int(offsets[-1]),
+                "max_length": max_length,
+                "tokenizer": type(tokenizer).__name__
+            }, f)
+        os.replace(tmp_path, path)
+
+
+# DataLoader collate_fn: pad each batch only to its own longest tweet.
+# "input_ids" items are numpy views from TokenizedTexts, everything else is stacked as tensors.
+def pad_collate(batch, pad_token_id=0):
+    lengths = [len(item["input_ids"]) for item in batch]
+    input_ids = torch.full((len(batch), max(lengths)), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(batch), max(lengths)), dtype=torch.long)
+    for row, (item, length) in enumerate(zip(batch, lengths)):
+        input_ids[row, :length] = torch.from_numpy(item["input_ids"].astype(np.int64))
+        attention_mask[row, :length] = 1
+
+    collated = {"input_ids": input_ids, "attention_mask": attention_mask}
+    for key in batch[0]:
+        if key != "input_ids":
+            collated[key] = torch.stack([item[key] for item in batch])
+    return collated
@@ -0,0 +1,160 @@
+import math
+import os
+import sys
+import time
+
+import torch
+from torch.utils.data import DataLoader
+from tqdm import tqdm
+from transformers import get_linear_schedule_with_warmup
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Set how many threads torch uses. Has to run before any model work starts,
+# torch refuses to change the inter-op pool once it has been used.
+#  threads:         intra-op threads (one matrix multiply split across cores)
+#  interop_threads: how many independent ops may run at the same time
+def configure_threads(threads=None, interop_threads=None):
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        torch.set_interop_threads(interop_threads)
+    print(f"Torch threads: {torch.get_num_threads()} intra-op, {torch.get_num_interop_threads()} inter-op")
+
+
+# Peak resident memory of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)
+def peak_rss_mb():
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+# HuggingFace models compute their own loss when "labels" is in the batch
+def default_loss(model, batch):
+    return model(**batch).loss
+
+
+class Trainer:
+    # A small training loop for our CPU boxes.
+    #  batch_sampler: LengthBucketBatchSampler / RandomBatchSampler (needs set_epoch and batches())
+    #  bf16:          run forward passes under bfloat16 autocast
+    #  grad_accum:    micro-batches per optimizer step
+    #  warmup_ratio:  share of optimizer steps spent linearly warming up the learning rate
+    #  checkpoint_dir/checkpoint_every: save everything needed to resume every N optimizer steps
+    #  log_every:     print samples/sec and peak RSS every N optimizer steps
+    def __init__(self, model, optimizer, train_dataset, batch_sampler, collate_fn, device,
+                 epochs=3, grad_accum=1, warmup_ratio=0.0, bf16=False,
+                 checkpoint_dir=None, checkpoint_every=500, log_every=50, loss_fn=default_loss):
+        self.model = model
+        self.optimizer = optimizer
+        self.train_dataset = train_dataset
+        self.batch_sampler = batch_sampler
+        self.collate_fn = collate_fn
+        self.device = device
+        self.epochs = epochs
+        self.grad_accum = grad_accum
+        self.bf16 = bf16
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.log_every = log_every
+        self.loss_fn = loss_fn
+
+        steps_per_epoch = math.ceil(len(batch_sampler) / grad_accum)
+        total_steps = steps_per_epoch * epochs
+        self.scheduler = get_linear_schedule_with_warmup(optimizer, int(total_steps * warmup_ratio), total_steps)
+
+        self.epoch = 0
+        self.batch_in_epoch = 0
+        self.global_step = 0
+
+    @property
+    def checkpoint_path(self):
+        return os.path.join(self.checkpoint_dir, "checkpoint.pt")
+
+    def save_checkpoint(self):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        tmp_path = self.checkpoint_path + ".tmp"
+        torch.save({
+            "model": self.model.state_dict(),
+            "optimizer": self.optimizer.state_dict(),
+            "scheduler": self.scheduler.state_dict(),
+            "epoch": self.epoch,
+            "batch_in_epoch": self.batch_in_epoch,
+            "global_step": self.global_step,
+            "rng": torch.get_rng_state()
+        }, tmp_path)
+        # Rename at the end so a crash while saving never destroys the last good checkpoint
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # Returns True if there was a checkpoint to resume from
+    def load_checkpoint(self):
+        if not self.checkpoint_dir or not os.path.exists(self.checkpoint_path):
+            return False
+        state = torch.load(self.checkpoint_path, map_location=self.device)
+        self.model.load_state_dict(state["model"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        self.scheduler.load_state_dict(state["scheduler"])
+        self.epoch = state["epoch"]
+        self.batch_in_epoch = state["batch_in_epoch"]
+        self.global_step = state["global_step"]
+        torch.set_rng_state(state["rng"].cpu())
+        print(f"Resuming from epoch {self.epoch + 1}, batch {self.batch_in_epoch} (step {self.global_step})")
+        return True
+
+    def _optimizer_step(self):
+        self.optimizer.step()
+        self.scheduler.step()
+        self.optimizer.zero_grad()
+        self.global_step += 1
+
+    def train(self):
+        self.model.train()
+        while self.epoch < self.epochs:
+            print(f"\nEpoch {self.epoch + 1}")
+            # The sampler's batch order only depends on the epoch, so skipping the batches
+            # that were already trained puts us exactly where the checkpoint left off
+            self.batch_sampler.set_epoch(self.epoch)
+            batches = self.batch_sampler.batches()[self.batch_in_epoch:]
+            loader = DataLoader(self.train_dataset, batch_sampler=batches, collate_fn=self.collate_fn)
+
+            epoch_start, epoch_samples = time.perf_counter(), 0
+            log_start, log_samples = epoch_start, 0
+            for batch in tqdm(loader):
+                batch = {k: v.to(self.device) for k, v in batch.items()}
+                with torch.autocast(device_type=self.device.type, dtype=torch.bfloat16, enabled=self.bf16):
+                    loss = self.loss_fn(self.model, batch)
+                (loss / self.grad_accum).backward()
+                self.batch_in_epoch += 1
+                log_samples += batch["input_ids"].shape[0]
+                epoch_samples += batch["input_ids"].shape[0]
+
+                if self.batch_in_epoch % self.grad_accum != 0:
+                    continue
+                self._optimizer_step()
+
+                if self.log_every and self.global_step % self.log_every == 0:
+                    elapsed = time.perf_counter() - log_start
+                    print(
+                        f"step {self.global_step} | loss {loss.item():.4f} | lr {self.scheduler.get_last_lr()[0]:.2e} | "
+                        f"{log_samples / elapsed:.1f} samples/sec | peak RSS {peak_rss_mb():.0f} MB"
+                    )
+                    log_start, log_samples = time.perf_counter(), 0
+
+                if self.checkpoint_dir and self.checkpoint_every and self.global_step % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+
+            # Apply what is left of an unfinished accumulation at the end of the epoch
+            if self.batch_in_epoch % self.grad_accum != 0:
+                self._optimizer_step()
+
+            elapsed = time.perf_counter() - epoch_start
+            print(f"Epoch {self.epoch + 1}: {epoch_samples / elapsed:.1f} samples/sec | peak RSS {peak_rss_mb():.0f} MB")
+            self.epoch += 1
+            self.batch_in_epoch = 0
+            if self.checkpoint_dir:
+                self.save_checkpoint()
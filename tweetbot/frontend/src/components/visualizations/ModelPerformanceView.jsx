@@ -3,35 +3,46 @@ import {
   LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend,
   PieChart, Pie, Cell, ResponsiveContainer
 } from 'recharts';
+import { getModelPerformance } from '../../services/api';
+
+// Placeholder numbers, shown until fine_tune/evaluate.py has been run
+const PLACEHOLDER_HISTORY = [
+  { date: '2025-01', accuracy: 0.86, precision: 0.85, recall: 0.83 },
+  { date: '2025-02', accuracy: 0.89, precision: 0.88, recall: 0.87 },
+  { date: '2025-03', accuracy: 0.92, precision: 0.91, recall: 0.90 },
+  { date: '2025-04', accuracy: 0.94, precision: 0.93, recall: 0.92 },
+  { date: '2025-05', accuracy: 0.95, precision: 0.94, recall: 0.93 },
+  { date: '2025-06', accuracy: 0.96, precision: 0.95, recall: 0.94 },
+];
+const PLACEHOLDER_CONFUSION = {
+  true_positive: 845, false_negative: 80, false_positive: 95, true_negative: 780
+};
 
 const ModelPerformanceView = ({ predictionData }) => {
-  const [testResults, setTestResults] = useState([]);
-  
-  // In a real implementation, you might fetch this from an API endpoint
-  // Here we'll use placeholder data based on the test results CSV
+  const [testResults, setTestResults] = useState(PLACEHOLDER_HISTORY);
+  const [latest, setLatest] = useState(null);
+
+  // Evaluation reports from the backend (/model-performance); keeps the placeholders if there are none yet
   useEffect(() => {
-    // This would normally be fetched from an API
-    const results = [
-      { date: '2025-01', accuracy: 0.86, precision: 0.85, recall: 0.83 },
-      { date: '2025-02', accuracy: 0.89, precision: 0.88, recall: 0.87 },
-      { date: '2025-03', accuracy: 0.92, precision: 0.91, recall: 0.90 },
-      { date: '2025-04', accuracy: 0.94, precision: 0.93, recall: 0.92 },
-      { date: '2025-05', accuracy: 0.95, precision: 0.94, recall: 0.93 },
-      { date: '2025-06', accuracy: 0.96, precision: 0.95, recall: 0.94 },
-    ];
-    
-    setTestResults(results);
+    getModelPerformance()
+      .then((data) => {
+        setTestResults(data.history.map((row) => ({ ...row, date: row.timestamp.slice(0, 16) })));
+        setLatest(data.latest);
+      })
+      .catch(() => {});
   }, []);
 
-  // Updated confusion matrix data to match the percentages in the screenshot
+  const confusion = latest ? latest.confusion_matrix : PLACEHOLDER_CONFUSION;
+  const totalPredictions =
+    confusion.true_positive + confusion.false_negative + confusion.false_positive + confusion.true_negative;
+  const percentOf = (value) => Math.round((value / totalPredictions) * 100);
   const confusionMatrixData = [
-    { name: 'True Positive', value: 845, percent: 47, color: '#4CAF50' },
-    { name: 'False Negative', value: 80, percent: 4, color: '#FFC107' },
-    { name: 'False Positive', value: 95, percent: 5, color: '#F44336' },
-    { name: 'True Negative', value: 780, percent: 43, color: '#2196F3' },
+    { name: 'True Positive', value: confusion.true_positive, percent: percentOf(confusion.true_positive), color: '#4CAF50' },
+    { name: 'False Negative', value: confusion.false_negative, percent: percentOf(confusion.false_negative), color: '#FFC107' },
+    { name: 'False Positive', value: confusion.false_positive, percent: percentOf(confusion.false_positive), color: '#F44336' },
+    { name: 'True Negative', value: confusion.true_negative, percent: percentOf(confusion.true_negative), color: '#2196F3' },
   ];
-
-  const totalPredictions = confusionMatrixData.reduce((sum, item) => sum + item.value, 0);
+  const speed = latest ? latest.speed : null;
   
   // Calculate model metrics
   const calculateMetrics = () => {
@@ -73,6 +84,37 @@ const ModelPerformanceView = ({ predictionData }) => {
             <div className="text-xl font-bold text-purple-700">{metrics.f1.toFixed(1)}%</div>
           </div>
         </div>
+
+        {/* Speed and calibration of the latest evaluated checkpoint */}
+        {latest && (
+          <div className="grid grid-cols-4 gap-4 mt-4">
+            <div className="bg-gray-50 p-3 rounded text-center">
+              <div className="text-sm font-medium text-gray-600">Throughput</div>
+              <div className="text-xl font-bold text-gray-700">{speed.tweets_per_sec.toFixed(0)} tweets/s</div>
+            </div>
+            <div className="bg-gray-50 p-3 rounded text-center">
+              <div className="text-sm font-medium text-gray-600">Latency (p50 / p95)</div>
+              <div className="text-xl font-bold text-gray-700">
+                {speed.latency_ms ? `${speed.latency_ms.p50.toFixed(1)} / ${speed.latency_ms.p95.toFixed(1)} ms` : 'n/a'}
+              </div>
+            </div>
+            <div className="bg-gray-50 p-3 rounded text-center">
+              <div className="text-sm font-medium text-gray-600">ROC-AUC</div>
+              <div className="text-xl font-bold text-gray-700">
+                {latest.roc_auc !== null ? latest.roc_auc.toFixed(3) : 'n/a'}
+              </div>
+            </div>
+            <div className="bg-gray-50 p-3 rounded text-center">
+              <div className="text-sm font-medium text-gray-600">Calibration error (ECE)</div>
+              <div className="text-xl font-bold text-gray-700">{latest.ece.toFixed(3)}</div>
+            </div>
+          </div>
+        )}
+        {latest && (
+          <p className="text-xs text-gray-500 mt-2 text-center">
+            {latest.checkpoint} on {latest.tweets} tweets ({latest.data.split} split), evaluated {latest.timestamp}
+          </p>
+        )}
       </div>
     
       <div className="grid md:grid-cols-2 gap-6">
@@ -80,7 +122,7 @@ const ModelPerformanceView = ({ predictionData }) => {
         <div className="bg-white p-4 rounded-lg shadow">
           <h3 className="text-lg font-semibold mb-2 text-center">Model Performance Over Time</h3>
           <p className="text-sm text-gray-600 mb-4 text-center">
-            How the model's accuracy, precision, and recall have improved over time.
+            How the model's accuracy, precision, and recall have changed across evaluated checkpoints.
           </p>
           <ResponsiveContainer width="100%" height={300}>
             <LineChart
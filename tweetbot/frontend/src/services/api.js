@@ -12,3 +12,9 @@ export const classifyRandomTweet = async () => {
   const response = await axios.get(`${API_BASE_URL}/random-predict`);
   return response.data;
 };
+
+// Quality and speed reports written by fine_tune/evaluate.py
+export const getModelPerformance = async () => {
+  const response = await axios.get(`${API_BASE_URL}/model-performance`);
+  return response.data;
+};
@@ -0,0 +1,229 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Typed, columnar storage for the pipeline's tweet tables, picked by file extension:
+#  .parquet         compressed, with per-row-group min/max statistics. Written sorted by
+#                   Twitter_User_Name, so a filter on a few users only reads the row
+#                   groups that can contain them.
+#  .arrow/.feather  Arrow IPC, uncompressed and memory-mapped: opening it is almost free
+#                   and columns are read straight from the page cache.
+#  .csv             still read and written, for importing raw dumps and for export.
+#
+# Every stage reads through read_table(path, columns=..., users=...) so it only pays for
+# the columns (and users) it actually needs.
+#
+# Usage:
+#   python columnar.py convert ../preprocessed_data/preprocessed_bots_limited_200_per_user.csv bots.parquet
+#   python columnar.py compare ../preprocessed_data/*.csv
+
+USER_COLUMN = "Twitter_User_Name"
+PARQUET_SUFFIXES = (".parquet", ".pq")
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+
+def table_format(path):
+    suffix = Path(path).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+    if suffix in ARROW_SUFFIXES:
+        return "arrow"
+    if suffix == ".csv":
+        return "csv"
+    raise ValueError(f"Unknown table format for {path}, expected .csv, .parquet or .arrow")
+
+
+# Read a table into a DataFrame.
+#  columns: only read these columns (None = all)
+#  users:   only keep rows whose Twitter_User_Name is one of these (None = all)
+def read_table(path, columns=None, users=None):
+    fmt = table_format(path)
+    if fmt == "csv":
+        usecols = None if columns is None else list(dict.fromkeys(columns + ([USER_COLUMN] if users is not None else [])))
+        df = pd.read_csv(path, usecols=usecols)
+        if users is not None:
+            df = df[df[USER_COLUMN].isin(list(users))].reset_index(drop=True)
+        return df[columns] if columns is not None else df
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        # The filter is pushed down: row groups whose user min/max can't match are skipped
+        filters = [(USER_COLUMN, "in", list(users))] if users is not None else None
+        table = pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+    else:
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        if users is not None:
+            table = table.filter(pc.is_in(table[USER_COLUMN], value_set=pa.array(list(users))))
+        if columns is not None:
+            table = table.select(columns)
+    return table.to_pandas()
+
+
+# Stream a table in DataFrame chunks of about chunk_size rows.
+# skip_rows starts after that many data rows without parsing them into DataFrames
+# (used to resume a run): CSV skips the lines, Parquet skips whole row groups using
+# the file metadata, Arrow starts its slices at the offset.
+def iter_table_chunks(path, chunk_size, columns=None, skip_rows=0):
+    fmt = table_format(path)
+    if fmt == "csv":
+        skiprows = range(1, skip_rows + 1) if skip_rows else None
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns, skiprows=skiprows)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        row_groups = []
+        for index in range(parquet_file.num_row_groups):
+            group_rows = parquet_file.metadata.row_group(index).num_rows
+            if skip_rows >= group_rows and not row_groups:
+                skip_rows -= group_rows
+            else:
+                row_groups.append(index)
+        if not row_groups:
+            return
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns, row_groups=row_groups):
+            # Only the first row group can still have rows to skip
+            if skip_rows:
+                dropped = min(skip_rows, batch.num_rows)
+                batch = batch.slice(dropped)
+                skip_rows -= dropped
+                if batch.num_rows == 0:
+                    continue
+            yield batch.to_pandas()
+    else:
+        # Arrow IPC is memory-mapped, slicing it doesn't copy anything
+        import pyarrow as pa
+
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(columns)
+            for start in range(skip_rows, table.num_rows, chunk_size):
+                yield table.slice(start, chunk_size).to_pandas()
+
+
+# Write a DataFrame in the format of the path's extension.
+# Parquet/Arrow rows are sorted by user first (stable, so each user's tweets keep their
+# order), which is what makes the row-group statistics useful for user filters.
+# CSV has no statistics, so it is written in the order it was given.
+def write_table(df, path, sort_by_user=True, row_group_size=50000):
+    fmt = table_format(path)
+    if sort_by_user and fmt != "csv" and USER_COLUMN in df.columns:
+        df = df.sort_values(USER_COLUMN, kind="stable")
+
+    # Write next to the target and rename, so readers never see a half-written file
+    tmp_path = Path(f"{path}.tmp{os.getpid()}")
+    if fmt == "csv":
+        df.to_csv(tmp_path, index=False)
+    else:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, tmp_path, row_group_size=row_group_size, compression="zstd")
+        else:
+            # Left uncompressed on purpose, compressed IPC can't be memory-mapped without copying
+            with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=row_group_size)
+    os.replace(tmp_path, path)
+
+
+# Combine Parquet part files into one Parquet/Arrow file, one part in memory at a time.
+# The rows keep the order of the parts (no sort across parts, that would need them all at once).
+def write_parts(part_paths, path, row_group_size=50000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fmt = table_format(path)
+    if fmt == "csv":
+        raise ValueError(f"write_parts writes Parquet or Arrow, not {path}")
+    part_paths = list(part_paths)
+    schema = pq.read_schema(part_paths[0])
+    tmp_path = Path(f"{path}.tmp{os.getpid()}")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        if fmt == "parquet":
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(sink, schema)
+        with writer:
+            for part_path in part_paths:
+                table = pq.read_table(part_path).cast(schema)
+                if fmt == "parquet":
+                    writer.write_table(table, row_group_size=row_group_size)
+                else:
+                    writer.write_table(table, max_chunksize=row_group_size)
+    os.replace(tmp_path, path)
+
+
+def convert(input_path, output_path, row_group_size=50000):
+    df = read_table(input_path)
+    write_table(df, output_path, row_group_size=row_group_size)
+    print(f"✅ {input_path} ({os.path.getsize(input_path) / 2**20:.2f} MB) -> "
+          f"{output_path} ({os.path.getsize(output_path) / 2**20:.2f} MB), {len(df)} rows")
+
+
+def _time_read(path, repeat, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        read_table(path, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+# Size and load time of each CSV next to its Parquet and Arrow versions:
+# the whole table, only Tweet_text, only the metric columns, and one user's rows
+def compare(paths, repeat=3):
+    print(f"{'file':<45} {'format':<8} {'MB':>7} {'all ms':>8} {'text ms':>8} {'metrics ms':>10} {'1 user ms':>9}")
+    for csv_path in paths:
+        df = read_table(csv_path)
+        text_columns = ["Tweet_text"]
+        metric_columns = list(df.columns[df.columns.get_loc("Tweet_text") + 1:])
+        users = [df[USER_COLUMN].iloc[0]] if USER_COLUMN in df.columns else None
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            stem = Path(csv_path).stem
+            versions = [("csv", Path(csv_path))]
+            for fmt, suffix in (("parquet", ".parquet"), ("arrow", ".arrow")):
+                path = Path(tmp_dir) / f"{stem}{suffix}"
+                write_table(df, path)
+                versions.append((fmt, path))
+
+            for fmt, path in versions:
+                all_ms = _time_read(path, repeat)
+                text_ms = _time_read(path, repeat, columns=text_columns)
+                metrics_ms = _time_read(path, repeat, columns=metric_columns) if metric_columns else float("nan")
+                user_ms = _time_read(path, repeat, columns=text_columns, users=users) if users else float("nan")
+                print(f"{stem[:45]:<45} {fmt:<8} {os.path.getsize(path) / 2**20:>7.2f} "
+                      f"{all_ms:>8.1f} {text_ms:>8.1f} {metrics_ms:>10.1f} {user_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert tweet tables between CSV, Parquet and Arrow and compare them")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="convert a table, formats are picked by extension")
+    convert_parser.add_argument("input")
+    convert_parser.add_argument("output")
+    convert_parser.add_argument("--row-group-size", type=int, default=50000)
+
+    compare_parser = subparsers.add_parser("compare", help="file size and load time of CSV vs Parquet vs Arrow")
+    compare_parser.add_argument("inputs", nargs="+", help="CSV files")
+    compare_parser.add_argument("--repeat", type=int, default=3, help="reads per measurement, the fastest is kept")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        convert(args.input, args.output, args.row_group_size)
+    else:
+        compare(args.inputs, args.repeat)
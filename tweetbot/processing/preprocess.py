@@ -1,76 +1,170 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import pandas as pd
-import numpy as np
-import re
 from textblob import TextBlob
 import spacy
-from collections import Counter
 
-# Load the spaCy english language model. This is going to help us analyze 
-# the features and look for patterns, repetitiveness, and special 
-# characteristics we may not have noticed
-nlp = spacy.load("en_core_web_sm")
+from columnar import iter_table_chunks, table_format, write_parts, write_table
+from text_features import count_features
+
+# The spaCy english language model is going to help us analyze the features and
+# look for patterns, repetitiveness, and special characteristics we may not have noticed.
+# Only the POS tags are used, so the parser, NER and lemmatizer are left out.
+# It is loaded on first use so every worker process loads its own copy.
+_nlp = None
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        _nlp = spacy.load("en_core_web_sm", exclude=["parser", "ner", "lemmatizer"])
+    return _nlp
+
+# Output columns, in the order they are written after the input's own columns
+FEATURE_COLUMNS = [
+    "char_count", "word_count", "question_count", "exclamation_count", "hashtag_count", "mention_count",
+    "link_count", "polarity", "subjectivity", "noun_ratio", "verb_ratio", "adj_ratio", "adv_ratio",
+    "pron_ratio", "unique_word_ratio", "stopword_count"
+]
 
 # Function that extracts new features and metrics from a single tweet
 def extract_feature_metrics(text):
-    features = {}
-
-    # 1. Character and Word counts 
-    #  metrics: int >= 0 
-    features["char_count"] = len(text)
-    features["word_count"] = len(text.split())
+    return pd.Series(features_from_doc(text, get_nlp()(text)))
 
-    # 2. Special characters: ?, !, #, @, "www.", "http"
-    #  metrics: int >= 0 
-    features["question_count"] = text.count("?")
-    features["exclamation_count"] = text.count("!")
-    features["hashtag_count"] = text.count("#")
-    features["mention_count"] = text.count("@")
-    features["link_count"] = text.lower().count("http") + text.lower().count("www.")
+# Same features, but from a spaCy doc that was already made (e.g. by nlp.pipe)
+def features_from_doc(text, doc):
+    # 1. Character and word counts, 2. special characters, 5. lexical diversity and
+    # 6. stop words only need the text, see text_features.py (shared with the backend's cascade)
+    features = count_features(text)
 
     # 3. Sentiment analysis: polarity and subjectivity
     #  polarity metrics: -1.0 = very negative, 1.0 = very positive
-    #  subjectivity metrics: 0.0 = very objective, 1.0 = very subjective 
-    blob = TextBlob(text)
-    features["polarity"] = blob.sentiment.polarity
-    features["subjectivity"] = blob.sentiment.subjectivity
+    #  subjectivity metrics: 0.0 = very objective, 1.0 = very subjective
+    sentiment = TextBlob(text).sentiment
+    features["polarity"] = sentiment.polarity
+    features["subjectivity"] = sentiment.subjectivity
 
     # 4. Part-of-Speech (POS) ratios: noun, verb, adjective, pronoun
-    #  metrics: int >= 0 
-    doc = nlp(text)
+    #  metrics: int >= 0
     pos_counts = Counter([token.pos_ for token in doc])
     total_tokens = len(doc)
-    for pos in ["NOUN", "VERB", "ADJ", "ADV", "PRON"]:features[f"{pos.lower()}_ratio"] = pos_counts.get(pos, 0) / total_tokens if total_tokens > 0 else 0
-    
-    # 5. Lexical diversity: If there are repeated words and the frequency of it
-    #  metrics: 0.0 = all words are the same, 1.0 = there are no repeating words
-    words = re.findall(r"\b\w+\b", text.lower())
-    unique_words = set(words)
-    features["unique_word_ratio"] = len(unique_words) / len(words) if words else 0
+    for pos in ["NOUN", "VERB", "ADJ", "ADV", "PRON"]:features[f"{pos.lower()}_ratio"] = pos_counts.get(pos, 0) / total_tokens if total_tokens > 0 else 0.0
 
-    # 6. Stop word count: Filler words that humans usually use that bots will omit
-    #  metrics: int >= 0 
-    stop_words = set(["the", "and", "is", "in", "to", "a", "of", "it", "on", "for"])
-    features["stopword_count"] = sum(1 for word in words if word in stop_words)
+    return {name: features[name] for name in FEATURE_COLUMNS}
 
-    return pd.Series(features)
+# Runs inside a worker process: tag a slice of tweets with nlp.pipe and build their features
+def extract_feature_metrics_batch(texts, batch_size=256):
+    docs = get_nlp().pipe(texts, batch_size=batch_size)
+    return [features_from_doc(text, doc) for text, doc in zip(texts, docs)]
 
-# === THIS IS MAIN ===
+# Progress is saved next to the output after every chunk so a crashed run can
+# pick up from the last chunk that was fully written.
+def load_progress(progress_path, input_path):
+    if not progress_path.exists():
+        return None
+    with open(progress_path) as f:
+        progress = json.load(f)
+    if progress.get("input") != str(input_path):
+        raise ValueError(f"{progress_path} belongs to a different input file ({progress.get('input')})")
+    return progress
+
+def save_progress(progress_path, progress):
+    tmp_path = progress_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+# Input and output can be CSV, Parquet or Arrow (picked by extension, see columnar.py).
+# CSV output is appended chunk by chunk. Parquet/Arrow output is written chunk by chunk
+# into <output>.parts/ and streamed into the output file part by part at the end, so the
+# rows keep the input's order (run columnar.py convert on it to sort by user).
+def preprocess_file(input_path, output_path, chunk_size=5000, workers=None, batch_size=256, restart=False):
+    input_path, output_path = Path(input_path), Path(output_path)
+    progress_path = output_path.with_name(output_path.name + ".progress.json")
+    parts_dir = output_path.with_name(output_path.name + ".parts")
+    columnar_output = table_format(output_path) != "csv"
+    workers = workers or os.cpu_count() or 1
+
+    progress = None if restart else load_progress(progress_path, input_path)
+    if progress is not None and not (parts_dir if columnar_output else output_path).exists():
+        progress = None
+    if progress is None:
+        progress = {"input": str(input_path), "chunks_done": 0, "rows_done": 0, "output_bytes": 0}
+        if output_path.exists():
+            output_path.unlink()
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    else:
+        if not columnar_output:
+            # Throw away anything written after the last saved chunk (e.g. a half-written chunk)
+            with open(output_path, "a") as f:
+                f.truncate(progress["output_bytes"])
+        print(f"Resuming after chunk {progress['chunks_done']} ({progress['rows_done']} rows already done)")
 
-# Input the filename --> ex) "filename.csv"
-input_filename = "all_50_human_tweets.csv"
+    started = time.perf_counter()
+    new_rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # On a resume the rows already done are skipped by offset, not parsed and thrown away
+        chunks = iter_table_chunks(input_path, chunk_size, skip_rows=progress["rows_done"])
+        for chunk_index, chunk in enumerate(chunks, start=progress["chunks_done"]):
+            # Split this chunk across the worker processes, each runs nlp.pipe over its slice
+            texts = chunk["Tweet_text"].astype(str).tolist()
+            slice_size = -(-len(texts) // workers)
+            slices = [texts[i:i + slice_size] for i in range(0, len(texts), slice_size)]
+            features = []
+            for part in pool.map(extract_feature_metrics_batch, slices, [batch_size] * len(slices)):
+                features.extend(part)
 
-# This loads the data set 
-df = pd.read_csv(input_filename) 
+            # Combine the original data with the new metrics data and append it to the output.
+            # Counts stay integers and ratios/sentiment stay floats.
+            features_df = pd.DataFrame(features)
+            df_combined = pd.concat([chunk.reset_index(drop=True), features_df], axis=1)
+            if columnar_output:
+                parts_dir.mkdir(exist_ok=True)
+                write_table(df_combined, parts_dir / f"part-{chunk_index:05d}.parquet", sort_by_user=False)
+            else:
+                with open(output_path, "a", newline="", encoding="utf-8") as f:
+                    df_combined.to_csv(f, index=False, header=progress["output_bytes"] == 0)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    progress["output_bytes"] = f.tell()
 
-# Applying new data features and metrics to each row
-features_df = df["Tweet_text"].astype(str).apply(extract_feature_metrics)
+            progress["chunks_done"] = chunk_index + 1
+            progress["rows_done"] += len(chunk)
+            save_progress(progress_path, progress)
 
-# Combine the original data with the new metrics data
-df_combined = pd.concat([df, features_df], axis=1)
+            new_rows += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"Chunk {chunk_index + 1}: {progress['rows_done']} rows total | {new_rows / elapsed:.1f} rows/sec")
+
+    if columnar_output:
+        parts = sorted(parts_dir.glob("part-*.parquet"))
+        if parts:
+            write_parts(parts, output_path)
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    progress_path.unlink()
+    elapsed = time.perf_counter() - started
+    print(f"Features saved to {output_path} ({new_rows} new rows in {elapsed:.1f}s, {new_rows / max(elapsed, 1e-9):.1f} rows/sec)")
+
+# === THIS IS MAIN ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add text feature metrics to a tweet table")
+    # Input the filename --> ex) "filename.csv"
+    parser.add_argument("input_filename", help="CSV, Parquet or Arrow file with a Tweet_text column")
+    parser.add_argument("-o", "--output", help="defaults to preprocessed_<input_filename>, the extension picks the format")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows read and written per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=256, help="nlp.pipe batch size inside each worker")
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress and start over")
+    args = parser.parse_args()
 
-# Generate output filename with 'preprocessed_' in front
-output_filename = f"preprocessed_{input_filename}"
+    # Generate output filename with 'preprocessed_' in front
+    input_path = Path(args.input_filename)
+    output_path = Path(args.output) if args.output else input_path.with_name(f"preprocessed_{input_path.name}")
 
-# Save to the newly named csv file
-df_combined.to_csv(output_filename, index=False)
-print(f"Features saved to {output_filename}")
\ No newline at end of file
+    preprocess_file(input_path, output_path, args.chunk_size, args.workers, args.batch_size, args.restart)
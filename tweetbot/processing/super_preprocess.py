@@ -1,14 +1,187 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-# Load your full dataset
-df = pd.read_csv("all_50_human_tweets.csv")  # Replace with your filename
+from columnar import USER_COLUMN, iter_table_chunks, table_format
+from user_split import is_validation_user
+
+# Build the training dataset from the raw tweet dumps in one streaming pass:
+#  - caps the tweets per Twitter_User_Name (--per-user), keeping either each user's first
+#    N tweets (--sampling first, only a counter per user in memory) or a uniform random N
+#    of them (--sampling reservoir, reservoir sampling per user)
+#  - writes the capped human and bot files, e.g. human_limited_200_per_user.csv
+#  - writes train/val files with a label column (0 = human, 1 = bot), split by user: every
+#    user lands in exactly one of them, so validation never sees a training account.
+#    The split comes from a hash of the user name, so it is the same on every run.
+#
+# Usage:
+#   python super_preprocess.py --human all_human_tweets.csv --bot all_bot_tweets.csv --per-user 200
+#   python super_preprocess.py --human raw/human_*.csv --bot raw/bot_*.csv --sampling reservoir --format parquet
+
+
+# Appends DataFrame chunks to a CSV, Parquet or Arrow file without holding the whole output
+class TableAppender:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.format = table_format(path)
+        self.rows = 0
+        self._writer = None
+        self._sink = None
+        self._schema = None
+        if self.path.exists():
+            self.path.unlink()
+
+    def append(self, df):
+        if df.empty:
+            return
+        if self.format == "csv":
+            df.to_csv(self.path, mode="a", index=False, header=self.rows == 0)
+        else:
+            import pyarrow as pa
+
+            # Later chunks are cast to the first chunk's schema, so an all-empty column
+            # in one chunk can't change the file's column types
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.format == "parquet":
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+                else:
+                    self._sink = pa.OSFile(str(self.path), "wb")
+                    self._writer = pa.ipc.new_file(self._sink, self._schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+# Keep each user's first `per_user` rows. Only a tweet counter per user is kept in memory.
+def first_n_chunks(paths, per_user, chunk_size, stats):
+    counts = {}
+    for path in paths:
+        for chunk in iter_table_chunks(path, chunk_size):
+            stats["rows_read"] += len(chunk)
+            users = chunk[USER_COLUMN].astype(str)
+            # Position of every row among its user's tweets so far: earlier chunks + this chunk
+            position = users.map(counts).fillna(0).astype(np.int64).to_numpy() + users.groupby(users).cumcount().to_numpy()
+            for user, count in users.value_counts().items():
+                counts[user] = counts.get(user, 0) + count
+            yield chunk[position < per_user]
+    stats["users"] = len(counts)
+
+
+# Keep a uniform random sample of `per_user` rows per user (Algorithm R, run per user).
+# The n-th tweet of a user (0-based) replaces a random slot with probability per_user / (n + 1).
+# Memory is bounded by users x per_user rows, the size of the output.
+def reservoir_chunks(paths, per_user, chunk_size, stats, seed):
+    rng = np.random.default_rng(seed)
+    counts = {}
+    reservoirs = {}
+    columns = None
+    for path in paths:
+        for chunk in iter_table_chunks(path, chunk_size):
+            stats["rows_read"] += len(chunk)
+            columns = list(chunk.columns) if columns is None else columns
+            users = chunk[USER_COLUMN].astype(str)
+            position = users.map(counts).fillna(0).astype(np.int64).to_numpy() + users.groupby(users).cumcount().to_numpy()
+            for user, count in users.value_counts().items():
+                counts[user] = counts.get(user, 0) + count
+
+            # Decide every row of the chunk at once, only the kept ones are touched in Python
+            draw = (rng.random(len(chunk)) * (position + 1)).astype(np.int64)
+            slot = np.where(position < per_user, position, draw)
+            kept = np.flatnonzero(slot < per_user)
+            rows = chunk[columns].iloc[kept].to_numpy(dtype=object)
+            for row, i in zip(rows, kept):
+                reservoir = reservoirs.setdefault(users.iat[i], [])
+                if slot[i] == len(reservoir):
+                    reservoir.append(row)
+                else:
+                    reservoir[slot[i]] = row
+    stats["users"] = len(counts)
+
+    # Emit user by user, in chunks, so the writers see the same kind of input as in first-N mode
+    batch = []
+    for reservoir in reservoirs.values():
+        batch.extend(reservoir)
+        if len(batch) >= chunk_size:
+            yield pd.DataFrame(batch, columns=columns)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=columns)
+
+
+def build_dataset(human_paths, bot_paths, output_dir, per_user=200, sampling="first", val_ratio=0.2,
+                  seed=42, output_format="csv", chunk_size=100000):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    train = TableAppender(output_dir / f"train.{output_format}")
+    val = TableAppender(output_dir / f"val.{output_format}")
+
+    started = time.perf_counter()
+    total_read = 0
+    try:
+        for name, label, paths in (("human", 0, human_paths), ("bots", 1, bot_paths)):
+            stats = {"rows_read": 0, "users": 0}
+            class_started = time.perf_counter()
+            output = TableAppender(output_dir / f"{name}_limited_{per_user}_per_user.{output_format}")
+            if sampling == "reservoir":
+                chunks = reservoir_chunks(paths, per_user, chunk_size, stats, seed)
+            else:
+                chunks = first_n_chunks(paths, per_user, chunk_size, stats)
+
+            val_users = {}
+            for chunk in chunks:
+                output.append(chunk)
+                labelled = chunk.assign(label=label)
+                users = labelled[USER_COLUMN].astype(str)
+                # Hash each user once, not once per tweet
+                for user in users.unique():
+                    if user not in val_users:
+                        val_users[user] = is_validation_user(user, val_ratio, seed)
+                in_val = users.map(val_users).to_numpy(dtype=bool)
+                train.append(labelled[~in_val])
+                val.append(labelled[in_val])
+            output.close()
+
+            elapsed = time.perf_counter() - class_started
+            total_read += stats["rows_read"]
+            print(
+                f"✅ {name}: {stats['rows_read']} rows read, {stats['users']} users, {output.rows} rows kept "
+                f"({sum(val_users.values())} users in val) -> {output.path} | {stats['rows_read'] / max(elapsed, 1e-9):.0f} rows/sec"
+            )
+    finally:
+        train.close()
+        val.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ train: {train.rows} rows -> {train.path}")
+    print(f"✅ val: {val.rows} rows -> {val.path}")
+    print(f"Done in {elapsed:.1f}s ({total_read / max(elapsed, 1e-9):.0f} rows/sec)")
 
-# For each Twitter_User_Name, keep only the first 200 tweets
-df_limited = df.groupby("Twitter_User_Name").head(1000).reset_index(drop=True)
 
-# Confirm stats
-print("✅ Unique bot usernames:", df_limited["Twitter_User_Name"].nunique())
-print("✅ Total rows in output:", len(df_limited))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cap tweets per user and build the human/bot and train/val files")
+    parser.add_argument("--human", nargs="+", required=True, help="raw human tweet files (.csv, .parquet or .arrow)")
+    parser.add_argument("--bot", nargs="+", required=True, help="raw bot tweet files (.csv, .parquet or .arrow)")
+    parser.add_argument("--per-user", type=int, default=200, help="max tweets kept per Twitter_User_Name")
+    parser.add_argument("--sampling", choices=["first", "reservoir"], default="first",
+                        help="keep each user's first tweets, or a uniform random sample of them")
+    parser.add_argument("--val-ratio", type=float, default=0.2, help="share of users (not tweets) in val")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="rows read at a time")
+    parser.add_argument("-o", "--output-dir", default=os.getcwd())
+    args = parser.parse_args()
 
-# Save to CSV
-df_limited.to_csv("human_limited_1000_per_user.csv", index=False)
+    build_dataset(args.human, args.bot, args.output_dir, args.per_user, args.sampling, args.val_ratio,
+                  args.seed, args.format, args.chunk_size)
@@ -0,0 +1,35 @@
+import re
+
+# The tweet features that only need the text itself: character/word counts, special
+# characters, lexical diversity and stop words. No spaCy or TextBlob, so they cost a few
+# microseconds per tweet. preprocess.py adds them to every row, and the backend's cascade
+# (services/cascade_service.py) scores live tweets with the very same definitions.
+
+STOP_WORDS = {"the", "and", "is", "in", "to", "a", "of", "it", "on", "for"}
+WORD_PATTERN = re.compile(r"\b\w+\b")
+
+COUNT_FEATURES = [
+    "char_count", "word_count", "question_count", "exclamation_count", "hashtag_count",
+    "mention_count", "link_count", "unique_word_ratio", "stopword_count"
+]
+
+
+# The COUNT_FEATURES of one tweet, as a dict in that order
+def count_features(text):
+    lower_text = text.lower()
+    words = WORD_PATTERN.findall(lower_text)
+    return {
+        # Character and word counts (int >= 0)
+        "char_count": len(text),
+        "word_count": len(text.split()),
+        # Special characters: ?, !, #, @, "www.", "http" (int >= 0)
+        "question_count": text.count("?"),
+        "exclamation_count": text.count("!"),
+        "hashtag_count": text.count("#"),
+        "mention_count": text.count("@"),
+        "link_count": lower_text.count("http") + lower_text.count("www."),
+        # Lexical diversity: 0.0 = all words are the same, 1.0 = no repeating words
+        "unique_word_ratio": len(set(words)) / len(words) if words else 0.0,
+        # Filler words that humans usually use and bots omit (int >= 0)
+        "stopword_count": sum(1 for word in words if word in STOP_WORDS)
+    }
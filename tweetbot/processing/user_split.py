@@ -0,0 +1,10 @@
+import hashlib
+
+# Train/val split by user, shared by super_preprocess.py and the backend's train_cascade.py.
+# The side comes from a hash of the seed and the user name, so the same user always goes
+# to the same side, whatever the input order, on every run and in every script.
+
+
+def is_validation_user(user, val_ratio, seed):
+    digest = hashlib.sha256(f"{seed}:{user}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64 < val_ratio